@@ -0,0 +1,356 @@
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, abort, current_app, request
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from models import (db, Venue, Artist, Show, Residency, ResidencyException,
+                    DEFAULT_SHOW_MINUTES, MAX_SHOW_MINUTES)
+from routing import read_only
+from deletion import delete_entities
+from booking import available_slots, book_shows
+from recurrence import by_start_time, is_occurrence, residency_shows, window
+from extensions import view_cache
+from formatting import parse_datetime
+from cursors import (encode_show_cursor, decode_show_cursor,
+                     encode_id_cursor, decode_id_cursor)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+# /api/v1 serves the data behind the listing and detail pages as JSON.
+# Queries select only the columns of the requested fields (`fields=`, a
+# comma separated list), rows go straight from the cursor into the
+# payload, and listings page with an opaque `after` cursor:
+#
+#   {"data": [...], "next": "<cursor or null>"}
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+ENTITY_FIELDS = ['id', 'name', 'city', 'state', 'phone', 'genres',
+                 'image_link', 'facebook_link', 'website',
+                 'seeking_description', 'upcoming_shows_count',
+                 'past_shows_count']
+VENUE_FIELDS = ENTITY_FIELDS[:4] + ['address'] + ENTITY_FIELDS[4:] + [
+    'seeking_talent']
+ARTIST_FIELDS = ENTITY_FIELDS + ['seeking_venue']
+# listings default to what the HTML listing shows
+LIST_FIELDS = ['id', 'name', 'city', 'state', 'upcoming_shows_count']
+SHOW_LISTS = ['upcoming_shows', 'past_shows']
+SHOW_FIELDS = OrderedDict([
+    ('id', Show.id),
+    ('start_time', Show.start_time),
+    ('end_time', Show.end_time),
+    ('venue_id', Show.venue_id),
+    ('venue_name', Venue.name),
+    ('venue_image_link', Venue.image_link),
+    ('artist_id', Show.artist_id),
+    ('artist_name', Artist.name),
+    ('artist_image_link', Artist.image_link),
+])
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=_default)
+
+
+def respond(payload, status=200):
+    return Response(dumps(payload), status=status,
+                    mimetype='application/json')
+
+
+@api.errorhandler(HTTPException)
+def http_error(e):
+    return respond({"error": {"status": e.code, "message": e.description}},
+                   e.code)
+
+
+# handlers registered for a status code take precedence over the class
+# handler above, so the app's HTML 404 and 500 pages need overriding by
+# code too
+api.register_error_handler(404, http_error)
+api.register_error_handler(500, http_error)
+
+
+def requested_fields(allowed, default):
+    fields = request.args.get('fields')
+    if not fields:
+        return list(default)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        abort(400, 'Unknown fields: {}. Available: {}.'.format(
+            ', '.join(unknown), ', '.join(allowed)))
+    return fields
+
+
+def page_limit():
+    limit = request.args.get('limit', current_app.config['API_PER_PAGE'],
+                             type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PER_PAGE']))
+
+
+def listing(model, allowed):
+    fields = requested_fields(allowed, LIST_FIELDS)
+    # the id is always selected, it is the cursor
+    columns = [model.id] + [getattr(model, field) for field in fields]
+    query = db.session.query(*columns)
+    cursor = request.args.get('after')
+    if cursor:
+        after = decode_id_cursor(cursor)
+        if after is None:
+            abort(400, 'Invalid cursor.')
+        query = query.filter(model.id > after)
+    limit = page_limit()
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_id_cursor(rows[-1][0])
+    return respond({
+        "data": [dict(zip(fields, row[1:])) for row in rows],
+        "next": next_cursor,
+    })
+
+
+def detail(model, entity_id, allowed):
+    fields = requested_fields(allowed + SHOW_LISTS, allowed + SHOW_LISTS)
+    columns = [field for field in fields if field not in SHOW_LISTS]
+    row = db.session.query(model.id, *[
+        getattr(model, field) for field in columns]).filter(
+        model.id == entity_id).first()
+    if row is None:
+        abort(404, 'No such {}.'.format(model.__tablename__))
+    data = dict(zip(columns, row[1:]))
+
+    lists = [field for field in fields if field in SHOW_LISTS]
+    if lists:
+        # tiles name the other side of each show, as on the HTML page
+        if model is Venue:
+            other, own_id = Artist, Show.venue_id
+            join_on = Artist.id == Show.artist_id
+        else:
+            other, own_id = Venue, Show.artist_id
+            join_on = Venue.id == Show.venue_id
+        keys = ['{}_{}'.format(other.__tablename__, key)
+                for key in ('id', 'name', 'image_link')] + ['start_time']
+        shows = db.session.query(
+            *[SHOW_FIELDS[key] for key in keys]).select_from(Show).join(
+            other, join_on).filter(own_id == entity_id).order_by(
+            Show.start_time)
+        now = datetime.now()
+        split = {'past_shows': [], 'upcoming_shows': []}
+        # residencies add their occurrences near now, as on the HTML page
+        one_off = (dict(zip(keys, show), residency_id=None) for show in shows)
+        for show in by_start_time(one_off, residency_shows(
+                model, entity_id, *window(now))):
+            split['past_shows' if show['start_time'] < now
+                  else 'upcoming_shows'].append(show)
+        for field in lists:
+            data[field] = split[field]
+            # exact as of now, where the stored counter may lag a rollover
+            data[field + '_count'] = len(split[field])
+    return respond({"data": data})
+
+
+def batch_delete(model):
+    # {"ids": [1, 2, 3]}; ids that do not exist are skipped
+    payload = request.get_json(silent=True)
+    ids = payload.get('ids') if isinstance(payload, dict) else None
+    if not isinstance(ids, list) or not ids or not all(
+            isinstance(entity_id, int) and not isinstance(entity_id, bool)
+            for entity_id in ids):
+        abort(400, 'Expected a JSON body like {"ids": [1, 2, 3]}.')
+    if len(ids) > current_app.config['API_MAX_BATCH_DELETE']:
+        abort(400, 'At most {} ids per request.'.format(
+            current_app.config['API_MAX_BATCH_DELETE']))
+    return respond({"deleted": delete_entities(model, ids)})
+
+
+@api.route('/venues')
+@read_only
+def venues():
+    return listing(Venue, VENUE_FIELDS)
+
+
+@api.route('/venues/<int:venue_id>')
+@read_only
+def show_venue(venue_id):
+    return detail(Venue, venue_id, VENUE_FIELDS)
+
+
+@api.route('/venues', methods=['DELETE'])
+def delete_venues():
+    return batch_delete(Venue)
+
+
+@api.route('/venues/<int:venue_id>/slots')
+@read_only
+def venue_slots(venue_id):
+    # free stretches of at least `minutes` between `from` (now by default)
+    # and `to` (a week later by default)
+    if db.session.query(Venue.id).filter(Venue.id == venue_id).first() is None:
+        abort(404)
+    try:
+        start = parse_datetime(request.args['from']) \
+            if request.args.get('from') else datetime.now().replace(
+                second=0, microsecond=0)
+        end = parse_datetime(request.args['to']) \
+            if request.args.get('to') else start + timedelta(days=7)
+    except (ValueError, OverflowError):
+        abort(400, 'Invalid date.')
+    if not start < end <= start + timedelta(
+            days=current_app.config['API_MAX_SLOT_DAYS']):
+        abort(400, '`to` must be after `from`, by at most {} days.'.format(
+            current_app.config['API_MAX_SLOT_DAYS']))
+    minutes = request.args.get('minutes', DEFAULT_SHOW_MINUTES, type=int)
+    if not 15 <= minutes <= MAX_SHOW_MINUTES:
+        abort(400, '`minutes` must be between 15 and {}.'.format(
+            MAX_SHOW_MINUTES))
+    return respond({"data": [
+        {"start_time": slot_start, "end_time": slot_end}
+        for slot_start, slot_end in available_slots(
+            venue_id, start, end, minutes)]})
+
+
+@api.route('/artists')
+@read_only
+def artists():
+    return listing(Artist, ARTIST_FIELDS)
+
+
+@api.route('/artists/<int:artist_id>')
+@read_only
+def show_artist(artist_id):
+    return detail(Artist, artist_id, ARTIST_FIELDS)
+
+
+@api.route('/artists', methods=['DELETE'])
+def delete_artists():
+    return batch_delete(Artist)
+
+
+@api.route('/shows', methods=['POST'])
+def create_shows():
+    # {"shows": [{"venue_id": 1, "artist_id": 2, "start_time":
+    # "2030-01-01 20:00:00", "duration": 90}, ...], "atomic": true}
+    payload = request.get_json(silent=True)
+    rows = payload.get('shows') if isinstance(payload, dict) else None
+    atomic = payload.get('atomic', True) if isinstance(payload, dict) \
+        else None
+    if not isinstance(rows, list) or not rows or not all(
+            isinstance(row, dict) for row in rows) or \
+            not isinstance(atomic, bool):
+        abort(400, 'Expected a JSON body like '
+              '{"shows": [{"venue_id": ..., "artist_id": ..., '
+              '"start_time": ...}], "atomic": true}.')
+    if len(rows) > current_app.config['SHOW_BATCH_MAX_ROWS']:
+        abort(400, 'At most {} shows per request.'.format(
+            current_app.config['SHOW_BATCH_MAX_ROWS']))
+    try:
+        result = book_shows(rows, atomic=atomic)
+    except SQLAlchemyError:
+        current_app.logger.exception('Shows could not be added')
+        db.session.rollback()
+        abort(500, 'The shows could not be added.')
+    return respond({
+        "created": result.created,
+        "errors": [{"row": index, "errors": errors}
+                   for index, errors in sorted(result.errors.items())],
+    }, 201 if result.created else 400)
+
+
+@api.route('/residencies/<int:residency_id>/cancellations', methods=['POST'])
+def cancel_occurrence(residency_id):
+    # {"start_time": "2030-01-07T20:00:00"}: that occurrence is not played
+    residency = db.session.query(Residency).get(residency_id)
+    if residency is None:
+        abort(404, 'No such residency.')
+    payload = request.get_json(silent=True)
+    try:
+        start_time = parse_datetime(payload['start_time'])
+    except (TypeError, KeyError, ValueError, OverflowError):
+        abort(400, 'Expected a JSON body like {"start_time": ...}.')
+    if not is_occurrence(residency, start_time):
+        abort(400, 'The residency has no show at that time.')
+    status = 200
+    if db.session.query(ResidencyException).get(
+            (residency_id, start_time)) is None:
+        db.session.add(ResidencyException(residency_id=residency_id,
+                                          start_time=start_time))
+        # page ETags follow the residency's updated_at
+        residency.updated_at = datetime.utcnow()
+        db.session.commit()
+        view_cache.delete('venue:%d' % residency.venue_id,
+                          'artist:%d' % residency.artist_id)
+        status = 201
+    return respond({"data": {"residency_id": residency_id,
+                             "start_time": start_time}}, status)
+
+
+@api.route('/shows')
+@read_only
+def shows():
+    fields = requested_fields(list(SHOW_FIELDS), [
+        field for field in SHOW_FIELDS if field != 'venue_image_link'])
+    # the cursor needs start_time and id; join only what the fields name
+    query = db.session.query(Show.start_time, Show.id, *[
+        SHOW_FIELDS[field] for field in fields])
+    if any(field.startswith('venue_') and field != 'venue_id'
+           for field in fields):
+        query = query.join(Venue, Venue.id == Show.venue_id)
+    if any(field.startswith('artist_') and field != 'artist_id'
+           for field in fields):
+        query = query.join(Artist, Artist.id == Show.artist_id)
+
+    now = datetime.now()
+    when = request.args.get('when')
+    if when == 'upcoming':
+        query = query.filter(Show.start_time >= now)
+    elif when == 'past':
+        query = query.filter(Show.start_time < now)
+    try:
+        date_from = request.args.get('from')
+        if date_from:
+            query = query.filter(
+                Show.start_time >= parse_datetime(date_from))
+        date_to = request.args.get('to')
+        if date_to:
+            query = query.filter(
+                Show.start_time < parse_datetime(date_to))
+    except (ValueError, OverflowError):
+        abort(400, 'Invalid date.')
+
+    cursor = request.args.get('after')
+    if cursor:
+        position = decode_show_cursor(cursor)
+        if position is None:
+            abort(400, 'Invalid cursor.')
+        start_time, show_id = position
+        query = query.filter(db.or_(
+            Show.start_time > start_time,
+            db.and_(Show.start_time == start_time, Show.id > show_id)))
+
+    limit = page_limit()
+    rows = query.order_by(Show.start_time, Show.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_show_cursor(rows[-1][0], rows[-1][1])
+    return respond({
+        "data": [dict(zip(fields, row[2:])) for row in rows],
+        "next": next_cursor,
+    })
@@ -2,440 +2,75 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-import json
-import dateutil.parser
-import babel
-from flask import (Flask, render_template, request,
-                   Response, flash, redirect, url_for)
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
+import os
 import logging
-from logging import (Formatter, FileHandler, error)
-from flask_wtf import FlaskForm
-from forms import *
-from flask_migrate import Migrate
-from models import *
-#----------------------------------------------------------------------------#
-# App Config.
-#----------------------------------------------------------------------------#
-
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-
-
-migrate = Migrate(app, db)
+from logging import Formatter, FileHandler
+from flask import Flask
+from models import db
+from config import get_config
+from cache import LRUCache, NullCache, make_cache
+from formatting import format_datetime, compile_pattern
+from fragments import FragmentCacheExtension
+from extensions import (sql_instrumentation, metrics, replica_router, assets,
+                        compress)
 
 #----------------------------------------------------------------------------#
-# Filters.
-#----------------------------------------------------------------------------#
-
-
-def format_datetime(value, format='medium'):
-    if isinstance(value, str):
-        date = dateutil.parser.parse(value)
-    else:
-        date = value
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
-
-
-app.jinja_env.filters['datetime'] = format_datetime
-
-#----------------------------------------------------------------------------#
-# Controllers.
+# App Config.
 #----------------------------------------------------------------------------#
 
-
-@app.route('/')
-def index():
-    return render_template('pages/home.html')
-
-
-#  Venues
-#  ----------------------------------------------------------------
-
-@app.route('/venues')
-def venues():
-    data = []
-    distinct_city_state = Venue.query.with_entities(
-        Venue.city, Venue.state).distinct().all()
-    for city, state in distinct_city_state:
-        data.append({
-            "city": city,
-            "state": state,
-            "venues": Venue.query.filter_by(city=city, state=state).all()
-        })
-    return render_template('pages/venues.html', areas=data)
-
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-    search_term = request.form.get('search_term', '')
-    venues = Venue.query.filter(
-        Venue.name.ilike('%' + search_term + '%')).all()
-    data = []
-    for venue in venues:
-        data.append({
-            "id": venue.id,
-            "name": venue.name,
-        })
-    response = {
-        "count": len(data),
-        "data": data
-    }
-    return render_template('pages/search_venues.html', results=response, search_term=search_term)
-
-
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-    # shows the venue page with the given venue_id
-    venue = Venue.query.get(venue_id)
-    past_shows_query = db.session.query(Show).join(Venue).filter(
-        Show.venue_id == venue_id).filter(Show.start_time < datetime.now()).all()
-    past_shows = []
-    for show in past_shows_query:
-        artist = Artist.query.get(show.artist_id)
-        past_shows.append({
-            "artist_id": show.artist_id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": str(show.start_time)
-        })
-    upcoming_shows_query = db.session.query(Show).join(Venue).filter(
-        Show.venue_id == venue_id).filter(Show.start_time > datetime.now()).all()
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        artist = Artist.query.get(show.artist_id)
-        upcoming_shows.append({
-            "artist_id": show.artist_id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": str(show.start_time)
-        })
-
-    data = {
-        "id": venue.id,
-        "name": venue.name,
-        "genres": venue.genres,
-        "city": venue.city,
-        "state": venue.state,
-        "address": venue.address,
-        "phone": venue.phone,
-        "website": venue.website,
-        "facebook_link": venue.facebook_link,
-        "seeking_talent": venue.seeking_talent,
-        "seeking_description": venue.seeking_description,
-        "image_link": venue.image_link,
-        "past_shows": past_shows,
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
-    }
-    return render_template('pages/show_venue.html', venue=data)
-
-#  Create Venue
-#  ----------------------------------------------------------------
-
-
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-    form = VenueForm()
-    return render_template('forms/new_venue.html', form=form)
-
-
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-    form = VenueForm(request.form)
-
-    if form.validate():
-        try:
-            venue = Venue()
-            form.populate_obj(venue)
-            db.session.add(venue)
-            db.session.commit()
-            flash('Venue ' + request.form['name'] +
-                  ' was successfully listed!')
-        except:
-            print(sys.exc_info())
-            db.session.rollback()
-        finally:
-            db.session.close()
-    else:
-        flash(form.errors)
-        flash('An error occurred. Venue ' +
-              request.form['name'] + ' could not be listed.')
-
-    return render_template('pages/home.html')
-
-
-@app.route('/venues/<venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-
-    try:
-        db.session.delete(venue)
-        db.session.commit()
-    except:
-        print(sys.exc_info())
-        flash('An error occurred. Venue ' +
-              venue.name + ' could not be deleted.')
-        db.session.rollback()
-    finally:
-        db.session.close()
-    flash('Venue ' + venue.name + ' was successfully deleted!')
-    return redirect(url_for('index'))
-
-#  Artists
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists')
-def artists():
-    data = Artist.query.with_entities(Artist.id, Artist.name)
-
-    return render_template('pages/artists.html', artists=data)
-
-
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-    search_term = request.form.get('search_term', '')
-    artists = Artist.query.filter(
-        Artist.name.ilike('%' + search_term + '%')).all()
-    data = []
-    for artist in artists:
-        data.append({
-            "id": artist.id,
-            "name": artist.name,
-        })
-    response = {
-        "count": len(data),
-        "data": data
-    }
-    return render_template('pages/search_artists.html', results=response, search_term=search_term)
-
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-    # shows the venue page with the given venue_id
-    artist = Artist.query.get(artist_id)
-    past_shows_query = db.session.query(Show).join(Venue).filter(
-        Show.artist_id == artist_id).filter(Show.start_time < datetime.now()).all()
-    past_shows = []
-    for show in past_shows_query:
-        venue = Venue.query.get(show.venue_id)
-        past_shows.append({
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "venue_image_link": venue.image_link,
-            "start_time": show.start_time
-        })
-
-    upcoming_shows_query = db.session.query(Show).join(Venue).filter(
-        Show.artist_id == artist_id).filter(Show.start_time > datetime.now()).all()
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        venue = Venue.query.get(show.venue_id)
-        upcoming_shows.append({
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "venue_image_link": venue.image_link,
-            "start_time": show.start_time
-        })
-
-    data = {
-        "id": artist.id,
-        "name": artist.name,
-        "genres": artist.genres,
-        "city": artist.city,
-        "state": artist.state,
-        "phone": artist.phone,
-        "website": artist.website,
-        "facebook_link": artist.facebook_link,
-        "seeking_venue": artist.seeking_venue,
-        "seeking_description": artist.seeking_description,
-        "image_link": artist.image_link,
-        "past_shows": past_shows,
-        "upcoming_shows": upcoming_shows,
-        "past_shows_count": len(past_shows),
-        "upcoming_shows_count": len(upcoming_shows),
-    }
-    return render_template('pages/show_artist.html', artist=data)
-
-#  Update
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-    artist = Artist.query.get(artist_id)
-    form = ArtistForm(obj=artist)
-
-    return render_template('forms/edit_artist.html', form=form, artist=artist)
-
-
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
-    form = ArtistForm(request.form)
-
-    if form.validate():
-        try:
-            artist = Artist.query.get(artist_id)
-            form.populate_obj(artist)
-            db.session.add(artist)
-            db.session.commit()
-            flash('Artist has been modified')
-        except:
-            print(sys.exc_info())
-            db.session.rollback()
-        finally:
-            db.session.close()
-    else:
-        for field in form.errors:
-            flash(f'{field} : {form.errors[field][0]}')
-        flash('Artist has not been modified.')
-
-    return redirect(url_for('show_artist', artist_id=artist_id))
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    form = VenueForm(obj=venue)
-
-    return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-    form = VenueForm(request.form)
-
-    if form.validate():
-        try:
-            venue = Venue.query.get(venue_id)
-            form.populate_obj(venue)
-            db.session.add(venue)
-            db.session.commit()
-            flash('Venue has been modified')
-        except:
-            print(sys.exc_info())
-            db.session.rollback()
-        finally:
-            db.session.close()
-    else:
-        for field in form.errors:
-            flash(f'{field} : {form.errors[field][0]}')
-        flash('Venue has not been modified.')
-
-    return redirect(url_for('show_venue', venue_id=venue_id))
-
-#  Create Artist
-#  ----------------------------------------------------------------
-
-
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template('forms/new_artist.html', form=form)
-
-
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-    form = ArtistForm(request.form)
-    error = False
-
-    if form.validate():
-        try:
-            artist = Artist()
-            form.populate_obj(artist)
-            db.session.add(artist)
-            db.session.commit()
-            flash('Artist ' + request.form['name'] +
-                  ' was successfully listed!')
-        except:
-            print(sys.exc_info())
-            db.session.rollback()
-        finally:
-            db.session.close()
-    else:
-        flash(form.errors)
-        flash('An error occurred. Artist ' +
-              request.form['name'] + ' could not be listed.')
-
-    return render_template('pages/home.html')
-
-
-#  Shows
-#  ----------------------------------------------------------------
-
-@app.route('/shows')
-def shows():
-    # displays list of shows at /shows
-    data = []
-    shows = Show.query.order_by(Show.artist_id).all()
-    for show in shows:
-        venue = Venue.query.get(show.venue_id)
-        artist = Artist.query.get(show.artist_id)
-        data.append({
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "artist_id": artist.id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": show.start_time
-        })
-    return render_template('pages/shows.html', shows=data)
-
-
-@app.route('/shows/create')
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm(request.form)
-    form.artist_id.query = Artist.query.order_by('id')
-    form.venue_id.query = Venue.query.order_by('id')
-
-    return render_template('forms/new_show.html', form=form)
-
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-    error = False
-    try:
-        show = Show()
-        show.artist_id = request.form['artist_id']
-        show.venue_id = request.form['venue_id']
-        show.start_time = request.form['start_time']
-        db.session.add(show)
-        db.session.commit()
-    except:
-        error = True
-        print(sys.exc_info())
-        db.session.rollback()
-    finally:
-        db.session.close()
-    if error:
-        flash('An error occurred. Show won\'t be added ')
-
-    flash('Show added')
-    return render_template('pages/home.html')
-
-
-@app.errorhandler(404)
-def not_found_error(error):
-    return render_template('errors/404.html'), 404
-
-
-@app.errorhandler(500)
-def server_error(error):
-    return render_template('errors/500.html'), 500
-
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
+# create_app() only wires things up: no connection is opened and no log
+# file is touched until the first request, so the app can be built in a
+# preloading master and forked. Code only the flask command needs is
+# imported only under the flask command.
+
+
+def create_app(config=None):
+    if config is None or isinstance(config, str):
+        config = get_config(config)
+    app = Flask(__name__)
+    app.config.from_object(config)
+    db.init_app(app)
+
+    # mapper events that keep the show counters, see counters.py
+    import counters  # noqa: F401
+
+    app.extensions['view_cache'] = make_cache(app.config)
+    sql_instrumentation.init_app(app, db)
+    metrics.init_app(app, db)
+    replica_router.init_app(app, db)
+    assets.init_app(app)
+    compress.init_app(app)
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = LRUCache(
+        app.config['FRAGMENT_CACHE_MAX_ENTRIES']) \
+        if app.config['FRAGMENT_CACHE_MAX_ENTRIES'] else NullCache()
+    # compiled patterns and memoized values, see formatting.py
+    app.jinja_env.filters['datetime'] = format_datetime
+
+    import main
+    import venues
+    import artists
+    import shows
+    from api import api
+    app.register_blueprint(main.blueprint)
+    app.register_blueprint(venues.blueprint)
+    app.register_blueprint(artists.blueprint)
+    app.register_blueprint(shows.blueprint)
+    app.register_blueprint(api)
+
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        import commands
+        commands.init_app(app)
+
+    if not app.debug and not app.testing:
+        configure_logging(app)
+    return app
+
+
+def configure_logging(app):
+    # delay=True: each file is opened by the first record, in the worker
+    file_handler = FileHandler('error.log', delay=True)
     file_handler.setFormatter(
         Formatter(
             '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
@@ -443,7 +78,22 @@ if not app.debug:
     app.logger.setLevel(logging.INFO)
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+
+    slow_query_handler = FileHandler(app.config['SQL_SLOW_QUERY_LOG'],
+                                     delay=True)
+    slow_query_handler.setFormatter(Formatter('%(asctime)s %(message)s'))
+    sql_logger = logging.getLogger('fyyur.sql')
+    sql_logger.setLevel(logging.INFO)
+    sql_logger.addHandler(slow_query_handler)
+
+
+def preload():
+    # import what requests otherwise load on first use, so workers forked
+    # from a preloading master share it instead of each paying for it
+    import dateutil.parser  # noqa: F401
+    import exporter  # noqa: F401
+    for format in ('full', 'medium'):
+        compile_pattern(format)
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -451,11 +101,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
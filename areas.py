@@ -0,0 +1,49 @@
+import threading
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Area index.
+#----------------------------------------------------------------------------#
+
+# The /venues page groups venues by (city, state). Which venue belongs to
+# which area only changes when a venue is created, deleted or moved, so the
+# grouping is kept in the process and rebuilt on demand instead of being
+# recomputed by the database on every page view. Each worker has its own
+# copy, so the index is stamped with the venue table version the caller
+# read, (count, max(updated_at)), and rebuilt when that version moves on:
+# a venue moved through another worker bumps its updated_at, while show
+# bookings leave it alone.
+
+
+class AreaIndex(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._areas = None
+        self._version = None
+
+    def invalidate(self):
+        with self._lock:
+            self._areas = None
+
+    def areas(self, version):
+        with self._lock:
+            if self._areas is None or version != self._version:
+                self._rebuild()
+                self._version = version
+            return self._areas
+
+    def _rebuild(self):
+        rows = db.session.query(Venue.id, Venue.city, Venue.state).order_by(
+            Venue.state, Venue.city, Venue.id).all()
+        areas = []
+        last = None
+        for venue_id, city, state in rows:
+            if (city, state) != last:
+                areas.append((city, state, []))
+                last = (city, state)
+            areas[-1][2].append(venue_id)
+        self._areas = areas
+
+
+area_index = AreaIndex()
@@ -0,0 +1,218 @@
+import sys
+from datetime import datetime
+from flask import (Blueprint, abort, current_app, flash, redirect,
+                   render_template, request, url_for)
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Venue, Artist, Show
+from forms import ArtistForm
+from search import search
+from cache import timeout_until
+from caching import (artist_page_keys, make_etag, not_modified, conditional,
+                     table_version, detail_version)
+from extensions import view_cache, fragment_cache
+from fragments import fragment_key
+from deletion import delete_entities
+from routing import read_only
+from recurrence import by_start_time, residency_shows, window
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('artists', __name__)
+
+
+@blueprint.route('/artists')
+def artists():
+    version = db.session.query(*table_version(Artist)).one()
+    etag, last_modified = make_etag('artists', *version), version[1]
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    data = Artist.query.with_entities(
+        Artist.id, Artist.name, Artist.updated_at)
+
+    return conditional(render_template('pages/artists.html', artists=data),
+                       etag, last_modified)
+
+
+@blueprint.route('/artists/search', methods=['GET', 'POST'])
+@read_only
+def search_artists():
+    search_term = request.values.get('search_term', '')
+    results = search(Artist, search_term,
+                     page=request.values.get('page', 1, type=int),
+                     per_page=current_app.config['SEARCH_PER_PAGE'],
+                     max_results=current_app.config[
+                         'SEARCH_MAX_RESULTS'])
+    response = {
+        "count": results.total,
+        "data": results.items
+    }
+    return render_template('pages/search_artists.html', results=response,
+                           pagination=results, search_term=search_term)
+
+
+@blueprint.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+    # shows the artist page with the given artist_id
+    etag, last_modified = detail_version(
+        Artist, artist_id, Venue, datetime.now())
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    # the cached view model carries the version the ETag is made of, so an
+    # entry this worker kept after a write elsewhere is never served
+    entry = view_cache.get('artist:%d' % artist_id)
+    if entry is not None and entry[0] == etag:
+        data = entry[1]
+    else:
+        data = artist_page_data(artist_id, etag)
+    return conditional(render_template('pages/show_artist.html', artist=data),
+                       etag, last_modified)
+
+
+def artist_page_data(artist_id, version):
+    rows = db.session.query(
+        Artist, Show.start_time, Venue.id, Venue.name, Venue.image_link
+    ).outerjoin(Show, Show.artist_id == Artist.id).outerjoin(
+        Venue, Venue.id == Show.venue_id
+    ).filter(Artist.id == artist_id).order_by(Show.start_time).all()
+    if not rows:
+        abort(404)
+
+    artist = rows[0][0]
+    now = datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    one_off = ({
+        "venue_id": venue_id,
+        "venue_name": venue_name,
+        "venue_image_link": venue_image_link,
+        "start_time": start_time
+    } for _, start_time, venue_id, venue_name, venue_image_link in rows
+        if start_time is not None)
+    # residencies add their occurrences near now, in start_time order
+    for show in by_start_time(one_off, residency_shows(
+            Artist, artist_id, *window(now))):
+        if show["start_time"] < now:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+
+    data = {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+    view_cache.set('artist:%d' % artist_id, (version, data), timeout_until(
+        now, upcoming_shows, current_app.config['VIEW_CACHE_TTL']))
+    return data
+
+#  Delete
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+    artist = Artist.query.get_or_404(artist_id)
+    name = artist.name
+
+    try:
+        delete_entities(Artist, [artist_id])
+        flash('Artist ' + name + ' was successfully deleted!')
+    except SQLAlchemyError:
+        current_app.logger.exception('Artist %d could not be deleted', artist_id)
+        flash('An error occurred. Artist ' + name + ' could not be deleted.')
+        db.session.rollback()
+    finally:
+        db.session.close()
+    return redirect(url_for('main.index'))
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    artist = Artist.query.get(artist_id)
+    form = ArtistForm(obj=artist)
+
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    form = ArtistForm(request.form)
+
+    if form.validate():
+        try:
+            artist = Artist.query.get(artist_id)
+            tile = (artist.name, artist.image_link)
+            form.populate_obj(artist)
+            db.session.add(artist)
+            db.session.commit()
+            view_cache.delete(*artist_page_keys(
+                artist_id, related=(artist.name, artist.image_link) != tile))
+            fragment_cache.delete(fragment_key('artist-tile', artist_id))
+            flash('Artist has been modified')
+        except:
+            print(sys.exc_info())
+            db.session.rollback()
+        finally:
+            db.session.close()
+    else:
+        for field in form.errors:
+            flash(f'{field} : {form.errors[field][0]}')
+        flash('Artist has not been modified.')
+
+    return redirect(url_for('.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    form = ArtistForm(request.form)
+    error = False
+
+    if form.validate():
+        try:
+            artist = Artist()
+            form.populate_obj(artist)
+            db.session.add(artist)
+            db.session.commit()
+            flash('Artist ' + request.form['name'] +
+                  ' was successfully listed!')
+        except:
+            print(sys.exc_info())
+            db.session.rollback()
+        finally:
+            db.session.close()
+    else:
+        flash(form.errors)
+        flash('An error occurred. Artist ' +
+              request.form['name'] + ' could not be listed.')
+
+    return render_template('pages/home.html')
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from flask import (abort, current_app, request, send_from_directory,
+                   url_for)
+from compression import compress, encodings, negotiate
+
+#----------------------------------------------------------------------------#
+# Static assets.
+#----------------------------------------------------------------------------#
+
+# `flask build-assets` copies static/ into ASSETS_DIR with a content hash in
+# every file name (css/main.css -> css/main.1a2b3c4d5e.css), rewrites url()
+# references in stylesheets to match, and writes .gz (and .br when brotli
+# is installed) next to each text file. The hashed names never change
+# content, so /assets serves them with a one year immutable Cache-Control
+# and picks the precompressed file the client accepts.
+#
+# Templates link with asset_url('css/main.css'). Without a build, for
+# example in development, that is simply the /static URL.
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf',
+                '.json', '.txt', '.html')
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+ENCODED = {'br': 'br', 'gzip': 'gz'}
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _hashed_name(path, content):
+    root, ext = posixpath.splitext(path)
+    return '{}.{}{}'.format(root, hashlib.md5(content).hexdigest()[:10], ext)
+
+
+def _sources(static_folder):
+    for directory, _, files in os.walk(static_folder):
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(directory, name),
+                                   static_folder).replace(os.sep, '/')
+            root, ext = posixpath.splitext(path)
+            # the minified copy is the one pages use
+            if ext in ('.css', '.js') and not root.endswith('.min') and \
+                    os.path.exists(os.path.join(
+                        static_folder, root + '.min' + ext)):
+                continue
+            yield path
+
+
+def _rewrite_css(path, content, manifest):
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        resolved = posixpath.normpath(posixpath.join(base, target))
+        if resolved not in manifest:
+            return match.group(0)
+        hashed = posixpath.relpath(manifest[resolved], base)
+        return 'url({0}{1}{2}{0})'.format(quote, hashed, suffix)
+
+    return CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def build(static_folder, output, level=9):
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    manifest = {}
+    # stylesheets last, so the files they reference already have names
+    paths = sorted(_sources(static_folder),
+                   key=lambda path: (path.endswith('.css'), path))
+    for path in paths:
+        with open(os.path.join(static_folder, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            content = _rewrite_css(path, content, manifest)
+        hashed = _hashed_name(path, content)
+        manifest[path] = hashed
+
+        target = os.path.join(output, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+        if path.endswith(COMPRESSIBLE):
+            for encoding in encodings():
+                compressed = compress(content, encoding, level)
+                # not worth a negotiation for a few percent
+                if len(compressed) < len(content) * 0.9:
+                    with open(target + '.' + ENCODED[encoding], 'wb') as f:
+                        f.write(compressed)
+
+    with open(os.path.join(output, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # each app keeps the manifest of its own ASSETS_DIR
+        app.extensions['assets'] = self.load(app.config['ASSETS_DIR'])
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.url, 'asset_url')
+
+    def load(self, directory):
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def url(self, filename):
+        hashed = current_app.extensions['assets'].get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename):
+        if filename == MANIFEST:
+            abort(404)
+        directory = current_app.config['ASSETS_DIR']
+        mimetype = mimetypes.guess_type(filename)[0] or \
+            'application/octet-stream'
+        available = [encoding for encoding in encodings()
+                     if os.path.isfile(os.path.join(
+                         directory,
+                         filename + '.' + ENCODED[encoding]))]
+        encoding = negotiate(request.accept_encodings, available)
+        if encoding is None:
+            response = send_from_directory(
+                directory, filename, mimetype=mimetype,
+                conditional=True)
+        else:
+            response = send_from_directory(
+                directory, filename + '.' + ENCODED[encoding],
+                mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+        if available:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
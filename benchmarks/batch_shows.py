@@ -0,0 +1,117 @@
+"""A tour booked show by show against the same tour booked in one batch.
+
+Creates venues and an artist in a scratch database, then books a tour of
+--shows shows three ways through the Flask test client: one POST to
+/shows/create per show, one POST /api/v1/shows with every row, and one
+POST of the /shows/batch form, and prints the total time and the SQL
+statements each way took:
+
+    python benchmarks/batch_shows.py --database-url sqlite:////tmp/fyyur.db \\
+        --shows 60 --repeat 5
+
+Every run books new dates, so no show is refused as a double booking.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+
+def tour(venue_ids, artist_id, first_day, shows):
+    start = datetime(2040, 1, 1, 20) + timedelta(days=first_day)
+    return [{
+        "venue_id": venue_ids[n % len(venue_ids)],
+        "artist_id": artist_id,
+        "start_time": (start + timedelta(days=n)).strftime(
+            '%Y-%m-%d %H:%M:%S'),
+        "duration": 90,
+    } for n in range(shows)]
+
+
+def single(client, rows):
+    for row in rows:
+        response = client.post('/shows/create', data=row)
+        if b'Show added' not in response.data:
+            raise RuntimeError('show was not added: {}'.format(row))
+
+
+def api(client, rows):
+    response = client.post('/api/v1/shows', json={"shows": rows})
+    if response.status_code != 201 or response.get_json()['errors']:
+        raise RuntimeError(response.get_data(as_text=True))
+
+
+def form(client, rows):
+    data = {"atomic": 'y'}
+    for n, row in enumerate(rows):
+        for field, value in row.items():
+            data['shows-{}-{}'.format(n, field)] = value
+    response = client.post('/shows/batch', data=data)
+    if b'added' not in response.data or b'were not' in response.data:
+        raise RuntimeError('batch was not added')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url',
+                        help='defaults to SQLALCHEMY_DATABASE_URI')
+    parser.add_argument('--shows', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from app import create_app
+    from config import get_config
+    from models import db, Venue, Artist
+    config = get_config()
+    if args.database_url:
+        # into the profile, so nothing the factory builds sees the default
+        config = type('BenchmarkConfig', (config,), {
+            'SQLALCHEMY_DATABASE_URI': args.database_url})
+    app = create_app(config)
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        venues = [Venue(name='Tour Stop {}'.format(n), city='City',
+                        state='CA') for n in range(args.shows)]
+        artist = Artist(name='Touring Band', city='City', state='CA')
+        db.session.add_all(venues + [artist])
+        db.session.commit()
+        venue_ids = [venue.id for venue in venues]
+        artist_id = artist.id
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+
+    client = app.test_client()
+    print('{:<22} {:>10} {:>12} {:>11}'.format(
+        'way', 'total ms', 'per show ms', 'statements'))
+    first_day = 0
+    for name, book in (('POST /shows/create', single),
+                       ('POST /api/v1/shows', api),
+                       ('POST /shows/batch', form)):
+        timings = []
+        for _ in range(args.repeat):
+            rows = tour(venue_ids, artist_id, first_day, args.shows)
+            first_day += args.shows
+            statements[0] = 0
+            started = time.perf_counter()
+            book(client, rows)
+            timings.append((time.perf_counter() - started) * 1000)
+        total = statistics.median(timings)
+        print('{:<22} {:>10.1f} {:>12.2f} {:>11}'.format(
+            name, total, total / args.shows, statements[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Micro-benchmark for the datetime template filter.
+
+Renders a page of show tiles (500 by default) through Jinja with the
+original filter, which re-parsed strings and rebuilt the babel pattern on
+every call, and with the cached filter from formatting.py, and prints the
+per-tile cost of each, for a first view of the page and for repeat views
+served from the memo:
+
+    python benchmarks/datetime_filter.py --shows 500 --repeat 50
+
+Start times are drawn like the seeded data, a few months around today at
+a handful of evening hours, so most tiles on one page differ and the memo
+pays off across views rather than within a page.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates  # noqa: E402
+import dateutil.parser  # noqa: E402
+from jinja2 import Environment  # noqa: E402
+import formatting  # noqa: E402
+
+TILE = "{% for show in shows %}<h6>{{ show.start_time|datetime('full') }}</h6>" \
+    "{% endfor %}"
+
+
+def legacy_format_datetime(value, format='medium'):
+    if isinstance(value, str):
+        date = dateutil.parser.parse(value)
+    else:
+        date = value
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def cold_format_datetime(value, format='medium'):
+    formatting._format.cache_clear()
+    return formatting.format_datetime(value, format)
+
+
+def shows(count, seed):
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [{"start_time": (now + timedelta(days=rng.gauss(-60, 120))).replace(
+        hour=rng.choice([19, 20, 21, 22]), minute=0, second=0, microsecond=0)}
+        for _ in range(count)]
+
+
+def run(name, filter, data, repeat, warm=False):
+    env = Environment()
+    env.filters['datetime'] = filter
+    template = env.from_string(TILE)
+    template.render(shows=data)
+    timings = []
+    for _ in range(repeat):
+        if not warm:
+            formatting._format.cache_clear()
+        started = time.perf_counter()
+        template.render(shows=data)
+        timings.append(time.perf_counter() - started)
+    page = statistics.median(timings)
+    print('{:<28} {:>10.2f} ms/page {:>10.2f} us/tile'.format(
+        name, page * 1000, page * 1e6 / len(data)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    data = shows(args.shows, args.seed)
+    as_strings = [{"start_time": str(show["start_time"])} for show in data]
+    print('{} tiles, {} distinct start times'.format(
+        len(data), len({show["start_time"] for show in data})))
+    run('legacy, str(start_time)', legacy_format_datetime, as_strings,
+        args.repeat)
+    run('legacy, datetime', legacy_format_datetime, data, args.repeat)
+    run('compiled pattern, no memo', cold_format_datetime, data, args.repeat)
+    run('cached, first view', formatting.format_datetime, data,
+        args.repeat)
+    run('cached, repeat views', formatting.format_datetime, data,
+        args.repeat, warm=True)
+
+
+if __name__ == '__main__':
+    main()
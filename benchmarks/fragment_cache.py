@@ -0,0 +1,76 @@
+"""Listing page render time with and without the fragment cache.
+
+Seeds a scratch database, then requests /venues, /artists and /shows
+through the Flask test client, once with the {% cache %} tiles backed by
+an empty NullCache and once with a warm LRU, and prints the median time
+per page:
+
+    python benchmarks/fragment_cache.py --database-url sqlite:////tmp/fyyur.db \\
+        --venues 500 --artists 2000 --shows 50000
+
+Conditional request headers are never sent, so every request renders.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGES = ['/venues', '/artists', '/shows?limit=100']
+
+
+def timed(client, url, repeat):
+    client.get(url)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError('{} returned {}'.format(
+                url, response.status_code))
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url',
+                        help='defaults to SQLALCHEMY_DATABASE_URI')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    from app import create_app
+    from config import get_config
+    from cache import LRUCache, NullCache
+    from models import db
+    from seed import seed
+    config = get_config()
+    if args.database_url:
+        # into the profile, so nothing the factory builds sees the default
+        config = type('BenchmarkConfig', (config,), {
+            'SQLALCHEMY_DATABASE_URI': args.database_url})
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        seed(args.venues, args.artists, args.shows, seed=1)
+
+    client = app.test_client()
+    print('{:<20} {:>12} {:>12} {:>9}'.format(
+        'page', 'no cache ms', 'cached ms', 'speedup'))
+    for url in PAGES:
+        app.jinja_env.fragment_cache = NullCache()
+        uncached = timed(client, url, args.repeat)
+        app.jinja_env.fragment_cache = LRUCache(
+            app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+        cached = timed(client, url, args.repeat)
+        print('{:<20} {:>12.2f} {:>12.2f} {:>8.2f}x'.format(
+            url, uncached, cached, uncached / cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Cold start time of the application.
+
+Starts a fresh interpreter several times with `python -X importtime`,
+building the app with create_app() (or loading wsgi.py, which also warms
+the lazily imported modules before gunicorn forks), and prints the median
+import time of the slowest top-level packages, summed over their
+submodules, and the median wall time of the whole start:
+
+    python benchmarks/import_time.py --runs 7 --top 15
+    python benchmarks/import_time.py --target wsgi
+
+The interpreter's own startup is included in the wall time, so compare
+runs on the same machine.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'app': 'from app import create_app; create_app()',
+    'wsgi': 'import wsgi',
+}
+
+
+def measure(code):
+    env = dict(os.environ, FYYUR_ENV='testing')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    elapsed = time.perf_counter() - started
+
+    # import time: self [us] | cumulative | imported package
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        # self times add up without counting a module twice
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1000
+    return elapsed * 1000, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--target', choices=sorted(TARGETS), default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    # the first run fills the bytecode cache
+    measure(TARGETS[args.target])
+    totals, packages = [], {}
+    for _ in range(args.runs):
+        total, imported = measure(TARGETS[args.target])
+        totals.append(total)
+        for name, ms in imported.items():
+            packages.setdefault(name, []).append(ms)
+
+    medians = sorted(((statistics.median(ms), name)
+                      for name, ms in packages.items()), reverse=True)
+    print('{:<30} {:>10}'.format('package', 'median ms'))
+    for ms, name in medians[:args.top]:
+        print('{:<30} {:>10.1f}'.format(name, ms))
+    print('{:<30} {:>10.1f}'.format(
+        'total ({})'.format(args.target), statistics.median(totals)))
+
+
+if __name__ == '__main__':
+    main()
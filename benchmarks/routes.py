@@ -0,0 +1,267 @@
+"""Route-level benchmark for every endpoint in app.py.
+
+Drives each route through the Flask test client and records latency
+percentiles, SQL statements per request, peak Python memory per request
+and the response body size. Results can be saved as a JSON baseline and
+later runs compared against it:
+
+    python benchmarks/routes.py --seed --save benchmarks/baseline.json
+    python benchmarks/routes.py --compare benchmarks/baseline.json
+
+Point --database-url at a scratch database: the write routes really write.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def venue_form(venue):
+    return {
+        "name": venue.name, "city": venue.city, "state": venue.state,
+        "address": venue.address or '1 Main St', "phone": venue.phone,
+        "genres": venue.genres, "image_link": venue.image_link or '',
+        "facebook_link": venue.facebook_link or '',
+        "website": venue.website or '',
+        "seeking_description": venue.seeking_description or '',
+    }
+
+
+def artist_form(artist):
+    return {
+        "name": artist.name, "city": artist.city, "state": artist.state,
+        "phone": artist.phone, "genres": artist.genres,
+        "image_link": artist.image_link or '',
+        "facebook_link": artist.facebook_link or '',
+        "website": artist.website or '',
+        "seeking_description": artist.seeking_description or '',
+    }
+
+
+def build_requests():
+    from models import db, Venue, Artist, Show
+    # the busiest venue and artist give the worst-case detail pages
+    venue_id = db.session.query(Show.venue_id).group_by(Show.venue_id).order_by(
+        db.func.count(Show.id).desc()).limit(1).scalar()
+    artist_id = db.session.query(Show.artist_id).group_by(
+        Show.artist_id).order_by(db.func.count(Show.id).desc()).limit(1).scalar()
+    if venue_id is None or artist_id is None:
+        sys.exit('No shows in the database, run with --seed first.')
+    venue = Venue.query.get(venue_id)
+    artist = Artist.query.get(artist_id)
+    new_venue = dict(venue_form(venue), name='Benchmark Venue')
+    new_artist = dict(artist_form(artist), name='Benchmark Artist')
+
+    def disposable_venue():
+        doomed = Venue(**dict(venue_form(venue), name='Disposable Venue'))
+        db.session.add(doomed)
+        db.session.commit()
+        return '/venues/{}'.format(doomed.id)
+
+    def disposable_artist():
+        doomed = Artist(**dict(artist_form(artist), name='Disposable Artist'))
+        db.session.add(doomed)
+        db.session.commit()
+        return '/artists/{}'.format(doomed.id)
+
+    show = {"venue_id": str(venue_id), "artist_id": str(artist_id),
+            "start_time": '2031-01-01 20:00:00'}
+    return {
+        'main.index': ('GET', '/', None),
+        'venues.venues': ('GET', '/venues', None),
+        'venues.search_venues': ('POST', '/venues/search', {"search_term": 'blue'}),
+        'venues.show_venue': ('GET', '/venues/{}'.format(venue_id), None),
+        'venues.create_venue_form': ('GET', '/venues/create', None),
+        'venues.create_venue_submission': ('POST', '/venues/create', new_venue),
+        'venues.delete_venue': ('DELETE', disposable_venue, None),
+        'artists.delete_artist': ('DELETE', disposable_artist, None),
+        'artists.artists': ('GET', '/artists', None),
+        'artists.search_artists': ('POST', '/artists/search', {"search_term": 'the'}),
+        'artists.show_artist': ('GET', '/artists/{}'.format(artist_id), None),
+        'artists.edit_artist': ('GET', '/artists/{}/edit'.format(artist_id), None),
+        'artists.edit_artist_submission': ('POST', '/artists/{}/edit'.format(
+            artist_id), artist_form(artist)),
+        'venues.edit_venue': ('GET', '/venues/{}/edit'.format(venue_id), None),
+        'venues.edit_venue_submission': ('POST', '/venues/{}/edit'.format(
+            venue_id), venue_form(venue)),
+        'artists.create_artist_form': ('GET', '/artists/create', None),
+        'artists.create_artist_submission': ('POST', '/artists/create', new_artist),
+        'shows.shows': ('GET', '/shows', None),
+        'shows.create_shows': ('GET', '/shows/create', None),
+        'shows.create_show_submission': ('POST', '/shows/create', show),
+        'shows.create_show_batch': ('GET', '/shows/batch', None),
+        'shows.create_residency': ('GET', '/residencies/create', None),
+        'shows.autocomplete': ('GET', '/autocomplete/artists?q=the', None),
+        'api.venues': ('GET', '/api/v1/venues', None),
+        'api.show_venue': ('GET', '/api/v1/venues/{}'.format(venue_id), None),
+        'api.venue_slots': ('GET', '/api/v1/venues/{}/slots'.format(venue_id),
+                            None),
+        'api.artists': ('GET', '/api/v1/artists', None),
+        'api.show_artist': ('GET', '/api/v1/artists/{}'.format(artist_id),
+                            None),
+        'api.shows': ('GET', '/api/v1/shows?limit=30', None),
+    }
+
+
+def run(app, iterations, warmup, only=None):
+    from models import db
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        requests = build_requests()
+        event.listen(db.engine, 'before_cursor_execute', count)
+    missing = sorted(
+        rule.endpoint for rule in app.url_map.iter_rules()
+        if rule.endpoint != 'static' and rule.endpoint not in requests)
+    if missing:
+        print('warning: no benchmark request for ' + ', '.join(missing))
+
+    client = app.test_client()
+    results = {}
+    for endpoint, (method, url, data) in requests.items():
+        if only and endpoint not in only:
+            continue
+
+        def call():
+            with app.app_context():
+                target = url() if callable(url) else url
+            statements[0] = 0
+            started = time.perf_counter()
+            response = client.open(target, method=method, data=data)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 500:
+                raise RuntimeError('{} {} returned {}'.format(
+                    method, target, response.status_code))
+            return elapsed, statements[0], len(response.get_data())
+
+        for _ in range(warmup):
+            call()
+        timings, queries = [], []
+        for _ in range(iterations):
+            elapsed, executed, size = call()
+            timings.append(elapsed * 1000)
+            queries.append(executed)
+
+        # memory is measured in its own pass, tracing skews the timings
+        tracemalloc.start()
+        peak = 0
+        for _ in range(max(1, iterations // 10)):
+            tracemalloc.reset_peak()
+            call()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        results[endpoint] = {
+            "method": method,
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p90_ms": round(percentile(timings, 90), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "mean_ms": round(statistics.mean(timings), 3),
+            "queries": max(queries),
+            "peak_kib": round(peak / 1024.0, 1),
+            "response_kib": round(size / 1024.0, 1),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for endpoint, current in sorted(results.items()):
+        before = baseline.get(endpoint)
+        if before is None:
+            continue
+        if current['queries'] > before['queries']:
+            regressions.append('{}: {} queries, baseline {}'.format(
+                endpoint, current['queries'], before['queries']))
+        if current['p90_ms'] > before['p90_ms'] * (1 + tolerance):
+            regressions.append('{}: p90 {:.2f} ms, baseline {:.2f} ms'.format(
+                endpoint, current['p90_ms'], before['p90_ms']))
+        if current['peak_kib'] > before['peak_kib'] * (1 + tolerance):
+            regressions.append('{}: peak {:.1f} KiB, baseline {:.1f} KiB'.format(
+                endpoint, current['peak_kib'], before['peak_kib']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url',
+                        help='defaults to SQLALCHEMY_DATABASE_URI')
+    parser.add_argument('--seed', action='store_true',
+                        help='seed synthetic data before running')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', nargs='*', help='endpoints to run')
+    parser.add_argument('--save', help='write results as a JSON baseline')
+    parser.add_argument('--compare', help='JSON baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative slowdown (default 0.25)')
+    args = parser.parse_args()
+
+    from app import create_app
+    from config import get_config
+    from models import db
+    from seed import seed
+    config = get_config()
+    if args.database_url:
+        # into the profile, so nothing the factory builds sees the default
+        config = type('BenchmarkConfig', (config,), {
+            'SQLALCHEMY_DATABASE_URI': args.database_url})
+    app = create_app(config)
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    if args.seed:
+        with app.app_context():
+            db.create_all()
+            seed(args.venues, args.artists, args.shows, seed=1)
+
+    results = run(app, args.iterations, args.warmup, args.only)
+    print('{:<26} {:>9} {:>9} {:>9} {:>8} {:>10} {:>10}'.format(
+        'endpoint', 'p50 ms', 'p90 ms', 'p99 ms', 'queries', 'peak KiB',
+        'body KiB'))
+    for endpoint, row in results.items():
+        print('{:<26} {p50_ms:>9.2f} {p90_ms:>9.2f} {p99_ms:>9.2f} '
+              '{queries:>8} {peak_kib:>10.1f} {response_kib:>10.1f}'.format(
+                  endpoint, **row))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(),
+                    "iterations": args.iterations,
+                },
+                "routes": results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['routes']
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print('REGRESSION ' + line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
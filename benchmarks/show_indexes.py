@@ -0,0 +1,157 @@
+"""Before/after benchmark for the show and genre indexes.
+
+Seeds a scratch PostgreSQL database, then runs the access paths used by
+app.py with the indexes from migration bd3cb8e8721f dropped and again with
+them created, printing the EXPLAIN plan and median timing of each query.
+
+    python benchmarks/show_indexes.py postgresql://localhost/fyyur_bench \\
+        --venues 2000 --artists 10000 --shows 1000000
+
+The database is dropped and recreated from the models, so never point this
+at real data.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from models import db  # noqa: E402
+from booking import OVERLAP_CONSTRAINTS  # noqa: E402
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic',
+          'Folk', 'Funk', 'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz',
+          'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae', 'Rock n Roll',
+          'Soul', 'Other']
+
+INDEXES = {
+    'ix_show_venue_id_start_time':
+        'CREATE INDEX ix_show_venue_id_start_time ON show (venue_id, start_time)',
+    'ix_show_artist_id_start_time':
+        'CREATE INDEX ix_show_artist_id_start_time ON show (artist_id, start_time)',
+    'ix_show_start_time_id':
+        'CREATE INDEX ix_show_start_time_id ON show (start_time, id)',
+    'ix_venue_genres':
+        'CREATE INDEX ix_venue_genres ON venue USING gin (genres)',
+    'ix_artist_genres':
+        'CREATE INDEX ix_artist_genres ON artist USING gin (genres)',
+}
+
+QUERIES = {
+    'venue past shows': (
+        'SELECT show.start_time, artist.id, artist.name, artist.image_link '
+        'FROM show JOIN artist ON artist.id = show.artist_id '
+        'WHERE show.venue_id = :venue_id AND show.start_time < now()'),
+    'artist upcoming shows': (
+        'SELECT show.start_time, venue.id, venue.name, venue.image_link '
+        'FROM show JOIN venue ON venue.id = show.venue_id '
+        'WHERE show.artist_id = :artist_id AND show.start_time >= now()'),
+    'shows keyset page': (
+        'SELECT show.id, show.start_time FROM show '
+        'WHERE show.start_time > now() ORDER BY show.start_time, show.id '
+        'LIMIT 30'),
+    'venues by genre': (
+        "SELECT id, name FROM venue WHERE genres @> ARRAY['Jazz']::varchar[]"),
+    'artists by genre': (
+        "SELECT id, name FROM artist WHERE genres @> ARRAY['Soul']::varchar[]"),
+}
+
+
+def seed(engine, venues, artists, shows):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    genres = 'ARRAY[{}]::varchar[]'.format(
+        ', '.join("'{}'".format(g.replace("'", "''")) for g in GENRES))
+    with engine.begin() as conn:
+        for table, count in (('venue', venues), ('artist', artists)):
+            conn.execute(text(
+                "INSERT INTO {0} (name, city, state, phone, genres, updated_at) "
+                "SELECT '{0} ' || n, 'City ' || (n % 200), 'CA', "
+                "'555-555-5555', ARRAY[({1})[1 + n % 19], ({1})[1 + n % 7]], "
+                "now() FROM generate_series(1, :count) AS n".format(
+                    table, genres)), count=count)
+        # skew shows towards popular venues and artists, spread over +-2 years;
+        # the skew double books the popular ones, so the overlap constraints
+        # go: they are not what this benchmark measures
+        for constraint in OVERLAP_CONSTRAINTS:
+            conn.execute(text('ALTER TABLE show DROP CONSTRAINT {}'.format(
+                constraint)))
+        conn.execute(text(
+            "INSERT INTO show (venue_id, artist_id, start_time, end_time, "
+            "updated_at) "
+            "SELECT venue_id, artist_id, start_time, "
+            "start_time + interval '2 hours', now() FROM ("
+            "SELECT 1 + floor(power(random(), 3) * :venues)::int AS venue_id, "
+            "1 + floor(power(random(), 2) * :artists)::int AS artist_id, "
+            "now() + (random() * 1460 - 730) * interval '1 day' AS start_time "
+            "FROM generate_series(1, :shows)) AS shows"),
+            venues=venues, artists=artists, shows=shows)
+        conn.execute(text('ANALYZE'))
+
+
+def run_queries(engine, repeat):
+    results = {}
+    params = {'venue_id': 1, 'artist_id': 1}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            plan = [row[0] for row in conn.execute(
+                text('EXPLAIN ' + sql), params)]
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                'median_ms': round(statistics.median(timings), 3),
+                'plan': plan,
+            }
+    return results
+
+
+def set_indexes(engine, enabled):
+    with engine.begin() as conn:
+        for name, ddl in INDEXES.items():
+            conn.execute(text('DROP INDEX IF EXISTS {}'.format(name)))
+            if enabled:
+                conn.execute(text(ddl))
+        conn.execute(text('ANALYZE'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('database_url')
+    parser.add_argument('--venues', type=int, default=2000)
+    parser.add_argument('--artists', type=int, default=10000)
+    parser.add_argument('--shows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != 'postgresql':
+        parser.error('the index benchmark needs a PostgreSQL database')
+    seed(engine, args.venues, args.artists, args.shows)
+
+    report = {}
+    for label, enabled in (('before', False), ('after', True)):
+        set_indexes(engine, enabled)
+        report[label] = run_queries(engine, args.repeat)
+
+    for name in QUERIES:
+        before, after = report['before'][name], report['after'][name]
+        print('{}: {:.3f} ms -> {:.3f} ms'.format(
+            name, before['median_ms'], after['median_ms']))
+        print('  before: ' + before['plan'][0].strip())
+        print('  after:  ' + after['plan'][0].strip())
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+import heapq
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from models import (db, Venue, Artist, Show, DEFAULT_SHOW_MINUTES,
+                    MAX_SHOW_MINUTES)
+from forms import ShowEntryForm
+from counters import apply_shows
+from extensions import view_cache
+from recurrence import clashes, residency_slots
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#----------------------------------------------------------------------------#
+
+# A venue, and an artist, plays one show at a time: no two of their shows
+# may overlap as [start_time, end_time) ranges. On PostgreSQL two exclusion
+# constraints over GiST indexes refuse the insert or update (migration
+# e5b7c9d1f3a2). SQLite has no exclusion constraints, so triggers keep the
+# shows in an R*Tree, SQLite's interval index, to the minute and abort on
+# an overlap. Either way the check is an index lookup, and the error names
+# the constraint, see conflict().
+
+OVERLAP_CONSTRAINTS = {
+    'show_venue_overlap': 'venue',
+    'show_artist_overlap': 'artist',
+}
+
+POSTGRES_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    "ALTER TABLE show ADD CONSTRAINT show_venue_overlap EXCLUDE USING gist "
+    "(venue_id WITH =, tsrange(start_time, end_time) WITH &&)",
+    "ALTER TABLE show ADD CONSTRAINT show_artist_overlap EXCLUDE USING gist "
+    "(artist_id WITH =, tsrange(start_time, end_time) WITH &&)",
+]
+
+# whole minutes since the epoch, the end rounded up, fit rtree_i32
+SQLITE_START = "CAST(strftime('%s', new.start_time) AS INTEGER) / 60"
+SQLITE_END = "CAST(strftime('%s', new.end_time, '+59 seconds') AS INTEGER) / 60"
+SQLITE_CHECK = (
+    "SELECT RAISE(ABORT, 'show_{0}_overlap') WHERE EXISTS ("
+    "SELECT 1 FROM show_slot WHERE start_minute < {end} "
+    "AND end_minute > {start} AND {0}_lo <= new.{0}_id "
+    "AND {0}_hi >= new.{0}_id{other}); ")
+SQLITE_SLOT = (
+    "INSERT INTO show_slot VALUES (new.id, {start}, {end}, new.venue_id, "
+    "new.venue_id, new.artist_id, new.artist_id); ")
+SQLITE_MOVED = (
+    "WHEN new.venue_id IS NOT old.venue_id "
+    "OR new.artist_id IS NOT old.artist_id "
+    "OR new.start_time IS NOT old.start_time "
+    "OR new.end_time IS NOT old.end_time ")
+
+
+def _sqlite_statements():
+    check = ''.join(SQLITE_CHECK.format(
+        kind, start=SQLITE_START, end=SQLITE_END, other='')
+        for kind in ('venue', 'artist'))
+    recheck = ''.join(SQLITE_CHECK.format(
+        kind, start=SQLITE_START, end=SQLITE_END, other=' AND id != old.id')
+        for kind in ('venue', 'artist'))
+    slot = SQLITE_SLOT.format(start=SQLITE_START, end=SQLITE_END)
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS show_slot USING rtree_i32("
+        "id, start_minute, end_minute, venue_lo, venue_hi, "
+        "artist_lo, artist_hi)",
+        "CREATE TRIGGER IF NOT EXISTS show_slot_bi BEFORE INSERT ON show "
+        "BEGIN " + check + "END",
+        "CREATE TRIGGER IF NOT EXISTS show_slot_ai AFTER INSERT ON show "
+        "BEGIN " + slot + "END",
+        "CREATE TRIGGER IF NOT EXISTS show_slot_bu BEFORE UPDATE ON show " +
+        SQLITE_MOVED + "BEGIN " + recheck + "END",
+        "CREATE TRIGGER IF NOT EXISTS show_slot_au AFTER UPDATE ON show " +
+        SQLITE_MOVED + "BEGIN DELETE FROM show_slot WHERE id = old.id; " +
+        slot + "END",
+        "CREATE TRIGGER IF NOT EXISTS show_slot_ad AFTER DELETE ON show "
+        "BEGIN DELETE FROM show_slot WHERE id = old.id; END",
+    ]
+
+
+def create_overlap_checks(target, connection, **kw):
+    created = kw.get('tables')
+    if created is not None and Show.__table__ not in created:
+        return
+    if connection.dialect.name == 'postgresql':
+        statements = POSTGRES_STATEMENTS
+    elif connection.dialect.name == 'sqlite':
+        statements = _sqlite_statements()
+    else:
+        return
+    for statement in statements:
+        connection.execute(statement)
+
+
+def drop_overlap_checks(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    dropped = kw.get('tables')
+    if dropped is None or Show.__table__ in dropped:
+        connection.execute('DROP TABLE IF EXISTS show_slot')
+
+
+event.listen(db.metadata, 'after_create', create_overlap_checks)
+event.listen(db.metadata, 'before_drop', drop_overlap_checks)
+
+
+def conflict(error):
+    # 'venue' or 'artist' when an IntegrityError is a double booking
+    message = str(getattr(error, 'orig', error))
+    for constraint, kind in OVERLAP_CONSTRAINTS.items():
+        if constraint in message:
+            return kind
+    return None
+
+#----------------------------------------------------------------------------#
+# Available slots.
+#----------------------------------------------------------------------------#
+
+
+def booked(venue_id, start, end):
+    # no show runs longer than MAX_SHOW_MINUTES, so the shows overlapping
+    # [start, end) are a bounded range of the (venue_id, start_time) index
+    shows = db.session.query(Show.start_time, Show.end_time).filter(
+        Show.venue_id == venue_id,
+        Show.start_time > start - timedelta(minutes=MAX_SHOW_MINUTES),
+        Show.start_time < end,
+        Show.end_time > start).order_by(Show.start_time)
+    # residencies hold the venue too, on their occurrences
+    return heapq.merge(shows, residency_slots(venue_id, start, end))
+
+
+def available_slots(venue_id, start, end, minutes=DEFAULT_SHOW_MINUTES):
+    # the free stretches of at least `minutes` between start and end
+    length = timedelta(minutes=minutes)
+    slots = []
+    free_from = start
+    for show_start, show_end in booked(venue_id, start, end):
+        if show_start - free_from >= length:
+            slots.append((free_from, show_start))
+        free_from = max(free_from, show_end)
+    if end - free_from >= length:
+        slots.append((free_from, end))
+    return slots
+
+#----------------------------------------------------------------------------#
+# Batch booking.
+#----------------------------------------------------------------------------#
+
+# A tour books its shows in one request. Every row is checked before
+# anything is written: the show form rules, the ids of all rows in one
+# query per table, overlaps between the rows themselves and with the
+# occurrences of residencies, which no constraint sees. The good rows
+# go in with one executemany. Only when the database refuses that, a show
+# booked meanwhile, are they retried one at a time to find the culprits.
+# atomic=True writes nothing unless every row is good; atomic=False
+# commits the good rows and reports the others.
+
+
+class BatchResult(object):
+
+    def __init__(self):
+        self.created = []
+        # row index -> {field: message}
+        self.errors = {}
+
+    def reject(self, index, field, message):
+        self.errors.setdefault(index, {}).setdefault(field, message)
+
+
+def _formdata(row):
+    return MultiDict({key: '' if value is None else str(value)
+                      for key, value in row.items()})
+
+
+def _check_ids(entries, result):
+    for model, field in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+        wanted = set(data[field] for _, data in entries)
+        found = set(entity_id for entity_id, in db.session.query(
+            model.id).filter(model.id.in_(wanted))) if wanted else set()
+        for index, data in entries:
+            if data[field] not in found:
+                result.reject(index, field,
+                              'Unknown {}'.format(model.__tablename__))
+
+
+def _check_overlaps(entries, result):
+    for field in ('venue_id', 'artist_id'):
+        owner, booked_until = None, None
+        for index, data in sorted(entries, key=lambda entry: (
+                entry[1][field], entry[1]['start_time'])):
+            if data[field] != owner:
+                owner, booked_until = data[field], None
+            if booked_until is not None and data['start_time'] < booked_until:
+                result.reject(index, field,
+                              'Overlaps another show in this batch.')
+            booked_until = max(booked_until or data['end_time'],
+                               data['end_time'])
+
+
+def _check_residencies(entries, result):
+    found = clashes([(data['venue_id'], data['artist_id'], data['start_time'],
+                      data['end_time']) for _, data in entries])
+    for position, kind in found.items():
+        result.reject(entries[position][0], kind + '_id', 'The {} has a '
+                      'residency at that time.'.format(kind))
+
+
+def _insert(values):
+    db.session.execute(Show.__table__.insert(), values)
+    # same savepoint as the rows, bulk inserts skip the mapper events
+    apply_shows(db.session.connection(), [
+        (value["venue_id"], value["artist_id"], value["start_time"])
+        for value in values])
+
+
+def book_shows(rows, atomic=True):
+    result = BatchResult()
+    entries = []
+    for index, row in enumerate(rows):
+        form = ShowEntryForm(formdata=_formdata(row))
+        if not form.validate():
+            for field, messages in form.errors.items():
+                result.reject(index, field, messages[0])
+            continue
+        data = dict(form.data)
+        data['end_time'] = data['start_time'] + timedelta(
+            minutes=data['duration'])
+        entries.append((index, data))
+    _check_ids(entries, result)
+    _check_overlaps(entries, result)
+    entries = [(index, data) for index, data in entries
+               if index not in result.errors]
+    _check_residencies(entries, result)
+    entries = [(index, data) for index, data in entries
+               if index not in result.errors]
+    if not entries or (atomic and result.errors):
+        return result
+
+    now = datetime.utcnow()
+    values = [{
+        "venue_id": data['venue_id'],
+        "artist_id": data['artist_id'],
+        "start_time": data['start_time'],
+        "end_time": data['end_time'],
+        "updated_at": now,
+    } for _, data in entries]
+    try:
+        with db.session.begin_nested():
+            _insert(values)
+        result.created = [index for index, _ in entries]
+    except IntegrityError:
+        for (index, _), value in zip(entries, values):
+            try:
+                with db.session.begin_nested():
+                    _insert([value])
+                result.created.append(index)
+            except IntegrityError as e:
+                kind = conflict(e)
+                if kind is None:
+                    result.reject(index, 'show', str(
+                        getattr(e, 'orig', e)).strip())
+                else:
+                    result.reject(index, kind + '_id', 'The {} already has '
+                                  'a show at that time.'.format(kind))
+        if atomic and result.errors:
+            db.session.rollback()
+            result.created = []
+            return result
+    db.session.commit()
+
+    created_rows = set(result.created)
+    created = [value for (index, _), value in zip(entries, values)
+               if index in created_rows]
+    view_cache.delete(*sorted(
+        set('venue:%d' % value["venue_id"] for value in created) |
+        set('artist:%d' % value["artist_id"] for value in created)))
+    return result
@@ -0,0 +1,124 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+#----------------------------------------------------------------------------#
+# View-model cache.
+#----------------------------------------------------------------------------#
+
+# Detail pages cache the dict handed to the template, keyed by entity, e.g.
+# 'venue:3', together with the version its ETag is built from; an entry
+# whose version is not the current one is a miss. That is what keeps every
+# worker's 'lru' cache correct: the deletes a write makes only reach the
+# process that served it, and free the memory early. Entries also carry
+# their own expiry so a page can be dropped the moment its next upcoming
+# show starts.
+
+
+class NullCache(object):
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(object):
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        if timeout <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(object):
+    # works with any client exposing get/setex/delete, e.g. redis-py
+
+    def __init__(self, client, prefix='fyyur:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, prefix='fyyur:'):
+        import redis
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        timeout = int(timeout)
+        if timeout <= 0:
+            return
+        self.client.setex(self.prefix + key, timeout,
+                          pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        pass
+
+
+def make_cache(config):
+    cache_type = config.get('VIEW_CACHE_TYPE', 'lru')
+    if cache_type == 'lru':
+        return LRUCache(config.get('VIEW_CACHE_MAX_ENTRIES', 1024))
+    if cache_type == 'redis':
+        return RedisCache.from_url(config['VIEW_CACHE_REDIS_URL'],
+                                   config.get('VIEW_CACHE_PREFIX', 'fyyur:'))
+    if cache_type == 'null':
+        return NullCache()
+    raise ValueError('Unknown VIEW_CACHE_TYPE: {}'.format(cache_type))
+
+
+def timeout_until(now, upcoming_shows, max_timeout):
+    # seconds the view model stays correct: until the earliest upcoming show
+    # turns into a past show, but never longer than max_timeout
+    timeout = max_timeout
+    if upcoming_shows:
+        first = min(show['start_time'] for show in upcoming_shows)
+        timeout = min(timeout, (first - now).total_seconds())
+    return timeout
@@ -0,0 +1,101 @@
+import hashlib
+from flask import Response, abort, make_response, request, session
+from models import db, Venue, Artist, Show, Residency
+from recurrence import related_page_keys, residency_version
+
+#----------------------------------------------------------------------------#
+# Cache invalidation.
+#----------------------------------------------------------------------------#
+
+# Venue pages show artist names and images and artist pages show venue
+# names and images, so those fields invalidate the other side as well.
+
+
+def venue_page_keys(venue_id, related=False):
+    keys = ['venue:%d' % venue_id]
+    if related:
+        keys.extend('artist:%d' % artist_id for artist_id, in db.session.query(
+            Show.artist_id).filter(Show.venue_id == venue_id).distinct())
+        keys.extend(related_page_keys(Venue, [venue_id]))
+    return keys
+
+
+def artist_page_keys(artist_id, related=False):
+    keys = ['artist:%d' % artist_id]
+    if related:
+        keys.extend('venue:%d' % venue_id for venue_id, in db.session.query(
+            Show.venue_id).filter(Show.artist_id == artist_id).distinct())
+        keys.extend(related_page_keys(Artist, [artist_id]))
+    return keys
+
+#----------------------------------------------------------------------------#
+# Conditional requests.
+#----------------------------------------------------------------------------#
+
+# Pages carry an ETag built from the updated_at columns they depend on plus
+# the start time of the next upcoming show, the moment a page changes with
+# no write at all. The version query runs before any rendering, so a
+# matching If-None-Match costs one aggregate query.
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def not_modified(etag, last_modified):
+    # flashed messages are part of the page, so they always force a render
+    if '_flashes' in session or not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def conditional(body, etag, last_modified):
+    response = make_response(body)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def next_show_start(now, *criteria):
+    return db.session.query(db.func.min(Show.start_time)).filter(
+        Show.start_time >= now, *criteria).as_scalar()
+
+
+def table_version(model):
+    return [db.session.query(db.func.count(model.id)).as_scalar(),
+            db.session.query(db.func.max(model.updated_at)).as_scalar()]
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def detail_version(model, entity_id, other, now):
+    # version of a venue or artist page: the entity itself, its shows and
+    # the entities on the other side of those shows
+    if model is Venue:
+        join_on, other_on = Show.venue_id == Venue.id, Artist.id == Show.artist_id
+        residency_of = Residency.venue_id
+    else:
+        join_on, other_on = Show.artist_id == Artist.id, Venue.id == Show.venue_id
+        residency_of = Residency.artist_id
+    row = db.session.query(
+        model.updated_at, db.func.max(Show.updated_at),
+        db.func.max(other.updated_at), db.func.count(Show.id),
+        db.func.min(db.case([(Show.start_time >= now, Show.start_time)])),
+        db.session.query(db.func.count(Residency.id)).filter(
+            residency_of == entity_id).as_scalar()
+    ).outerjoin(Show, join_on).outerjoin(other, other_on).filter(
+        model.id == entity_id).group_by(model.updated_at).first()
+    if row is None:
+        abort(404)
+    # residencies cost a second query, only on the pages that have them
+    residencies = residency_version(model, entity_id, other, now) \
+        if row[-1] else ()
+    return make_etag(model.__tablename__, entity_id, *(
+        tuple(row) + residencies)), latest(*(row[:3] + residencies[:2]))
@@ -0,0 +1,142 @@
+import sys
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models import db
+from formatting import parse_datetime
+from areas import area_index
+from assets import build as build_assets
+from counters import rollover, reconcile
+from deletion import MODELS as DELETE_MODELS, delete_entities
+from exporter import (MODELS as EXPORT_MODELS, FORMATS as EXPORT_FORMATS,
+                      export)
+from importer import ImportReport, import_rows, read_rows
+from seed import seed
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+# create_app() only loads this module under the flask command, so serving
+# requests never imports the migration, seeding, import and export code.
+
+
+@click.command('seed')
+@with_appcontext
+@click.option('--venues', default=100, help='Number of venues to create.')
+@click.option('--artists', default=500, help='Number of artists to create.')
+@click.option('--shows', default=5000, help='Number of shows to create.')
+@click.option('--seed', 'random_seed', type=int, default=None,
+              help='Random seed, for a reproducible dataset.')
+def seed_command(venues, artists, shows, random_seed):
+    """Fill the database with synthetic venues, artists and shows."""
+    created = seed(venues, artists, shows, seed=random_seed)
+    area_index.invalidate()
+    click.echo('Created {} venues, {} artists and {} shows.'.format(*created))
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static/ into ASSETS_DIR."""
+    manifest = build_assets(current_app.static_folder,
+                            current_app.config['ASSETS_DIR'])
+    click.echo('Built {} assets into {}.'.format(
+        len(manifest), current_app.config['ASSETS_DIR']))
+
+
+@click.command('rollover-counters')
+@with_appcontext
+def rollover_counters_command():
+    """Move shows that have started from the upcoming to the past counts.
+
+    Run it from cron every minute; the listing counts lag by at most the
+    interval between runs.
+    """
+    with db.engine.begin() as connection:
+        moved = rollover(connection)
+    click.echo('Rolled over {} shows.'.format(moved))
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+@click.option('--fix', is_flag=True, help='Overwrite wrong counters.')
+def reconcile_counters_command(fix):
+    """Check the show counters on venues and artists against the shows."""
+    with db.engine.begin() as connection:
+        mismatches = reconcile(connection, fix=fix)
+    for table, entity_id, stored, real in mismatches:
+        click.echo('{} {}: stored {}/{} upcoming/past, counted {}/{}'.format(
+            table, entity_id, stored[0], stored[1], real[0], real[1]))
+    click.echo('{} counters {}.'.format(
+        len(mismatches), 'fixed' if fix else 'wrong'))
+    if mismatches and not fix:
+        sys.exit(1)
+
+
+@click.command('import')
+@with_appcontext
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+              help='File format, guessed from the file name by default.')
+@click.option('--batch-size', default=1000, help='Rows per insert batch.')
+@click.option('--rejects', type=click.File('w', encoding='utf-8'),
+              help='Write rejected rows and the reason to this file.')
+def import_command(kind, source, file_format, batch_size, rejects):
+    """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+    if file_format is None:
+        file_format = 'csv' if source.name.endswith('.csv') else 'ndjson'
+
+    def progress(report):
+        click.echo('{}: {} loaded, {} rejected'.format(
+            kind, report.loaded, report.rejected), err=True)
+
+    report = import_rows(kind, read_rows(source, file_format),
+                         batch_size=batch_size,
+                         report=ImportReport(rejects), progress=progress)
+    area_index.invalidate()
+    click.echo('Imported {} {}, rejected {}.'.format(
+        report.loaded, kind, report.rejected))
+
+
+@click.command('export')
+@with_appcontext
+@click.argument('kind', type=click.Choice(sorted(EXPORT_MODELS)))
+@click.option('--format', 'file_format', default='ndjson',
+              type=click.Choice(sorted(EXPORT_FORMATS)))
+@click.option('--since', help='Only rows updated after this date and '
+              'time, in UTC unless it carries an offset.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', '-o', type=click.File('wb'), default='-',
+              help='Output file, standard output by default.')
+def export_command(kind, file_format, since, compress, output):
+    """Stream venues, artists or shows out as CSV or NDJSON."""
+    if since:
+        since = parse_datetime(since, utc=True)
+    for chunk in export(kind, file_format, since or None, compress):
+        output.write(chunk)
+
+
+@click.command('delete')
+@with_appcontext
+@click.argument('kind', type=click.Choice(sorted(DELETE_MODELS)))
+@click.argument('ids', nargs=-1, type=int, required=True)
+def delete_command(kind, ids):
+    """Delete venues or artists by id, with all of their shows."""
+    deleted = delete_entities(DELETE_MODELS[kind], ids)
+    missing = sorted(set(ids) - set(deleted))
+    if missing:
+        click.echo('Not found: {}'.format(
+            ', '.join(str(entity_id) for entity_id in missing)), err=True)
+    click.echo('Deleted {} {}.'.format(len(deleted), kind))
+
+
+def init_app(app):
+    # flask db ... needs the Migrate extension, nothing else does
+    from flask_migrate import Migrate
+    Migrate(app, db)
+    for command in (seed_command, build_assets_command,
+                    rollover_counters_command, reconcile_counters_command,
+                    import_command, export_command, delete_command):
+        app.cli.add_command(command)
@@ -0,0 +1,75 @@
+import gzip
+from flask import current_app, request
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Response compression.
+#----------------------------------------------------------------------------#
+
+# Compresses rendered pages and JSON on the way out, using the best
+# encoding the client accepts: br when the brotli package is installed,
+# then gzip. Small bodies, streamed responses (exports compress their own
+# stream) and anything that already has a Content-Encoding are sent as
+# they are.
+
+
+def encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        # brotli quality runs 0-11, gzip levels 1-9
+        return brotli.compress(data, quality=min(11, level + 2))
+    return gzip.compress(data, compresslevel=level)
+
+
+def negotiate(accept_encodings, available):
+    # highest client quality wins, ties go to the order of `available`
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class Compress(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # the settings stay in app.config, read per response, so apps built
+        # with different settings do not share them
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_MIMETYPES', ['text/html'])
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        config = current_app.config
+        if (response.status_code != 200 or response.direct_passthrough or
+                response.is_streamed or
+                'Content-Encoding' in response.headers or
+                response.mimetype not in config['COMPRESS_MIMETYPES']):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = negotiate(request.accept_encodings, encodings())
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, config['COMPRESS_LEVEL']))
+        response.headers['Content-Encoding'] = encoding
+        # same content, different bytes: a strong ETag would be wrong
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -1,14 +1,158 @@
 import os
-SECRET_KEY = os.urandom(32)
+from sqlalchemy.pool import NullPool
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+#----------------------------------------------------------------------------#
+# Profiles.
+#----------------------------------------------------------------------------#
 
-# Connect to the database
+# FYYUR_ENV picks the profile: development (default), testing or production.
+# Anything deployment specific comes from the environment.
 
 
-# DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://localhost:5432/fyyurapp'
-SQLALCHEMY_TRACK_MODIFICATIONS = True
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Config(object):
+    # A random key only works for a single process; production requires a
+    # stable SECRET_KEY so every worker accepts the same CSRF tokens.
+    SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
+    DEBUG = False
+    TESTING = False
+
+    # DATABASE URL
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL', 'postgresql://localhost:5432/fyyurapp')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Listing page sizes
+    SHOWS_PER_PAGE = 30
+    SHOWS_MAX_PER_PAGE = 100
+
+    # Search results
+    SEARCH_PER_PAGE = 20
+    SEARCH_MAX_RESULTS = 500
+
+    # JSON API listings
+    API_PER_PAGE = 50
+    API_MAX_PER_PAGE = 500
+    # ids per DELETE /api/v1/venues or /api/v1/artists request
+    API_MAX_BATCH_DELETE = 1000
+    # longest window GET /api/v1/venues/<id>/slots looks at
+    API_MAX_SLOT_DAYS = 92
+
+    # Show form pickers
+    AUTOCOMPLETE_MAX_RESULTS = 20
+
+    # Shows per batch, on /shows/batch and POST /api/v1/shows
+    SHOW_BATCH_MAX_ROWS = 200
+    SHOW_BATCH_FORM_ROWS = 10
+    # residency occurrences listed on pages, this many days around now
+    RESIDENCY_HORIZON_DAYS = 90
+
+    # Fingerprinted, precompressed static files from `flask build-assets`
+    ASSETS_DIR = os.path.join(basedir, 'build', 'assets')
+
+    # Response compression for pages and JSON at least COMPRESS_MIN_SIZE
+    # bytes long
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIMETYPES = ['text/html', 'application/json', 'text/css',
+                          'application/javascript', 'text/plain']
+
+    # Detail page cache: 'lru' (per process), 'redis' or 'null'
+    VIEW_CACHE_TYPE = os.environ.get('VIEW_CACHE_TYPE', 'lru')
+    VIEW_CACHE_MAX_ENTRIES = 2048
+    VIEW_CACHE_TTL = 300
+    VIEW_CACHE_REDIS_URL = os.environ.get('VIEW_CACHE_REDIS_URL',
+                                          'redis://localhost:6379/0')
+
+    # Listing tiles cached by the {% cache %} template tag, 0 disables
+    FRAGMENT_CACHE_MAX_ENTRIES = 10000
+
+    # SQL instrumentation: slow statements and repeated statements (likely
+    # N+1) are logged to SQL_SLOW_QUERY_LOG when not in debug mode
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    SQL_REPEAT_THRESHOLD = 5
+    SQL_SLOW_QUERY_LOG = os.path.join(basedir, 'slow-query.log')
+
+    # Read replicas: REPLICA_URLS is a comma separated list of database
+    # URLs that receive read-only requests
+    SQLALCHEMY_BINDS = {
+        'replica{}'.format(n): url.strip() for n, url in enumerate(
+            os.environ.get('REPLICA_URLS', '').split(',')) if url.strip()}
+    REPLICA_BINDS = sorted(SQLALCHEMY_BINDS)
+    REPLICA_STICKY_SECONDS = 5
+    REPLICA_RETRY_SECONDS = 30
+    REPLICA_CHECK_SECONDS = 10
+
+    # Metrics: with several worker processes point METRICS_DIR at a
+    # directory shared by the workers and empty it on every deploy
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = 5
+    # the scraper sends it as a bearer token, see metrics.py
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_REQUIRE_TOKEN = False
+
+
+class DevelopmentConfig(Config):
+    # Enable debug mode.
+    DEBUG = True
+    SQLALCHEMY_TRACK_MODIFICATIONS = True
+
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+
+
+class ProductionConfig(Config):
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # /metrics is only served to a scraper holding METRICS_TOKEN
+    METRICS_REQUIRE_TOKEN = True
+
+    # With PGBOUNCER set, PgBouncer in transaction mode does the pooling:
+    # the app opens a connection per checkout and keeps nothing that
+    # outlives a transaction. Otherwise each worker keeps its own pool,
+    # sized so workers * (pool_size + max_overflow) stays under the
+    # server's max_connections.
+    PGBOUNCER = env_flag('PGBOUNCER')
+    if PGBOUNCER:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'poolclass': NullPool,
+        }
+    else:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # drop connections the server or a firewall closed while idle
+            'pool_pre_ping': True,
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        }
+
+
+profiles = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
+
+
+def get_config(name=None):
+    name = name or os.environ.get('FYYUR_ENV', 'development')
+    try:
+        profile = profiles[name]
+    except KeyError:
+        raise RuntimeError('Unknown FYYUR_ENV {!r}, expected one of {}'.format(
+            name, ', '.join(sorted(profiles))))
+    if not profile.SECRET_KEY:
+        raise RuntimeError('SECRET_KEY must be set in the {} profile'.format(
+            name))
+    return profile
@@ -0,0 +1,188 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.orm import attributes
+from models import db, Venue, Artist, Show, CounterWatermark
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#----------------------------------------------------------------------------#
+
+# Venue and Artist carry upcoming_shows_count and past_shows_count. They are
+# exact as of the single CounterWatermark time W: shows starting at or
+# after W count as upcoming, earlier ones as past. Inserting or deleting a
+# show adjusts the two rows it belongs to; `flask rollover-counters`, run
+# from cron every minute, moves shows that started since W over to past
+# and advances W; `flask reconcile-counters` recounts from the show table.
+# None of this is an edit of the venue or artist: the updates keep their
+# updated_at, which tile fragments, listing ETags and exports go by.
+
+watermark_table = CounterWatermark.__table__
+
+
+def watermark(connection, lock=None):
+    # lock='read' for writers adding shows, lock='update' for the rollover,
+    # so a show added during a rollover is counted on the right side of W
+    query = select([watermark_table.c.rolled_over_at]).where(
+        watermark_table.c.id == 1)
+    if lock:
+        query = query.with_for_update(read=lock == 'read')
+    value = connection.execute(query).scalar()
+    if value is None:
+        value = datetime.now()
+        connection.execute(watermark_table.insert().values(
+            id=1, rolled_over_at=value))
+    return value
+
+
+def _apply(connection, deltas):
+    for model, by_id in deltas.items():
+        table = model.__table__
+        rows = [{"_id": entity_id, "_upcoming": upcoming, "_past": past}
+                for entity_id, (upcoming, past) in by_id.items()
+                if upcoming or past]
+        if rows:
+            connection.execute(table.update().where(
+                table.c.id == bindparam('_id')).values(
+                upcoming_shows_count=table.c.upcoming_shows_count +
+                bindparam('_upcoming'),
+                past_shows_count=table.c.past_shows_count + bindparam('_past'),
+                updated_at=table.c.updated_at),
+                rows)
+
+
+def apply_shows(connection, shows, sign=1):
+    # shows: (venue_id, artist_id, start_time) added (sign=1) or removed
+    shows = list(shows)
+    if not shows:
+        return
+    since = watermark(connection, lock='read')
+    deltas = {Venue: defaultdict(lambda: [0, 0]),
+              Artist: defaultdict(lambda: [0, 0])}
+    for venue_id, artist_id, start_time in shows:
+        slot = 0 if start_time >= since else 1
+        deltas[Venue][int(venue_id)][slot] += sign
+        deltas[Artist][int(artist_id)][slot] += sign
+    _apply(connection, deltas)
+
+
+def remove_cascaded(connection, model, ids):
+    # call before deleting venues (or artists) `ids`: the shows the FK
+    # cascade takes along are subtracted from the artists (or venues) on
+    # the other side, in one UPDATE rather than one per show
+    since = watermark(connection, lock='read')
+    show = Show.__table__
+    if model is Venue:
+        own, other_column, table = show.c.venue_id, show.c.artist_id, \
+            Artist.__table__
+    else:
+        own, other_column, table = show.c.artist_id, show.c.venue_id, \
+            Venue.__table__
+
+    def cascaded(condition):
+        return select([db.func.count()]).where(db.and_(
+            other_column == table.c.id, own.in_(ids),
+            condition)).as_scalar()
+
+    connection.execute(table.update().where(table.c.id.in_(
+        select([other_column]).where(own.in_(ids)))).values(
+        upcoming_shows_count=table.c.upcoming_shows_count -
+        cascaded(show.c.start_time >= since),
+        past_shows_count=table.c.past_shows_count -
+        cascaded(show.c.start_time < since),
+        updated_at=table.c.updated_at))
+
+
+def rollover(connection, now=None):
+    now = now or datetime.now()
+    since = watermark(connection, lock='update')
+    if now <= since:
+        return 0
+    moved = 0
+    show = Show.__table__
+    for model, column in ((Venue, show.c.venue_id),
+                          (Artist, show.c.artist_id)):
+        by_id = {}
+        for entity_id, count in connection.execute(
+                select([column, db.func.count()]).where(db.and_(
+                    show.c.start_time >= since,
+                    show.c.start_time < now)).group_by(column)):
+            by_id[entity_id] = (-count, count)
+            if model is Venue:
+                moved += count
+        _apply(connection, {model: by_id})
+    connection.execute(watermark_table.update().where(
+        watermark_table.c.id == 1).values(rolled_over_at=now))
+    return moved
+
+
+def reconcile(connection, fix=False):
+    since = watermark(connection, lock='update' if fix else None)
+    show = Show.__table__
+    mismatches = []
+    for model, column in ((Venue, show.c.venue_id),
+                          (Artist, show.c.artist_id)):
+        table = model.__table__
+        upcoming = db.func.coalesce(db.func.sum(db.case(
+            [(show.c.start_time >= since, 1)], else_=0)), 0)
+        past = db.func.coalesce(db.func.sum(db.case(
+            [(show.c.start_time < since, 1)], else_=0)), 0)
+        rows = connection.execute(select([
+            table.c.id, table.c.upcoming_shows_count,
+            table.c.past_shows_count, upcoming, past]).select_from(
+            table.outerjoin(show, column == table.c.id)).group_by(
+            table.c.id, table.c.upcoming_shows_count,
+            table.c.past_shows_count))
+        by_id = {}
+        for entity_id, stored_upcoming, stored_past, real_upcoming, \
+                real_past in rows:
+            if (stored_upcoming, stored_past) != (real_upcoming, real_past):
+                mismatches.append((table.name, entity_id,
+                                   (stored_upcoming, stored_past),
+                                   (real_upcoming, real_past)))
+                by_id[entity_id] = (real_upcoming - stored_upcoming,
+                                    real_past - stored_past)
+        if fix:
+            _apply(connection, {model: by_id})
+    return mismatches
+
+
+@event.listens_for(Show, 'after_insert')
+def _show_inserted(mapper, connection, target):
+    apply_shows(connection, [(target.venue_id, target.artist_id,
+                              target.start_time)])
+
+
+@event.listens_for(Show, 'after_delete')
+def _show_deleted(mapper, connection, target):
+    apply_shows(connection, [(target.venue_id, target.artist_id,
+                              target.start_time)], sign=-1)
+
+
+COUNTED = ('venue_id', 'artist_id', 'start_time')
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for _name in COUNTED:
+    # load the previous value on change, even when it was expired, so
+    # after_update knows which counters the show used to be in
+    event.listen(getattr(Show, _name), 'set', _load_old_value,
+                 active_history=True)
+
+
+@event.listens_for(Show, 'after_update')
+def _show_updated(mapper, connection, target):
+    old = []
+    for name in COUNTED:
+        history = attributes.get_history(target, name)
+        if not history.has_changes():
+            old.append(getattr(target, name))
+        else:
+            old.append(history.deleted[0] if history.deleted else None)
+    new = (target.venue_id, target.artist_id, target.start_time)
+    if None not in old and tuple(old) != new:
+        apply_shows(connection, [tuple(old)], sign=-1)
+        apply_shows(connection, [new])
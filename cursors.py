@@ -0,0 +1,42 @@
+import base64
+from datetime import datetime
+
+#----------------------------------------------------------------------------#
+# Keyset cursors.
+#----------------------------------------------------------------------------#
+
+# Opaque `after` tokens for keyset pagination, shared by the HTML pages and
+# the JSON API. A token that does not decode gives None and the caller
+# answers 400.
+
+
+def _encode(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode(cursor):
+    return base64.urlsafe_b64decode(cursor.encode()).decode()
+
+
+def encode_show_cursor(start_time, show_id):
+    # position in the (start_time, id) ordering of shows
+    return _encode('{}|{}'.format(start_time.isoformat(), show_id))
+
+
+def decode_show_cursor(cursor):
+    try:
+        start_time, show_id = _decode(cursor).rsplit('|', 1)
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (ValueError, TypeError, OverflowError, UnicodeDecodeError):
+        return None
+
+
+def encode_id_cursor(entity_id):
+    return _encode(str(entity_id))
+
+
+def decode_id_cursor(cursor):
+    try:
+        return int(_decode(cursor))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
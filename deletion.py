@@ -0,0 +1,55 @@
+from sqlalchemy import select
+from models import db, Venue, Artist, Show
+from areas import area_index
+from counters import remove_cascaded
+from extensions import view_cache, fragment_cache
+from fragments import fragment_key
+from recurrence import related_page_keys
+
+#----------------------------------------------------------------------------#
+# Batch delete.
+#----------------------------------------------------------------------------#
+
+# Venues and artists are deleted with one DELETE ... WHERE id IN (...), and
+# their shows and residencies go with them through ON DELETE CASCADE, so
+# no show is loaded.
+# The show counters of the other side are corrected in SQL first, and the
+# cached pages of everything that listed the deleted shows are dropped.
+
+MODELS = {'venues': Venue, 'artists': Artist}
+
+
+def delete_entities(model, ids):
+    table = model.__table__
+    show = Show.__table__
+    if model is Venue:
+        own, other, prefix, other_prefix = show.c.venue_id, \
+            show.c.artist_id, 'venue', 'artist'
+    else:
+        own, other, prefix, other_prefix = show.c.artist_id, \
+            show.c.venue_id, 'artist', 'venue'
+
+    connection = db.session.connection()
+    ids = [entity_id for entity_id, in connection.execute(
+        select([table.c.id]).where(table.c.id.in_(
+            set(ids))).order_by(table.c.id))]
+    if not ids:
+        return ids
+    # collected first: the pages to drop are found through the shows that
+    # the delete cascades away
+    cache_keys = ['%s:%d' % (prefix, entity_id) for entity_id in ids]
+    cache_keys.extend('%s:%d' % (other_prefix, other_id) for other_id, in
+                      connection.execute(select([other]).where(
+                          own.in_(ids)).distinct()))
+    cache_keys.extend(related_page_keys(model, ids))
+
+    remove_cascaded(connection, model, ids)
+    connection.execute(table.delete().where(table.c.id.in_(ids)))
+    db.session.commit()
+
+    if model is Venue:
+        area_index.invalidate()
+    view_cache.delete(*cache_keys)
+    fragment_cache.delete(*[fragment_key('%s-tile' % prefix, entity_id)
+                            for entity_id in ids])
+    return ids
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import zlib
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Streaming export.
+#----------------------------------------------------------------------------#
+
+# Rows come off a server-side cursor (yield_per sets stream_results) and are
+# encoded and optionally gzipped chunk by chunk, so memory stays flat no
+# matter how big the catalog is. Passing since= exports only rows whose
+# updated_at is later, ordered by (updated_at, id) for incremental pulls.
+
+MODELS = {
+    'venues': Venue,
+    'artists': Artist,
+    'shows': Show,
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+FETCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def export_columns(kind):
+    return [column.name for column in MODELS[kind].__table__.columns
+            if column.name != 'search_vector']
+
+
+def export_rows(kind, since=None):
+    model = MODELS[kind]
+    columns = [getattr(model, name) for name in export_columns(kind)]
+    query = db.session.query(*columns)
+    if since is not None:
+        query = query.filter(model.updated_at > since).order_by(
+            model.updated_at, model.id)
+    else:
+        query = query.order_by(model.id)
+    return query.yield_per(FETCH_SIZE)
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            ';'.join(value) if isinstance(value, list) else _value(value)
+            for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_ndjson(columns, rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, (_value(value) for value in row))))
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield '\n'.join(chunk) + '\n'
+            chunk, size = [], 0
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def gzip_chunks(chunks):
+    # wbits=31 writes the gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(kind, format, since=None, compress=False):
+    columns = export_columns(kind)
+    encode = encode_csv if format == 'csv' else encode_ndjson
+    chunks = encode(columns, export_rows(kind, since))
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,24 @@
+from flask import current_app
+from werkzeug.local import LocalProxy
+from instrumentation import SQLInstrumentation
+from metrics import Metrics
+from routing import ReplicaRouter
+from assets import Assets
+from compression import Compress
+
+#----------------------------------------------------------------------------#
+# Extensions.
+#----------------------------------------------------------------------------#
+
+# Created unbound and attached to an app by create_app(), so blueprints can
+# import them without importing the app.
+
+sql_instrumentation = SQLInstrumentation()
+metrics = Metrics()
+replica_router = ReplicaRouter()
+assets = Assets()
+compress = Compress()
+
+# per-app caches, see create_app()
+view_cache = LocalProxy(lambda: current_app.extensions['view_cache'])
+fragment_cache = LocalProxy(lambda: current_app.jinja_env.fragment_cache)
@@ -1,14 +1,26 @@
+import os
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
 # prepare for deployment
 
+# the route benchmark runs against a scratch database seeded afresh each
+# time, and is compared with a baseline taken on the same machine: the
+# first run records it
+BENCHMARK_DATABASE = os.path.abspath('benchmarks/scratch.db')
+BASELINE = 'benchmarks/baseline.json'
+
 
 def test():
+    if os.path.exists(BENCHMARK_DATABASE):
+        os.remove(BENCHMARK_DATABASE)
+    benchmark = "python benchmarks/routes.py --seed --database-url {} {} {}"\
+        .format('sqlite:///' + BENCHMARK_DATABASE,
+                '--compare' if os.path.exists(BASELINE) else '--save',
+                BASELINE)
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q && " + benchmark, capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -38,18 +50,11 @@ def heroku():
     local("git push heroku master")
 
 
-def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
-
-
 def deploy():
     pull()
     test()
     commit()
     heroku()
-    heroku_test()
 
 # rollback
 
@@ -0,0 +1,64 @@
+from datetime import timezone
+from functools import lru_cache
+
+#----------------------------------------------------------------------------#
+# Date formatting.
+#----------------------------------------------------------------------------#
+
+# The datetime filter runs once per show tile. Patterns are compiled once
+# per locale and format, and recent values are memoized: a page of shows
+# repeats a handful of evening start times over and over. babel and
+# dateutil are imported on first use; wsgi.py warms them before the fork.
+
+PATTERNS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=None)
+def compile_pattern(format, locale=None):
+    import babel.dates
+    locale = babel.Locale.parse(locale or babel.dates.LC_TIME)
+    format = PATTERNS.get(format, format)
+    if format in ('full', 'long', 'medium', 'short'):
+        # babel's own named formats
+        return None, locale
+    return babel.dates.parse_pattern(format), locale
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _format(value, format, locale):
+    import babel.dates
+    pattern, locale = compile_pattern(format, locale)
+    if value.tzinfo is None:
+        # same as babel: naive values are displayed as they are
+        value = value.replace(tzinfo=babel.dates.UTC)
+    if pattern is None:
+        return babel.dates.format_datetime(value, format, locale=locale)
+    return pattern.apply(value, locale)
+
+
+def format_datetime(value, format='medium', locale=None):
+    if isinstance(value, str):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    return _format(value, format, locale)
+
+#----------------------------------------------------------------------------#
+# Date parsing.
+#----------------------------------------------------------------------------#
+
+
+def parse_datetime(value, utc=False):
+    # show times are stored naive, in the server's local time, and the
+    # updated_at columns naive in UTC (utc=True); a value with an offset,
+    # e.g. '2030-01-07T20:00:00Z', is converted to the same so that it
+    # compares with them
+    import dateutil.parser
+    value = dateutil.parser.parse(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc if utc else None).replace(
+            tzinfo=None)
+    return value
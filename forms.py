@@ -1,20 +1,100 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.fields.core import BooleanField
-from wtforms.ext.sqlalchemy.fields import QuerySelectField
-from wtforms.validators import DataRequired, AnyOf, Regexp, URL
+from wtforms import (Form, StringField, SelectField, SelectMultipleField,
+                     DateTimeField)
+from wtforms.fields.core import BooleanField, IntegerField
+from wtforms.validators import (DataRequired, InputRequired, AnyOf, Regexp,
+                                URL, NumberRange, Optional,
+                                ValidationError)
+from wtforms.widgets import HiddenInput
+from models import db, Venue, Artist, DEFAULT_SHOW_MINUTES, MAX_SHOW_MINUTES
+
+
+class Exists(object):
+    # checks a submitted id with a primary key lookup instead of loading
+    # every row into the form
+
+    def __init__(self, model, message=None):
+        self.model = model
+        self.message = message or 'Unknown {}'.format(model.__tablename__)
+
+    def __call__(self, form, field):
+        if field.data is None or db.session.query(self.model.id).filter(
+                self.model.id == field.data).first() is None:
+            raise ValidationError(self.message)
 
 
 class ShowForm(FlaskForm):
 
-    artist_id = QuerySelectField('artist_id')
-    venue_id = QuerySelectField('venue_id')
+    artist_id = IntegerField(
+        'artist_id', validators=[InputRequired(), Exists(Artist)],
+        widget=HiddenInput()
+    )
+    venue_id = IntegerField(
+        'venue_id', validators=[InputRequired(), Exists(Venue)],
+        widget=HiddenInput()
+    )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default=datetime.today()
     )
+    # minutes, sets Show.end_time; left out or blank means the default
+    duration = IntegerField(
+        'duration',
+        validators=[Optional(), NumberRange(min=15, max=MAX_SHOW_MINUTES)],
+        filters=[lambda minutes: DEFAULT_SHOW_MINUTES
+                 if minutes is None else minutes],
+        default=DEFAULT_SHOW_MINUTES
+    )
+
+
+class ShowEntryForm(Form):
+    # one show of a batch, see booking.book_shows: the ids of the whole
+    # batch are checked in one query per table instead of one per row
+
+    artist_id = IntegerField('artist_id', validators=[InputRequired()])
+    venue_id = IntegerField('venue_id', validators=[InputRequired()])
+    start_time = DateTimeField('start_time', validators=[DataRequired()])
+    duration = ShowForm.duration
+
+
+class ResidencyForm(FlaskForm):
+    # a show repeating every `interval` days or weeks, see models.Residency
+
+    artist_id = ShowForm.artist_id
+    venue_id = ShowForm.venue_id
+    start_time = ShowForm.start_time
+    duration = ShowForm.duration
+    frequency = SelectField(
+        'frequency',
+        choices=[('WEEKLY', 'Weeks'), ('DAILY', 'Days')],
+        default='WEEKLY'
+    )
+    interval = IntegerField(
+        'interval',
+        validators=[InputRequired(), NumberRange(min=1, max=52)],
+        default=1
+    )
+    # both blank: it runs until cancelled
+    count = IntegerField(
+        'count', validators=[Optional(), NumberRange(min=1)]
+    )
+    until = DateTimeField(
+        'until', validators=[Optional()]
+    )
+
+    def validate_until(self, field):
+        # a value that didn't parse is None, and already has its error
+        if field.data is not None and self.start_time.data and \
+                field.data < self.start_time.data:
+            raise ValidationError('Ends before its first show.')
+
+
+class ShowBatchForm(FlaskForm):
+    # the rows themselves are read from shows-<n>-<field> and go through
+    # ShowEntryForm; this form carries the CSRF token and the mode
+    atomic = BooleanField('atomic', default=True)
 
 
 class VenueForm(FlaskForm):
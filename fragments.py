@@ -0,0 +1,50 @@
+from jinja2 import nodes
+from jinja2.ext import Extension
+from cache import LRUCache
+
+#----------------------------------------------------------------------------#
+# Fragment cache.
+#----------------------------------------------------------------------------#
+
+# {% cache 'venue-tile', venue.id, venue.updated_at %}...{% endcache %}
+# renders the body once and reuses the HTML while the last argument, the
+# version, stays the same. The other arguments make the key, so edit
+# handlers can drop an entity's fragments with fragment_key(). Entries
+# live in a bounded per-process LRU; a stale entry in another worker is
+# never served, its version no longer matches.
+
+FRAGMENT_TTL = 24 * 60 * 60
+
+
+def fragment_key(*parts):
+    return ':'.join(str(part) for part in parts)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super(FragmentCacheExtension, self).__init__(environment)
+        environment.extend(fragment_cache=LRUCache(1024))
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        if len(parts) < 2:
+            parser.fail('cache takes a key and a version', lineno)
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.List(parts[:-1]), parts[-1]]),
+            [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, version, caller):
+        cache = self.environment.fragment_cache
+        key = fragment_key(*parts)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        html = caller()
+        cache.set(key, (version, html), FRAGMENT_TTL)
+        return html
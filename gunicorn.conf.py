@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+
+# gunicorn -c gunicorn.conf.py wsgi:app
+
+bind = os.environ.get('BIND', '0.0.0.0:{}'.format(os.environ.get('PORT', 5000)))
+workers = int(os.environ.get('WEB_CONCURRENCY',
+                             multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 1))
+timeout = 30
+keepalive = 5
+# Import the app once in the master so workers fork with it already loaded.
+preload_app = True
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    # connections opened before the fork must not be shared between workers
+    from wsgi import app
+    from models import db
+    with app.app_context():
+        db.engine.dispose()
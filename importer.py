@@ -0,0 +1,267 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from werkzeug.datastructures import MultiDict
+from models import (db, Venue, Artist, Show, DEFAULT_SHOW_MINUTES,
+                    MAX_SHOW_MINUTES)
+from forms import VenueForm, ArtistForm
+from counters import apply_shows
+from recurrence import clashes
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# Rows are streamed from CSV or NDJSON, validated with the same rules as the
+# create forms, and inserted a batch at a time: COPY on PostgreSQL,
+# executemany elsewhere. A batch the database refuses is retried row by row
+# so one bad row is rejected on its own instead of sinking the load.
+#
+# Shows name their venue and artist by natural key:
+#   venue_name, venue_city, venue_state, artist_name, artist_city,
+#   artist_state, start_time
+# and may give a duration in minutes. A show that double books its venue or
+# artist is refused by the database and rejected like any other bad row.
+# No constraint sees residencies, so each batch is checked against their
+# occurrences before it is written, as book_shows() does.
+# In CSV files genres are separated by ';'.
+
+SHOW_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+
+
+class Rejected(Exception):
+    pass
+
+
+def read_rows(stream, format):
+    if format == 'csv':
+        for row in csv.DictReader(stream):
+            if row.get('genres'):
+                row['genres'] = [genre.strip()
+                                 for genre in row['genres'].split(';')]
+            yield row
+    elif format == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError('Unknown import format: {}'.format(format))
+
+
+def _formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if value is None:
+            continue
+        if key in BOOLEAN_FIELDS:
+            if isinstance(value, str):
+                value = value.strip().lower() in ('1', 'y', 'yes', 'true')
+            if value:
+                data.add(key, 'y')
+        elif isinstance(value, list):
+            for item in value:
+                data.add(key, item)
+        else:
+            data.add(key, str(value))
+    return data
+
+
+def form_validator(form_class, model):
+    columns = set(model.__table__.columns.keys())
+
+    def validate(row):
+        form = form_class(formdata=_formdata(row), meta={'csrf': False})
+        if not form.validate():
+            raise Rejected('; '.join('{}: {}'.format(field, errors[0])
+                                     for field, errors in form.errors.items()))
+        values = {key: value for key, value in form.data.items()
+                  if key in columns}
+        values['updated_at'] = datetime.utcnow()
+        return values
+    return validate
+
+
+class NaturalKeys(object):
+    # resolves (name, city, state) to ids, remembering what it has seen
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def load(self, keys):
+        names = set(key[0] for key in keys if key not in self.ids)
+        if names:
+            model = self.model
+            for row in db.session.query(
+                    model.id, model.name, model.city, model.state).filter(
+                    model.name.in_(names)):
+                self.ids[(row.name, row.city, row.state)] = row.id
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+def show_validator():
+    venues, artists = NaturalKeys(Venue), NaturalKeys(Artist)
+
+    def keys(row):
+        return ((row.get('venue_name'), row.get('venue_city'),
+                 row.get('venue_state')),
+                (row.get('artist_name'), row.get('artist_city'),
+                 row.get('artist_state')))
+
+    def prepare(rows):
+        venues.load([keys(row)[0] for row in rows])
+        artists.load([keys(row)[1] for row in rows])
+
+    def validate(row):
+        venue_key, artist_key = keys(row)
+        venue_id, artist_id = venues.get(venue_key), artists.get(artist_key)
+        if venue_id is None:
+            raise Rejected('unknown venue {}'.format(', '.join(
+                str(part) for part in venue_key)))
+        if artist_id is None:
+            raise Rejected('unknown artist {}'.format(', '.join(
+                str(part) for part in artist_key)))
+        try:
+            start_time = datetime.strptime(
+                str(row.get('start_time', '')).strip(), SHOW_TIME_FORMAT)
+        except ValueError:
+            raise Rejected('start_time: Not a valid datetime value')
+        try:
+            duration = int(row.get('duration') or DEFAULT_SHOW_MINUTES)
+        except ValueError:
+            raise Rejected('duration: Not a valid integer value')
+        if not 15 <= duration <= MAX_SHOW_MINUTES:
+            raise Rejected('duration: Number must be between 15 and {}.'
+                           .format(MAX_SHOW_MINUTES))
+        return {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "start_time": start_time,
+            "end_time": start_time + timedelta(minutes=duration),
+            "updated_at": datetime.utcnow(),
+        }
+    def check(values):
+        # {index: reason} for the validated rows a residency stands in for
+        return {index: 'The {} has a residency at that time.'.format(kind)
+                for index, kind in clashes([(
+                    value["venue_id"], value["artist_id"],
+                    value["start_time"], value["end_time"])
+                    for value in values]).items()}
+
+    validate.prepare = prepare
+    validate.check = check
+    return validate
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        return '{' + ','.join('"{}"'.format(
+            item.replace('\\', '\\\\').replace('"', '\\"'))
+            for item in value) + '}'
+    return value
+
+
+def _copy(table, rows):
+    # quoted empty strings stay '' while None is written bare and loads NULL
+    columns = list(rows[0].keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([_copy_value(row[column]) for column in columns])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        table.name, ', '.join(columns)), buffer)
+
+
+def _insert(table, rows):
+    if db.session.bind.dialect.name == 'postgresql':
+        _copy(table, rows)
+    else:
+        db.session.execute(table.insert(), rows)
+    if table is Show.__table__:
+        # same savepoint as the rows, so a refused batch leaves no counts
+        apply_shows(db.session.connection(), [
+            (row["venue_id"], row["artist_id"], row["start_time"])
+            for row in rows])
+
+
+def _flush(table, batch, report):
+    rows = [row for _, row in batch]
+    try:
+        with db.session.begin_nested():
+            _insert(table, rows)
+        report.loaded += len(rows)
+    except Exception:
+        # find the offending rows one at a time
+        for line, row in batch:
+            try:
+                with db.session.begin_nested():
+                    _insert(table, [row])
+                report.loaded += 1
+            except Exception as e:
+                report.reject(line, str(getattr(e, 'orig', e)).strip())
+    db.session.commit()
+
+
+class ImportReport(object):
+
+    def __init__(self, rejects=None):
+        self.loaded = 0
+        self.rejected = 0
+        self.rejects = rejects
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if self.rejects is not None:
+            self.rejects.write(json.dumps(
+                {"line": line, "reason": reason}) + '\n')
+
+
+def import_rows(kind, rows, batch_size=1000, report=None, progress=None):
+    if kind == 'venues':
+        model, validate = Venue, form_validator(VenueForm, Venue)
+    elif kind == 'artists':
+        model, validate = Artist, form_validator(ArtistForm, Artist)
+    elif kind == 'shows':
+        model, validate = Show, show_validator()
+    else:
+        raise ValueError('Unknown import kind: {}'.format(kind))
+    report = report or ImportReport()
+    prepare = getattr(validate, 'prepare', None)
+    check = getattr(validate, 'check', None)
+
+    pending = []
+
+    def load(pending):
+        if prepare:
+            prepare([row for _, row in pending])
+        batch = []
+        for line, row in pending:
+            try:
+                batch.append((line, validate(row)))
+            except Rejected as e:
+                report.reject(line, str(e))
+        if batch and check:
+            refused = check([row for _, row in batch])
+            for index in sorted(refused):
+                report.reject(batch[index][0], refused[index])
+            batch = [entry for index, entry in enumerate(batch)
+                     if index not in refused]
+        if batch:
+            _flush(model.__table__, batch, report)
+        if progress:
+            progress(report)
+
+    for line, row in enumerate(rows, 1):
+        pending.append((line, row))
+        if len(pending) >= batch_size:
+            load(pending)
+            pending = []
+    if pending:
+        load(pending)
+    return report
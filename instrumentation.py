@@ -0,0 +1,120 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+# Every statement run while handling a request is counted and timed. The
+# totals go out in a Server-Timing header, statements slower than
+# SQL_SLOW_QUERY_MS are written to the 'fyyur.sql' logger, and a statement
+# repeated SQL_REPEAT_THRESHOLD times in one request is reported as a
+# likely N+1 query.
+
+logger = logging.getLogger('fyyur.sql')
+
+
+class RequestStats(object):
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = Counter()
+
+
+def request_stats():
+    return getattr(g, 'sql_stats', None)
+
+
+class SQLInstrumentation(object):
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        # settings are read from the app handling the request, so one
+        # instance serves every app create_app() builds
+        self.db = db
+        app.config.setdefault('SQL_SLOW_QUERY_MS', 100)
+        app.config.setdefault('SQL_REPEAT_THRESHOLD', 5)
+        app.config.setdefault('SQL_SERVER_TIMING', True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        self._listen()
+
+    def _listen(self):
+        # on the Engine class rather than db.engine: read replicas get their
+        # engines on first use, and their statements must be counted too
+        with self._lock:
+            if not self._listening:
+                event.listen(Engine, 'before_cursor_execute',
+                             self._before_cursor_execute)
+                event.listen(Engine, 'after_cursor_execute',
+                             self._after_cursor_execute)
+                self._listening = True
+
+    def _before_request(self):
+        g.sql_stats = RequestStats()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters,
+                              context, executemany):
+        started = conn.info.get('query_started')
+        if not started:
+            # the statement began before the hooks were attached
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if not has_request_context():
+            return
+        stats = request_stats()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        stats.statements[statement] += 1
+        if elapsed * 1000 >= current_app.config['SQL_SLOW_QUERY_MS']:
+            logger.warning(json.dumps({
+                "event": 'slow_query',
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "path": request.path,
+                "duration_ms": round(elapsed * 1000, 3),
+                "statement": statement,
+            }))
+
+    def _after_request(self, response):
+        stats = request_stats()
+        if stats is None:
+            return response
+        for statement, count in stats.statements.items():
+            if count >= current_app.config['SQL_REPEAT_THRESHOLD']:
+                logger.warning(json.dumps({
+                    "event": 'repeated_query',
+                    "endpoint": request.endpoint,
+                    "method": request.method,
+                    "path": request.path,
+                    "count": count,
+                    "statement": statement,
+                }))
+        if current_app.config['SQL_SERVER_TIMING']:
+            total = time.perf_counter() - stats.started
+            response.headers.add(
+                'Server-Timing', 'db;dur={:.2f};desc="{} {}"'.format(
+                    stats.sql_seconds * 1000, stats.queries,
+                    'query' if stats.queries == 1 else 'queries'))
+            response.headers.add('Server-Timing', 'app;dur={:.2f}'.format(
+                total * 1000))
+        return response
@@ -0,0 +1,56 @@
+from flask import (Blueprint, Response, abort, render_template, request,
+                   stream_with_context)
+from extensions import metrics
+
+#----------------------------------------------------------------------------#
+# Home, export and error pages.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('main', __name__)
+
+
+@blueprint.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+#  Export
+#  ----------------------------------------------------------------
+
+@blueprint.route('/export/<kind>.<file_format>')
+def export_catalog(kind, file_format):
+    from formatting import parse_datetime
+    from exporter import (MODELS as EXPORT_MODELS, FORMATS as EXPORT_FORMATS,
+                          export)
+    if kind not in EXPORT_MODELS or file_format not in EXPORT_FORMATS:
+        abort(404)
+    since = request.args.get('since')
+    if since:
+        try:
+            # updated_at is naive UTC
+            since = parse_datetime(since, utc=True)
+        except (ValueError, OverflowError):
+            abort(400)
+    compress = request.args.get('gzip') == '1' or \
+        'gzip' in request.accept_encodings
+    response = Response(
+        stream_with_context(export(kind, file_format, since, compress)),
+        mimetype=EXPORT_FORMATS[file_format])
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+    response.headers['Content-Disposition'] = \
+        'attachment; filename={}.{}'.format(kind, file_format)
+    return response
+
+
+@blueprint.app_errorhandler(404)
+def not_found_error(error):
+    metrics.error(404)
+    return render_template('errors/404.html'), 404
+
+
+@blueprint.app_errorhandler(500)
+def server_error(error):
+    metrics.error(500)
+    return render_template('errors/500.html'), 500
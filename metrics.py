@@ -0,0 +1,279 @@
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, current_app, g, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy.pool import QueuePool
+from instrumentation import request_stats
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+# Prometheus text-format metrics. Each thread records into its own shard so
+# the request path never takes a lock; /metrics sums the shards. With
+# several worker processes set METRICS_DIR to a directory shared by the
+# workers (and emptied on deploy): each worker writes its totals there every
+# METRICS_FLUSH_INTERVAL seconds and /metrics merges all of them.
+#
+# /metrics is served by the public app, so with METRICS_TOKEN set it wants
+# 'Authorization: Bearer <token>' (Prometheus' bearer_token). The
+# production profile sets METRICS_REQUIRE_TOKEN: without a token there is
+# no /metrics at all.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+           1.0, 2.5, 5.0, 7.5, 10.0, float('inf'))
+
+HELP = {
+    'fyyur_requests_total': ('counter', 'Requests handled.'),
+    'fyyur_http_errors_total': ('counter', 'Error pages rendered.'),
+    'fyyur_db_queries_total': ('counter', 'SQL statements executed.'),
+    'fyyur_request_duration_seconds': (
+        'histogram', 'Time spent handling a request.'),
+    'fyyur_template_render_seconds': (
+        'histogram', 'Time spent rendering a template.'),
+    'fyyur_db_pool_wait_seconds': (
+        'histogram', 'Time spent waiting for a pooled connection.'),
+    'fyyur_db_pool_size': ('gauge', 'Configured pool size.'),
+    'fyyur_db_pool_checked_out': ('gauge', 'Connections checked out.'),
+    'fyyur_db_pool_overflow': (
+        'gauge', 'Connections opened beyond the pool size.'),
+}
+
+
+class Registry(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, amount=1, **labels):
+        counters = self._shard()[0]
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        histograms = self._shard()[1]
+        key = (name, tuple(sorted(labels.items())))
+        histogram = histograms.get(key)
+        if histogram is None:
+            # one slot per bucket, then sum and count
+            histogram = histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+        histogram[bisect_left(BUCKETS, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            shards = list(self._shards)
+        counters, histograms = {}, {}
+        for shard_counters, shard_histograms in shards:
+            for key, value in list(shard_counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, values in list(shard_histograms.items()):
+                _add(histograms, key, values)
+        return counters, histograms
+
+
+def _add(histograms, key, values):
+    total = histograms.get(key)
+    if total is None:
+        histograms[key] = list(values)
+    else:
+        histograms[key] = [a + b for a, b in zip(total, values)]
+
+
+registry = Registry()
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that reports how long each checkout waited for a connection
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        finally:
+            registry.observe('fyyur_db_pool_wait_seconds',
+                             time.perf_counter() - started)
+
+
+def _dump(snapshot):
+    counters, histograms = snapshot
+    return {
+        "counters": [[name, labels, value]
+                     for (name, labels), value in counters.items()],
+        "histograms": [[name, labels, values]
+                       for (name, labels), values in histograms.items()],
+    }
+
+
+def _load(data, counters, histograms):
+    for name, labels, value in data["counters"]:
+        key = (name, tuple(tuple(label) for label in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in data["histograms"]:
+        _add(histograms, (name, tuple(tuple(label) for label in labels)),
+             values)
+
+
+def _labels(labels, extra=()):
+    labels = tuple(labels) + tuple(extra)
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace(
+        '\\', '\\\\').replace('"', '\\"')) for key, value in labels) + '}'
+
+
+def _bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def render(counters, histograms, gauges):
+    lines = []
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(name, []).append(
+            '{}{} {}'.format(name, _labels(labels), value))
+    for (name, labels), values in histograms.items():
+        rows = by_name.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(BUCKETS, values):
+            cumulative += count
+            rows.append('{}_bucket{} {}'.format(
+                name, _labels(labels, [('le', _bound(bound))]), cumulative))
+        rows.append('{}_sum{} {}'.format(name, _labels(labels), values[-2]))
+        rows.append('{}_count{} {}'.format(name, _labels(labels), values[-1]))
+    for (name, labels), value in gauges.items():
+        by_name.setdefault(name, []).append(
+            '{}{} {}'.format(name, _labels(labels), value))
+    for name in sorted(by_name):
+        kind, text = HELP.get(name, ('untyped', name))
+        lines.append('# HELP {} {}'.format(name, text))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        lines.extend(sorted(by_name[name]))
+    return '\n'.join(lines) + '\n'
+
+
+class Metrics(object):
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        # the settings stay in app.config and the last flush time in
+        # app.extensions, so one instance serves every app
+        self.db = db
+        app.config.setdefault('METRICS_DIR', None)
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_REQUIRE_TOKEN', False)
+        app.extensions['metrics'] = {"last_flush": 0.0}
+        if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+            # copied, the dict may be shared with the config class
+            options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+            options.setdefault('poolclass', TimedQueuePool)
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._rendered, app)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def _after_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        registry.observe('fyyur_request_duration_seconds',
+                         time.perf_counter() - started,
+                         endpoint=endpoint, method=request.method)
+        registry.inc('fyyur_requests_total', endpoint=endpoint,
+                     method=request.method, status=response.status_code)
+        stats = request_stats()
+        if stats is not None and stats.queries:
+            registry.inc('fyyur_db_queries_total', stats.queries,
+                         endpoint=endpoint)
+        if current_app.config['METRICS_DIR'] and \
+                time.time() - current_app.extensions['metrics'][
+                    'last_flush'] > current_app.config['METRICS_FLUSH_INTERVAL']:
+            self.flush()
+        return response
+
+    def _before_render(self, sender, template, context, **extra):
+        g.template_started = time.perf_counter()
+
+    def _rendered(self, sender, template, context, **extra):
+        started = g.pop('template_started', None)
+        if started is not None:
+            registry.observe('fyyur_template_render_seconds',
+                             time.perf_counter() - started,
+                             template=template.name)
+
+    def error(self, code):
+        registry.inc('fyyur_http_errors_total', code=code)
+
+    def flush(self):
+        current_app.extensions['metrics']['last_flush'] = time.time()
+        path = os.path.join(current_app.config['METRICS_DIR'],
+                            'metrics-{}.json'.format(os.getpid()))
+        with open(path + '.tmp', 'w') as f:
+            json.dump(_dump(registry.snapshot()), f)
+        os.replace(path + '.tmp', path)
+
+    def pool_gauges(self):
+        # the primary and each replica have a pool of their own
+        app = current_app._get_current_object()
+        gauges = {}
+        for bind in [None] + list(app.config.get('REPLICA_BINDS', [])):
+            pool = self.db.get_engine(app, bind=bind).pool
+            if not isinstance(pool, QueuePool):
+                continue
+            labels = (('database', bind or 'primary'),)
+            gauges[('fyyur_db_pool_size', labels)] = pool.size()
+            gauges[('fyyur_db_pool_checked_out', labels)] = pool.checkedout()
+            gauges[('fyyur_db_pool_overflow', labels)] = max(
+                pool.overflow(), 0)
+        return gauges
+
+    def view(self):
+        token = current_app.config['METRICS_TOKEN']
+        if token:
+            given = request.headers.get('Authorization', '').encode()
+            if not hmac.compare_digest(given, b'Bearer ' + token.encode()):
+                return Response('Unauthorized\n', 401, {
+                    'WWW-Authenticate': 'Bearer realm="metrics"'})
+        elif current_app.config['METRICS_REQUIRE_TOKEN']:
+            abort(404)
+        directory = current_app.config['METRICS_DIR']
+        if directory:
+            self.flush()
+            counters, histograms = {}, {}
+            for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+                try:
+                    with open(path) as f:
+                        _load(json.load(f), counters, histograms)
+                except (IOError, ValueError):
+                    continue
+        else:
+            counters, histograms = registry.snapshot()
+        return Response(render(counters, histograms, self.pool_gauges()),
+                        mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,30 @@
+"""name prefix indexes
+
+Revision ID: 31c5f3d40d50
+Revises: bd3cb8e8721f
+Create Date: 2026-10-18 14:37:08.226491
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '31c5f3d40d50'
+down_revision = 'bd3cb8e8721f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pattern ops let lower(name) LIKE 'abc%' use the btree whatever the
+    # database collation is
+    for table in ('venue', 'artist'):
+        op.execute(
+            'CREATE INDEX ix_{0}_name_prefix ON {0} '
+            '(lower(name) varchar_pattern_ops, id)'.format(table))
+
+
+def downgrade():
+    for table in ('venue', 'artist'):
+        op.drop_index('ix_{0}_name_prefix'.format(table), table_name=table)
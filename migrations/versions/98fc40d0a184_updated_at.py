@@ -0,0 +1,31 @@
+"""updated_at columns
+
+Revision ID: 98fc40d0a184
+Revises: b919dfceae3c
+Create Date: 2026-10-18 11:21:47.502318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '98fc40d0a184'
+down_revision = 'b919dfceae3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                       server_default=sa.text("(now() at time zone 'utc')"),
+                                       nullable=False))
+        op.create_index(op.f('ix_{}_updated_at'.format(table)), table,
+                        ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in ('venue', 'artist', 'show'):
+        op.drop_index(op.f('ix_{}_updated_at'.format(table)), table_name=table)
+        op.drop_column(table, 'updated_at')
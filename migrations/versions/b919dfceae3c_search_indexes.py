@@ -0,0 +1,68 @@
+"""search indexes
+
+Revision ID: b919dfceae3c
+Revises: 597cd7920446
+Create Date: 2026-10-18 10:04:12.381920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b919dfceae3c'
+down_revision = '597cd7920446'
+branch_labels = None
+depends_on = None
+
+
+# weighted document: name ranks above city, city above state and genres
+VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(NEW.city, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(NEW.state, '')), 'C') ||
+    setweight(to_tsvector('simple',
+        coalesce(array_to_string(NEW.genres, ' '), '')), 'C')
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        # SQLite uses the FTS5 tables installed by search.py instead
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column(
+            'search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute("""
+            CREATE FUNCTION {0}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {1};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """.format(table, VECTOR_SQL))
+        op.execute("""
+            CREATE TRIGGER {0}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF name, city, state, genres ON {0}
+            FOR EACH ROW EXECUTE PROCEDURE {0}_search_vector_update()
+        """.format(table))
+        # fire the trigger once to backfill existing rows
+        op.execute('UPDATE {0} SET name = name'.format(table))
+        op.create_index('ix_{0}_search_vector'.format(table), table,
+                        ['search_vector'], postgresql_using='gin')
+        op.execute(
+            'CREATE INDEX ix_{0}_name_trgm ON {0} '
+            'USING gin (name gin_trgm_ops)'.format(table))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in ('venue', 'artist'):
+        op.drop_index('ix_{0}_name_trgm'.format(table), table_name=table)
+        op.drop_index('ix_{0}_search_vector'.format(table), table_name=table)
+        op.execute('DROP TRIGGER {0}_search_vector_trigger ON {0}'.format(table))
+        op.execute('DROP FUNCTION {0}_search_vector_update()'.format(table))
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,37 @@
+"""show and genre indexes
+
+Revision ID: bd3cb8e8721f
+Revises: 98fc40d0a184
+Create Date: 2026-10-18 12:02:33.915604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bd3cb8e8721f'
+down_revision = '98fc40d0a184'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_start_time', 'show',
+                    ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_id_start_time', 'show',
+                    ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_show_start_time_id', 'show',
+                    ['start_time', 'id'], unique=False)
+    op.create_index('ix_venue_genres', 'venue', ['genres'],
+                    unique=False, postgresql_using='gin')
+    op.create_index('ix_artist_genres', 'artist', ['genres'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artist_genres', table_name='artist')
+    op.drop_index('ix_venue_genres', table_name='venue')
+    op.drop_index('ix_show_start_time_id', table_name='show')
+    op.drop_index('ix_show_artist_id_start_time', table_name='show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='show')
@@ -0,0 +1,53 @@
+"""show counters
+
+Revision ID: bdfffd8a650b
+Revises: 31c5f3d40d50
+Create Date: 2026-10-18 15:02:41.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bdfffd8a650b'
+down_revision = '31c5f3d40d50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'counter_watermark',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rolled_over_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('INSERT INTO counter_watermark (id, rolled_over_at) '
+               'VALUES (1, localtimestamp)')
+    for table, column in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        op.add_column(table, sa.Column(
+            'upcoming_shows_count', sa.Integer(), nullable=False,
+            server_default='0'))
+        op.add_column(table, sa.Column(
+            'past_shows_count', sa.Integer(), nullable=False,
+            server_default='0'))
+        # backfill relative to the watermark just written
+        op.execute(
+            'UPDATE {0} SET '
+            'upcoming_shows_count = counts.upcoming, '
+            'past_shows_count = counts.past '
+            'FROM (SELECT show.{1} AS id, '
+            'count(*) FILTER (WHERE show.start_time >= w.rolled_over_at) '
+            'AS upcoming, '
+            'count(*) FILTER (WHERE show.start_time < w.rolled_over_at) '
+            'AS past '
+            'FROM show, counter_watermark w GROUP BY show.{1}) counts '
+            'WHERE {0}.id = counts.id'.format(table, column))
+
+
+def downgrade():
+    for table in ('venue', 'artist'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
+    op.drop_table('counter_watermark')
@@ -0,0 +1,29 @@
+"""artist show cascade
+
+Revision ID: e2a4c6b8d0f1
+Revises: bdfffd8a650b
+Create Date: 2026-10-18 17:20:05.114482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a4c6b8d0f1'
+down_revision = 'bdfffd8a650b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # deleting an artist takes their shows along, like venues already do
+    op.drop_constraint('show_artist_id_fkey', 'show', type_='foreignkey')
+    op.create_foreign_key('show_artist_id_fkey', 'show', 'artist',
+                          ['artist_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    op.drop_constraint('show_artist_id_fkey', 'show', type_='foreignkey')
+    op.create_foreign_key('show_artist_id_fkey', 'show', 'artist',
+                          ['artist_id'], ['id'])
@@ -0,0 +1,41 @@
+"""show end time and overlaps
+
+Revision ID: e5b7c9d1f3a2
+Revises: e2a4c6b8d0f1
+Create Date: 2026-10-18 18:41:37.902215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b7c9d1f3a2'
+down_revision = 'e2a4c6b8d0f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # existing shows get the default two hours
+    op.execute("UPDATE show SET end_time = start_time + interval '2 hours'")
+    op.alter_column('show', 'end_time', nullable=False)
+    op.create_check_constraint('show_end_after_start', 'show',
+                               'end_time > start_time')
+    # fails on shows that already double book a venue or an artist; move or
+    # delete those first
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('ALTER TABLE show ADD CONSTRAINT show_venue_overlap '
+               'EXCLUDE USING gist '
+               '(venue_id WITH =, tsrange(start_time, end_time) WITH &&)')
+    op.execute('ALTER TABLE show ADD CONSTRAINT show_artist_overlap '
+               'EXCLUDE USING gist '
+               '(artist_id WITH =, tsrange(start_time, end_time) WITH &&)')
+
+
+def downgrade():
+    op.drop_constraint('show_artist_overlap', 'show')
+    op.drop_constraint('show_venue_overlap', 'show')
+    op.drop_constraint('show_end_after_start', 'show')
+    op.drop_column('show', 'end_time')
@@ -0,0 +1,62 @@
+"""residencies
+
+Revision ID: f3a5c7e9b1d4
+Revises: e5b7c9d1f3a2
+Create Date: 2026-10-18 21:12:05.418337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a5c7e9b1d4'
+down_revision = 'e5b7c9d1f3a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'residency',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('venue_id', sa.Integer(), nullable=False),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+        sa.Column('frequency', sa.String(length=10), nullable=False),
+        sa.Column('interval', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=True),
+        sa.Column('until', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.CheckConstraint("frequency IN ('DAILY', 'WEEKLY')",
+                           name='residency_frequency'),
+        sa.CheckConstraint('interval > 0', name='residency_interval'),
+        sa.ForeignKeyConstraint(['artist_id'], ['artist.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['venue_id'], ['venue.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_residency_artist_id'), 'residency',
+                    ['artist_id'], unique=False)
+    op.create_index(op.f('ix_residency_venue_id'), 'residency',
+                    ['venue_id'], unique=False)
+    op.create_index(op.f('ix_residency_updated_at'), 'residency',
+                    ['updated_at'], unique=False)
+    op.create_table(
+        'residency_exception',
+        sa.Column('residency_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['residency_id'], ['residency.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('residency_id', 'start_time')
+    )
+
+
+def downgrade():
+    op.drop_table('residency_exception')
+    op.drop_index(op.f('ix_residency_updated_at'), table_name='residency')
+    op.drop_index(op.f('ix_residency_venue_id'), table_name='residency')
+    op.drop_index(op.f('ix_residency_artist_id'), table_name='residency')
+    op.drop_table('residency')
@@ -1,15 +1,35 @@
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+import sqlite3
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from routing import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite only enforces foreign keys, ON DELETE CASCADE included, when
+    # asked to on each connection (the testing profile runs on SQLite)
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# genres are an array on PostgreSQL; SQLite, which the testing profile and
+# local development without PostgreSQL run on, stores the list as JSON
+GENRES_TYPE = db.ARRAY(db.String()).with_variant(db.JSON(), 'sqlite')
+
 
 class Venue(db.Model):
     __tablename__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_venue_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -19,12 +39,24 @@ class Venue(db.Model):
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    genres = db.Column("genres", db.ARRAY(db.String()))
+    genres = db.Column("genres", GENRES_TYPE)
     website = db.Column(db.String(240))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                     server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                 server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+    # the database deletes the shows (ON DELETE CASCADE); delete venues
+    # with deletion.delete_entities, which also corrects the counters
     shows = db.relationship('Show', backref='venue',
-                            lazy=True, cascade="all, delete-orphan")
+                            lazy=True, cascade="all, delete-orphan",
+                            passive_deletes=True)
+    residencies = db.relationship('Residency', backref='venue',
+                                  lazy=True, cascade="all, delete-orphan",
+                                  passive_deletes=True)
 
     def __repr__(self):
         return f'Venue ID {self.id} : Venue Name: {self.name}'
@@ -32,6 +64,9 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'artist'
+    __table_args__ = (
+        db.Index('ix_artist_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -40,25 +75,123 @@ class Artist(db.Model):
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    genres = db.Column("genres", db.ARRAY(db.String()))
+    genres = db.Column("genres", GENRES_TYPE)
     website = db.Column(db.String(240))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='artist', lazy=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                     server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                 server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+    shows = db.relationship('Show', backref='artist',
+                            lazy=True, cascade="all, delete-orphan",
+                            passive_deletes=True)
+    residencies = db.relationship('Residency', backref='artist',
+                                  lazy=True, cascade="all, delete-orphan",
+                                  passive_deletes=True)
 
     def __repr__(self):
         return f'Artist ID {self.id} : Artist Name: {self.name}'
 
 
+DEFAULT_SHOW_MINUTES = 120
+# longest show the form accepts; lets overlap lookups bound their scans
+MAX_SHOW_MINUTES = 12 * 60
+
+
+def _default_end_time(context):
+    start_time = context.get_current_parameters().get('start_time')
+    return (start_time or datetime.utcnow()) + timedelta(
+        minutes=DEFAULT_SHOW_MINUTES)
+
+
 class Show(db.Model):
     __tablename__ = 'show'
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        db.CheckConstraint('end_time > start_time',
+                           name='show_end_after_start'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey(
         'venue.id', ondelete='CASCADE'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey(
-        'artist.id'), nullable=False)
+        'artist.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False,
                            default=datetime.utcnow)
+    # a venue or artist is in one show at a time, see booking.py
+    end_time = db.Column(db.DateTime, nullable=False,
+                         default=_default_end_time)
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def duration(self):
+        # minutes, as the show form asks for them
+        return int((self.end_time - self.start_time).total_seconds() // 60)
+
+    @duration.setter
+    def duration(self, minutes):
+        self.end_time = self.start_time + timedelta(minutes=minutes)
 
     def __repr__(self):
         return f'Show ID {self.id}'
+
+
+# days between occurrences for each RRULE FREQ a residency may use
+RESIDENCY_FREQUENCIES = {'DAILY': 1, 'WEEKLY': 7}
+
+
+class Residency(db.Model):
+    # a show that repeats, stored once as an RRULE-like rule: every
+    # `interval` days or weeks from start_time, ending after `count`
+    # occurrences or at `until` if either is set. The occurrences are not
+    # rows, recurrence.py generates them for the window a page asks for
+    __tablename__ = 'residency'
+    __table_args__ = (
+        db.CheckConstraint("frequency IN ('DAILY', 'WEEKLY')",
+                           name='residency_frequency'),
+        db.CheckConstraint('interval > 0', name='residency_interval'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        'venue.id', ondelete='CASCADE'), nullable=False, index=True)
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        'artist.id', ondelete='CASCADE'), nullable=False, index=True)
+    # the first occurrence
+    start_time = db.Column(db.DateTime, nullable=False)
+    # minutes, like the show form
+    duration = db.Column(db.Integer, nullable=False,
+                         default=DEFAULT_SHOW_MINUTES)
+    frequency = db.Column(db.String(10), nullable=False, default='WEEKLY')
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    count = db.Column(db.Integer)
+    until = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False, index=True,
+                           default=datetime.utcnow, onupdate=datetime.utcnow)
+    exceptions = db.relationship('ResidencyException', backref='residency',
+                                 lazy=True, cascade="all, delete-orphan",
+                                 passive_deletes=True)
+
+    def __repr__(self):
+        return f'Residency ID {self.id}'
+
+
+class ResidencyException(db.Model):
+    # a cancelled occurrence of a residency, the EXDATE of its rule
+    __tablename__ = 'residency_exception'
+    residency_id = db.Column(db.Integer, db.ForeignKey(
+        'residency.id', ondelete='CASCADE'), primary_key=True)
+    start_time = db.Column(db.DateTime, primary_key=True)
+
+
+class CounterWatermark(db.Model):
+    # single row: the upcoming/past show counters on Venue and Artist are
+    # exact as of rolled_over_at, see counters.py
+    __tablename__ = 'counter_watermark'
+    id = db.Column(db.Integer, primary_key=True)
+    rolled_over_at = db.Column(db.DateTime, nullable=False)
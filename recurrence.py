@@ -0,0 +1,241 @@
+import heapq
+import math
+from collections import defaultdict
+from datetime import timedelta
+from operator import itemgetter
+from flask import current_app
+from models import (db, Venue, Artist, Show, Residency, ResidencyException,
+                    MAX_SHOW_MINUTES, RESIDENCY_FREQUENCIES)
+
+#----------------------------------------------------------------------------#
+# Recurring shows.
+#----------------------------------------------------------------------------#
+
+# A residency is one row however long it runs. Its occurrences are never
+# stored: occurrences() generates them for the window a page asks for,
+# and they are merged in start_time order with the one-off shows, which
+# the queries already return in that order. A cancelled occurrence is a
+# residency_exception row and is skipped. The overlap constraints of
+# booking.py and the show counters only know the show table, so clashes()
+# checks bookings against occurrences in the application.
+
+
+def occurrences(residency, start, end, cancelled=frozenset()):
+    # (start_time, end_time) of each occurrence starting in [start, end),
+    # jumping straight to the first one rather than walking from the start
+    step = timedelta(days=RESIDENCY_FREQUENCIES[residency.frequency] *
+                     residency.interval)
+    length = timedelta(minutes=residency.duration)
+    number = 0
+    if start > residency.start_time:
+        number = -((residency.start_time - start) // step)
+    while residency.count is None or number < residency.count:
+        start_time = residency.start_time + number * step
+        if start_time >= end or (residency.until is not None and
+                                 start_time > residency.until):
+            return
+        if start_time not in cancelled:
+            yield start_time, start_time + length
+        number += 1
+
+
+def is_occurrence(residency, start_time):
+    return next(occurrences(residency, start_time, start_time +
+                            timedelta(microseconds=1)), None) is not None
+
+
+def window(now):
+    # pages list the occurrences this close to now, either way
+    horizon = timedelta(days=current_app.config['RESIDENCY_HORIZON_DAYS'])
+    return now - horizon, now + horizon
+
+
+def by_start_time(*shows):
+    # merges show dicts already in start_time order
+    return heapq.merge(*shows, key=itemgetter('start_time'))
+
+
+def _running(query, start, end):
+    return query.filter(Residency.start_time < end, db.or_(
+        Residency.until.is_(None), Residency.until >= start))
+
+
+def cancellations(residency_ids, start, end):
+    cancelled = defaultdict(set)
+    if residency_ids:
+        for residency_id, start_time in db.session.query(
+                ResidencyException.residency_id,
+                ResidencyException.start_time).filter(
+                ResidencyException.residency_id.in_(residency_ids),
+                ResidencyException.start_time >= start,
+                ResidencyException.start_time < end):
+            cancelled[residency_id].add(start_time)
+    return cancelled
+
+
+def _sides(model):
+    # own column, the other side and its join for residencies of `model`
+    if model is Venue:
+        return Residency.venue_id, Artist, Artist.id == Residency.artist_id
+    return Residency.artist_id, Venue, Venue.id == Residency.venue_id
+
+
+def _tiles(residency, other_id, name, image_link, prefix, start, end,
+           cancelled):
+    for start_time, _ in occurrences(residency, start, end, cancelled):
+        yield {
+            prefix + "_id": other_id,
+            prefix + "_name": name,
+            prefix + "_image_link": image_link,
+            "start_time": start_time,
+            "residency_id": residency.id,
+        }
+
+
+def residency_shows(model, entity_id, start, end):
+    # the occurrences of a venue's (or an artist's) residencies starting
+    # in [start, end) as show tiles of its page, in start_time order
+    own_id, other, join_on = _sides(model)
+    rows = _running(db.session.query(
+        Residency, other.id, other.name, other.image_link).join(
+        other, join_on).filter(own_id == entity_id), start, end).all()
+    cancelled = cancellations([row[0].id for row in rows], start, end)
+    return by_start_time(*[
+        _tiles(residency, other_id, name, image_link,
+               other.__tablename__, start, end, cancelled[residency.id])
+        for residency, other_id, name, image_link in rows])
+
+
+def residency_slots(venue_id, start, end):
+    # (start_time, end_time) of the venue's occurrences overlapping
+    # [start, end), in start_time order, as booking.booked() lists shows
+    rows = _running(db.session.query(Residency).filter(
+        Residency.venue_id == venue_id), start, end).all()
+    since = start - timedelta(minutes=MAX_SHOW_MINUTES)
+    cancelled = cancellations([residency.id for residency in rows],
+                              since, end)
+    return (slot for slot in heapq.merge(*[
+        occurrences(residency, since, end, cancelled[residency.id])
+        for residency in rows]) if slot[1] > start)
+
+
+def residency_version(model, entity_id, other, now):
+    # what a page's ETag needs from its residencies: their last change,
+    # the other side's, and the next occurrence, when the page changes by
+    # itself. Cancelled occurrences count too, which only costs a render
+    own_id, _, join_on = _sides(model)
+    rows = db.session.query(Residency, other.updated_at).join(
+        other, join_on).filter(own_id == entity_id).all()
+    if not rows:
+        return ()
+    _, end = window(now)
+    upcoming = [occurrence[0] for occurrence in (
+        next(occurrences(residency, now, end), None)
+        for residency, _ in rows) if occurrence is not None]
+    return (max(residency.updated_at for residency, _ in rows),
+            max(updated_at for _, updated_at in rows),
+            min(upcoming) if upcoming else None)
+
+
+def related_page_keys(model, ids):
+    # view cache keys of the pages on the other side of the residencies of
+    # venues (or artists) `ids`
+    own_id, other, _ = _sides(model)
+    other_id = Residency.artist_id if model is Venue else Residency.venue_id
+    return ['%s:%d' % (other.__tablename__, related_id)
+            for related_id, in db.session.query(other_id).filter(
+                own_id.in_(ids)).distinct()]
+
+
+def clashes(shows):
+    # shows: (venue_id, artist_id, start_time, end_time) about to be
+    # booked; {index: 'venue' or 'artist'} for those overlapping an
+    # occurrence of a residency of the same venue or artist
+    if not shows:
+        return {}
+    start = min(show[2] for show in shows) - timedelta(
+        minutes=MAX_SHOW_MINUTES)
+    end = max(show[3] for show in shows)
+    residencies = _running(db.session.query(Residency).filter(db.or_(
+        Residency.venue_id.in_(set(show[0] for show in shows)),
+        Residency.artist_id.in_(set(show[1] for show in shows)))),
+        start, end).all()
+    if not residencies:
+        return {}
+    cancelled = cancellations([residency.id for residency in residencies],
+                              start, end)
+    owners = {'venue': defaultdict(list), 'artist': defaultdict(list)}
+    for residency in residencies:
+        owners['venue'][residency.venue_id].append(residency)
+        owners['artist'][residency.artist_id].append(residency)
+
+    found = {}
+    for index, (venue_id, artist_id, start_time, end_time) in enumerate(
+            shows):
+        for kind, owner_id in (('venue', venue_id), ('artist', artist_id)):
+            if any(occurrence_end > start_time
+                   for residency in owners[kind][owner_id]
+                   for _, occurrence_end in occurrences(
+                       residency, start_time - timedelta(
+                           minutes=residency.duration), end_time,
+                       cancelled[residency.id])):
+                found[index] = kind
+                break
+    return found
+
+
+def _step_days(residency):
+    return RESIDENCY_FREQUENCIES[residency.frequency] * residency.interval
+
+
+def _clash_end(residency):
+    # a new residency can clash with a one-off show up to the last one of
+    # its venue or artist; and with another residency, which may never
+    # end, only within one least common multiple of their steps after
+    # both have started: from then on their occurrences line up the same
+    # way again
+    owned = db.or_(Show.venue_id == residency.venue_id,
+                   Show.artist_id == residency.artist_id)
+    last_show = db.session.query(db.func.max(Show.start_time)).filter(
+        owned).scalar()
+    ends = [residency.start_time]
+    if last_show is not None:
+        ends.append(last_show)
+    step = _step_days(residency)
+    for other in db.session.query(Residency).filter(db.or_(
+            Residency.venue_id == residency.venue_id,
+            Residency.artist_id == residency.artist_id), db.or_(
+            Residency.until.is_(None),
+            Residency.until >= residency.start_time)):
+        other_step = _step_days(other)
+        ends.append(max(residency.start_time, other.start_time) + timedelta(
+            days=step * other_step // math.gcd(step, other_step)))
+    return max(ends) + timedelta(minutes=MAX_SHOW_MINUTES)
+
+
+def residency_clash(residency):
+    # a new residency against the shows and residencies of its venue and
+    # artist, over all the time they can meet, see _clash_end()
+    start = residency.start_time
+    end = _clash_end(residency)
+    planned = list(occurrences(residency, start, end))
+    if not planned:
+        return None
+    found = clashes([(residency.venue_id, residency.artist_id,
+                      start_time, end_time)
+                     for start_time, end_time in planned])
+    if found:
+        return found[min(found)]
+    length = timedelta(minutes=residency.duration)
+    for kind, column, owner_id in (
+            ('venue', Show.venue_id, residency.venue_id),
+            ('artist', Show.artist_id, residency.artist_id)):
+        for show_start, show_end in db.session.query(
+                Show.start_time, Show.end_time).filter(
+                column == owner_id,
+                Show.start_time > start - timedelta(minutes=MAX_SHOW_MINUTES),
+                Show.start_time < end):
+            if any(occurrence_end > show_start for _, occurrence_end in
+                   occurrences(residency, show_start - length, show_end)):
+                return kind
+    return None
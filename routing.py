@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm, text
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+# Read-only requests (GET/HEAD, plus views marked with @read_only) run on
+# one of the replica binds listed in REPLICA_BINDS; everything else, and
+# anything flushed, goes to the primary. After a write the client sticks to
+# the primary for REPLICA_STICKY_SECONDS so it reads its own writes. A
+# replica that fails a health check or a statement is skipped for
+# REPLICA_RETRY_SECONDS; with no healthy replica reads fall back to the
+# primary.
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_KEY = '_primary_until'
+
+
+def read_only(view):
+    view.read_only = True
+    return view
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_app_context():
+            engine = g.get('replica_engine')
+            if engine is not None:
+                return engine
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaState(object):
+    # per app: which replicas are down, when each was last checked and
+    # which engines have the error hook
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.down_until = {}
+        self.checked_at = {}
+        self.watched = set()
+
+
+class ReplicaRouter(object):
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        # settings and replica health live on the app, so one instance
+        # serves every app create_app() builds
+        self.db = db
+        app.config.setdefault('REPLICA_BINDS', [])
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+        app.config.setdefault('REPLICA_RETRY_SECONDS', 30)
+        app.config.setdefault('REPLICA_CHECK_SECONDS', 10)
+        app.extensions['replica_router'] = ReplicaState()
+        if app.config['REPLICA_BINDS']:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def _state(self):
+        return current_app.extensions['replica_router']
+
+    def healthy(self, name):
+        return self._state().down_until.get(name, 0) <= time.time()
+
+    def mark_down(self, name, app=None):
+        app = app or current_app
+        app.extensions['replica_router'].down_until[name] = time.time() + \
+            app.config['REPLICA_RETRY_SECONDS']
+
+    def _engine(self, name):
+        app = current_app._get_current_object()
+        state = self._state()
+        engine = self.db.get_engine(app, bind=name)
+        if name not in state.watched:
+            with state.lock:
+                if name not in state.watched:
+                    dbapi_error = engine.dialect.dbapi.OperationalError
+
+                    def handle_error(context):
+                        if context.is_disconnect or isinstance(
+                                context.original_exception, dbapi_error):
+                            self.mark_down(name, app)
+                    event.listen(engine, 'handle_error', handle_error)
+                    state.watched.add(name)
+        return engine
+
+    def _check(self, name, engine):
+        # at most one round trip per replica every REPLICA_CHECK_SECONDS
+        state = self._state()
+        now = time.time()
+        if now - state.checked_at.get(name, 0) < \
+                current_app.config['REPLICA_CHECK_SECONDS']:
+            return True
+        state.checked_at[name] = now
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return True
+        except Exception:
+            self.mark_down(name)
+            return False
+
+    def choose(self):
+        candidates = [name for name in current_app.config['REPLICA_BINDS']
+                      if self.healthy(name)]
+        random.shuffle(candidates)
+        for name in candidates:
+            engine = self._engine(name)
+            if self._check(name, engine):
+                return engine
+        return None
+
+    def _reads_only(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if getattr(view, 'read_only', False):
+            return True
+        return request.method in READ_METHODS
+
+    def _before_request(self):
+        g.replica_engine = None
+        if not self._reads_only():
+            return
+        if session.get(STICKY_KEY, 0) > time.time():
+            return
+        g.replica_engine = self.choose()
+
+    def _after_request(self, response):
+        if not self._reads_only():
+            session[STICKY_KEY] = time.time() + \
+                current_app.config['REPLICA_STICKY_SECONDS']
+        return response
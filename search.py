@@ -0,0 +1,190 @@
+import re
+from sqlalchemy import event, text
+from models import db, Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+# Venues and artists are searched by name, city, state and genres.
+# On PostgreSQL this uses the search_vector tsvector column and the pg_trgm
+# name index added by migration b919dfceae3c, or by create_search_indexes()
+# when create_all builds the schema; on SQLite the same calls go through
+# FTS5 tables that are created alongside the regular tables.
+
+FTS_COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+class SearchResults(object):
+
+    def __init__(self, term, page, per_page, total, items):
+        self.term = term
+        self.page = page
+        self.per_page = per_page
+        # total is capped at SEARCH_MAX_RESULTS
+        self.total = total
+        self.items = items
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page * self.per_page < self.total
+
+
+def search(model, term, page=1, per_page=20, max_results=500):
+    term = (term or '').strip()
+    page = max(1, page)
+    per_page = max(1, min(per_page, max_results))
+    offset = (page - 1) * per_page
+    limit = max(0, min(per_page, max_results - offset))
+
+    if not term:
+        query = db.session.query(model.id, model.name)
+        total = _count(query, max_results)
+        items = query.order_by(model.name, model.id).offset(
+            offset).limit(limit).all() if limit else []
+    elif db.engine.dialect.name == 'postgresql':
+        total, items = _search_postgresql(
+            model, term, offset, limit, max_results)
+    else:
+        total, items = _search_sqlite(model, term, offset, limit, max_results)
+
+    return SearchResults(term, page, per_page, total,
+                         [{"id": row[0], "name": row[1]} for row in items])
+
+
+def _count(query, max_results):
+    # counting stops at the cap so a vague term never scans everything
+    capped = query.limit(max_results).subquery()
+    return db.session.query(db.func.count()).select_from(capped).scalar()
+
+
+def _search_postgresql(model, term, offset, limit, max_results):
+    table = model.__tablename__
+    vector = db.literal_column(table + '.search_vector')
+    tsquery = db.func.plainto_tsquery('simple', term)
+    pattern = '%' + re.sub(r'([\\%_])', r'\\\1', term) + '%'
+    # both arms are index backed: GIN on search_vector, GIN trigram on name
+    match = db.or_(vector.op('@@')(tsquery), model.name.ilike(pattern))
+    rank = db.func.ts_rank(vector, tsquery) + \
+        db.func.similarity(model.name, term)
+
+    total = _count(db.session.query(model.id).filter(match), max_results)
+    items = []
+    if limit:
+        items = db.session.query(model.id, model.name).filter(match).order_by(
+            rank.desc(), model.id).offset(offset).limit(limit).all()
+    return total, items
+
+
+def _fts_query(term):
+    # every word must match as a prefix; quoting keeps FTS5 syntax inert
+    words = re.findall(r'\w+', term, re.UNICODE)
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def _search_sqlite(model, term, offset, limit, max_results):
+    table = model.__tablename__
+    match = _fts_query(term)
+    if not match:
+        return 0, []
+    params = {"match": match, "cap": max_results,
+              "offset": offset, "limit": limit}
+    total = db.session.execute(text(
+        'SELECT count(*) FROM (SELECT rowid FROM {0}_fts '
+        'WHERE {0}_fts MATCH :match LIMIT :cap)'.format(table)),
+        params).scalar()
+    items = []
+    if limit:
+        items = db.session.execute(text(
+            'SELECT {0}.id, {0}.name FROM {0}_fts '
+            'JOIN {0} ON {0}.id = {0}_fts.rowid '
+            'WHERE {0}_fts MATCH :match '
+            'ORDER BY bm25({0}_fts), {0}.id '
+            'LIMIT :limit OFFSET :offset'.format(table)), params).fetchall()
+    return total, items
+
+
+# what migration b919dfceae3c installs, for databases built by create_all:
+# a weighted document where name ranks above city, city above state and
+# genres, kept up to date by a trigger
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(NEW.city, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(NEW.state, '')), 'C') || "
+    "setweight(to_tsvector('simple', "
+    "coalesce(array_to_string(NEW.genres, ' '), '')), 'C')")
+
+
+def _postgres_statements(table):
+    return [statement.format(table) for statement in [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "ALTER TABLE {0} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+        # the function outlives drop_all, the trigger goes with the table
+        "CREATE OR REPLACE FUNCTION {0}_search_vector_update() "
+        "RETURNS trigger AS $$ BEGIN NEW.search_vector := " +
+        POSTGRES_VECTOR + "; RETURN NEW; END $$ LANGUAGE plpgsql",
+        "CREATE TRIGGER {0}_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE OF name, city, state, genres ON {0} "
+        "FOR EACH ROW EXECUTE PROCEDURE {0}_search_vector_update()",
+        "CREATE INDEX IF NOT EXISTS ix_{0}_search_vector ON {0} "
+        "USING gin (search_vector)",
+        "CREATE INDEX IF NOT EXISTS ix_{0}_name_trgm ON {0} "
+        "USING gin (name gin_trgm_ops)",
+    ]]
+
+
+def _sqlite_statements(table):
+    # external content FTS5 tables kept in sync by triggers, see
+    # https://www.sqlite.org/fts5.html#external_content_tables
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join('new.' + column for column in FTS_COLUMNS)
+    old_values = ', '.join('old.' + column for column in FTS_COLUMNS)
+    return [statement.format(table, columns, new_values, old_values)
+            for statement in [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {0}_fts USING fts5("
+        "{1}, content='{0}', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS {0}_fts_ai AFTER INSERT ON {0} "
+        "BEGIN INSERT INTO {0}_fts(rowid, {1}) VALUES (new.id, {2}); END",
+        "CREATE TRIGGER IF NOT EXISTS {0}_fts_ad AFTER DELETE ON {0} "
+        "BEGIN INSERT INTO {0}_fts({0}_fts, rowid, {1}) "
+        "VALUES ('delete', old.id, {3}); END",
+        "CREATE TRIGGER IF NOT EXISTS {0}_fts_au AFTER UPDATE ON {0} "
+        "BEGIN INSERT INTO {0}_fts({0}_fts, rowid, {1}) "
+        "VALUES ('delete', old.id, {3}); "
+        "INSERT INTO {0}_fts(rowid, {1}) VALUES (new.id, {2}); END",
+        "INSERT INTO {0}_fts({0}_fts) VALUES ('rebuild')",
+    ]]
+
+
+def create_search_indexes(target, connection, **kw):
+    if connection.dialect.name == 'postgresql':
+        statements = _postgres_statements
+    elif connection.dialect.name == 'sqlite':
+        statements = _sqlite_statements
+    else:
+        return
+    # with binds create_all runs once per engine on a subset of the tables
+    created = kw.get('tables')
+    for model in (Venue, Artist):
+        if created is not None and model.__table__ not in created:
+            continue
+        for statement in statements(model.__tablename__):
+            connection.execute(statement)
+
+
+def drop_sqlite_fts(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    dropped = kw.get('tables')
+    for model in (Venue, Artist):
+        if dropped is None or model.__table__ in dropped:
+            connection.execute('DROP TABLE IF EXISTS {0}_fts'.format(
+                model.__tablename__))
+
+
+event.listen(db.metadata, 'after_create', create_search_indexes)
+event.listen(db.metadata, 'before_drop', drop_sqlite_fts)
@@ -0,0 +1,130 @@
+import random
+from datetime import datetime, timedelta
+from models import db, Venue, Artist, Show
+from forms import VenueForm
+from counters import apply_shows
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+# Realistic-looking catalog for development and benchmarks: a few big
+# cities hold most venues, a few popular venues and artists get most of the
+# shows, and show dates cluster around today.
+
+GENRES = [choice for choice, _ in VenueForm.genres.kwargs['choices']]
+STATES = [choice for choice, _ in VenueForm.state.kwargs['choices']]
+WORDS = ['Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Midnight', 'Silver',
+         'Wild', 'Lucky', 'Hidden', 'Royal', 'Broken', 'Little', 'Grand']
+NOUNS = ['Room', 'Hall', 'Lounge', 'Club', 'Tavern', 'Theatre', 'Garden',
+         'Cellar', 'Stage', 'Social', 'Bar', 'House', 'Den', 'Parlour']
+BANDS = ['Owls', 'Petals', 'Machines', 'Echoes', 'Rivers', 'Wolves',
+         'Saints', 'Engines', 'Ghosts', 'Lanterns', 'Tides', 'Sparks']
+BATCH_SIZE = 1000
+SHOW_ATTEMPTS = 20
+
+
+def _zipf_index(rng, size, skew=1.2):
+    # index in [0, size) where low indexes are picked far more often
+    return min(int(size * rng.random() ** (1 + skew)), size - 1)
+
+
+def _cities(rng, count):
+    return [('City {}'.format(n), rng.choice(STATES)) for n in range(count)]
+
+
+def _phone(rng):
+    return '{:03d}-{:03d}-{:04d}'.format(
+        rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999))
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.bulk_insert_mappings(model, rows[start:start + BATCH_SIZE])
+
+
+def seed(venues=100, artists=500, shows=5000, seed=None, now=None):
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    # show times are local, updated_at is UTC like the model defaults
+    updated_at = datetime.utcnow()
+    cities = _cities(rng, max(1, venues // 10))
+
+    first_venue = (db.session.query(db.func.max(Venue.id)).scalar() or 0) + 1
+    rows = []
+    for n in range(venues):
+        city, state = cities[_zipf_index(rng, len(cities))]
+        rows.append({
+            "name": '{} {} {}'.format(rng.choice(WORDS), rng.choice(NOUNS),
+                                      first_venue + n),
+            "city": city,
+            "state": state,
+            "address": '{} Main St'.format(rng.randint(1, 9999)),
+            "phone": _phone(rng),
+            "genres": rng.sample(GENRES, rng.randint(1, 3)),
+            "seeking_talent": rng.random() < 0.3,
+            "updated_at": updated_at,
+        })
+    _insert(Venue, rows)
+
+    first_artist = (db.session.query(db.func.max(Artist.id)).scalar() or 0) + 1
+    rows = []
+    for n in range(artists):
+        city, state = cities[_zipf_index(rng, len(cities))]
+        rows.append({
+            "name": 'The {} {} {}'.format(rng.choice(WORDS), rng.choice(BANDS),
+                                          first_artist + n),
+            "city": city,
+            "state": state,
+            "phone": _phone(rng),
+            "genres": rng.sample(GENRES, rng.randint(1, 3)),
+            "seeking_venue": rng.random() < 0.4,
+            "updated_at": updated_at,
+        })
+    _insert(Artist, rows)
+    db.session.flush()
+
+    venue_ids = [venue_id for venue_id, in db.session.query(Venue.id).filter(
+        Venue.id >= first_venue).order_by(Venue.id)]
+    artist_ids = [artist_id for artist_id, in db.session.query(
+        Artist.id).filter(Artist.id >= first_artist).order_by(Artist.id)]
+    # shuffle so popularity is not tied to insertion order
+    rng.shuffle(venue_ids)
+    rng.shuffle(artist_ids)
+
+    rows = []
+    # one hour shows on the hour; venues and artists are never double
+    # booked, a pick that would be is drawn again
+    booked = set()
+    if venue_ids and artist_ids:
+        for _ in range(shows):
+            for _ in range(SHOW_ATTEMPTS):
+                # two thirds in the past, clustered within a few months of
+                # today
+                offset = rng.gauss(-60, 120)
+                start_time = (now + timedelta(days=offset)).replace(
+                    hour=rng.choice([19, 20, 21, 22]), minute=0, second=0,
+                    microsecond=0)
+                venue_id = venue_ids[_zipf_index(rng, len(venue_ids))]
+                artist_id = artist_ids[_zipf_index(rng, len(artist_ids))]
+                if ('venue', venue_id, start_time) not in booked and \
+                        ('artist', artist_id, start_time) not in booked:
+                    break
+            else:
+                continue
+            booked.add(('venue', venue_id, start_time))
+            booked.add(('artist', artist_id, start_time))
+            rows.append({
+                "venue_id": venue_id,
+                "artist_id": artist_id,
+                "start_time": start_time,
+                "end_time": start_time + timedelta(hours=1),
+                "updated_at": updated_at,
+            })
+    _insert(Show, rows)
+    # bulk inserts skip the mapper events that keep the counters
+    apply_shows(db.session.connection(), [
+        (row["venue_id"], row["artist_id"], row["start_time"])
+        for row in rows])
+    db.session.commit()
+    return len(venue_ids), len(artist_ids), len(rows)
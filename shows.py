@@ -0,0 +1,301 @@
+import re
+from datetime import datetime
+from flask import (Blueprint, abort, current_app, flash, jsonify,
+                   render_template, request, url_for)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from models import db, Venue, Artist, Show, Residency
+from forms import ShowForm, ShowBatchForm, ResidencyForm
+from caching import (make_etag, not_modified, conditional, table_version,
+                     next_show_start, latest)
+from cursors import encode_show_cursor, decode_show_cursor
+from formatting import parse_datetime
+from extensions import view_cache
+from booking import book_shows, conflict
+from recurrence import clashes, residency_clash
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('shows', __name__)
+
+
+@blueprint.route('/shows')
+def shows():
+    # displays list of shows at /shows, one keyset page at a time
+    # shows are only deleted together with their venue or artist, so the
+    # venue and artist counts stand in for a count of the big show table
+    now = datetime.now()
+    version = db.session.query(
+        *(table_version(Venue) + table_version(Artist) + [
+            db.session.query(db.func.max(Show.id)).as_scalar(),
+            db.session.query(db.func.max(Show.updated_at)).as_scalar(),
+            next_show_start(now)])).one()
+    etag = make_etag('shows', request.full_path, *version)
+    last_modified = latest(version[1], version[3], version[5])
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    limit = request.args.get('limit', current_app.config['SHOWS_PER_PAGE'],
+                             type=int)
+    limit = max(1, min(limit, current_app.config['SHOWS_MAX_PER_PAGE']))
+
+    query = db.session.query(
+        Show.id, Show.start_time, Venue.id, Venue.name,
+        Artist.id, Artist.name, Artist.image_link,
+        Show.updated_at, Venue.updated_at, Artist.updated_at
+    ).join(Venue, Venue.id == Show.venue_id).join(
+        Artist, Artist.id == Show.artist_id)
+
+    when = request.args.get('when')
+    if when == 'upcoming':
+        query = query.filter(Show.start_time >= now)
+    elif when == 'past':
+        query = query.filter(Show.start_time < now)
+
+    try:
+        date_from = request.args.get('from')
+        if date_from:
+            query = query.filter(
+                Show.start_time >= parse_datetime(date_from))
+        date_to = request.args.get('to')
+        if date_to:
+            query = query.filter(
+                Show.start_time < parse_datetime(date_to))
+    except (ValueError, OverflowError):
+        abort(400)
+
+    cursor = request.args.get('after')
+    if cursor:
+        position = decode_show_cursor(cursor)
+        if position is None:
+            abort(400)
+        start_time, show_id = position
+        query = query.filter(db.or_(
+            Show.start_time > start_time,
+            db.and_(Show.start_time == start_time, Show.id > show_id)))
+
+    # one extra row tells us whether there is a next page
+    rows = query.order_by(Show.start_time, Show.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_show_cursor(rows[-1][1], rows[-1][0])
+
+    data = []
+    for (show_id, start_time, venue_id, venue_name,
+         artist_id, artist_name, artist_image_link, *versions) in rows:
+        data.append({
+            "id": show_id,
+            # the tile shows venue and artist fields too
+            "version": tuple(versions),
+            "venue_id": venue_id,
+            "venue_name": venue_name,
+            "artist_id": artist_id,
+            "artist_name": artist_name,
+            "artist_image_link": artist_image_link,
+            "start_time": start_time
+        })
+
+    next_url = None
+    if next_cursor:
+        args = request.args.to_dict()
+        args['after'] = next_cursor
+        next_url = url_for('.shows', **args)
+    return conditional(
+        render_template('pages/shows.html', shows=data, next_url=next_url),
+        etag, last_modified)
+
+
+@blueprint.route('/shows/create')
+def create_shows():
+    # renders form. artists and venues are picked through /autocomplete
+    form = ShowForm()
+
+    return render_template('forms/new_show.html', form=form)
+
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    form = ShowForm(request.form)
+
+    if form.validate():
+        try:
+            show = Show()
+            form.populate_obj(show)
+            # residencies are no rows of the show table, so no constraint
+            # stops a show on top of one of their occurrences
+            residency = clashes([(show.venue_id, show.artist_id,
+                                  show.start_time, show.end_time)])
+            if residency:
+                flash('The {} has a residency at that time.'.format(
+                    residency[0]))
+                return render_template('pages/home.html')
+            db.session.add(show)
+            db.session.commit()
+            view_cache.delete('venue:%d' % show.venue_id,
+                              'artist:%d' % show.artist_id)
+            flash('Show added')
+        except IntegrityError as e:
+            # a double booking, refused by the overlap constraints
+            db.session.rollback()
+            kind = conflict(e)
+            if kind is None:
+                current_app.logger.exception('Show could not be added')
+                flash('An error occurred. Show won\'t be added ')
+            else:
+                flash('The {} already has a show at that time.'.format(kind))
+        except SQLAlchemyError:
+            # other database errors are logged and reported on the form;
+            # anything that is not one is a bug and gets the 500 page
+            current_app.logger.exception('Show could not be added')
+            db.session.rollback()
+            flash('An error occurred. Show won\'t be added ')
+        finally:
+            db.session.close()
+    else:
+        for field in form.errors:
+            flash(f'{field} : {form.errors[field][0]}')
+        flash('An error occurred. Show won\'t be added ')
+
+    return render_template('pages/home.html')
+
+
+# shows-<row>-<field>, as the batch form names its inputs
+ROW_FIELD = re.compile(r'^shows-(\d+)-(\w+)$')
+
+
+def submitted_rows(formdata):
+    rows = {}
+    for key, value in formdata.items():
+        match = ROW_FIELD.match(key)
+        if match:
+            rows.setdefault(int(match.group(1)), {})[
+                match.group(2)] = value.strip()
+    return [rows[position] for position in sorted(rows)]
+
+
+@blueprint.route('/shows/batch')
+def create_show_batch():
+    # a tour at once: one row per show, blank rows are ignored
+    count = request.args.get(
+        'rows', current_app.config['SHOW_BATCH_FORM_ROWS'], type=int)
+    count = max(1, min(count, current_app.config['SHOW_BATCH_MAX_ROWS']))
+    return render_template('forms/new_shows.html', form=ShowBatchForm(),
+                           rows=[{} for _ in range(count)], errors={})
+
+
+@blueprint.route('/shows/batch', methods=['POST'])
+def create_show_batch_submission():
+    form = ShowBatchForm(request.form)
+    rows = submitted_rows(request.form)
+    filled = [position for position, row in enumerate(rows)
+              if any(row.values())]
+
+    if not form.validate():
+        for field in form.errors:
+            flash(f'{field} : {form.errors[field][0]}')
+    elif not filled:
+        flash('Fill in at least one show.')
+    elif len(filled) > current_app.config['SHOW_BATCH_MAX_ROWS']:
+        flash('At most {} shows at once.'.format(
+            current_app.config['SHOW_BATCH_MAX_ROWS']))
+    else:
+        try:
+            result = book_shows([rows[position] for position in filled],
+                                atomic=form.atomic.data)
+        except SQLAlchemyError:
+            current_app.logger.exception('Shows could not be added')
+            db.session.rollback()
+            flash('An error occurred. Shows won\'t be added ')
+        else:
+            added = '{} show{} added'.format(
+                len(result.created), '' if len(result.created) == 1 else 's')
+            if not result.errors:
+                flash(added)
+                return render_template('pages/home.html')
+            if result.created:
+                flash(added + ', the rows below were not.')
+            else:
+                flash('No show was added, correct the rows below.')
+            # the form comes back with the rows that still need work
+            created = set(filled[index] for index in result.created)
+            errors = {filled[index]: row_errors
+                      for index, row_errors in result.errors.items()}
+            kept = [position for position in range(len(rows))
+                    if position not in created]
+            return render_template(
+                'forms/new_shows.html', form=form,
+                rows=[rows[position] for position in kept],
+                errors={new: errors[old] for new, old in enumerate(kept)
+                        if old in errors})
+        finally:
+            db.session.close()
+
+    return render_template('forms/new_shows.html', form=form, rows=rows,
+                           errors={})
+
+
+#  Residencies
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/residencies/create')
+def create_residency():
+    # a show that repeats, listed once instead of one show per week
+    form = ResidencyForm()
+
+    return render_template('forms/new_residency.html', form=form)
+
+
+@blueprint.route('/residencies/create', methods=['POST'])
+def create_residency_submission():
+    form = ResidencyForm(request.form)
+
+    if form.validate():
+        try:
+            residency = Residency()
+            form.populate_obj(residency)
+            kind = residency_clash(residency)
+            if kind is not None:
+                flash('The {} already has a show at one of those '
+                      'times.'.format(kind))
+                return render_template('forms/new_residency.html',
+                                       form=form)
+            db.session.add(residency)
+            db.session.commit()
+            view_cache.delete('venue:%d' % residency.venue_id,
+                              'artist:%d' % residency.artist_id)
+            flash('Residency added')
+        except SQLAlchemyError:
+            current_app.logger.exception('Residency could not be added')
+            db.session.rollback()
+            flash('An error occurred. Residency won\'t be added ')
+        finally:
+            db.session.close()
+    else:
+        for field in form.errors:
+            flash(f'{field} : {form.errors[field][0]}')
+        flash('An error occurred. Residency won\'t be added ')
+
+    return render_template('pages/home.html')
+
+
+@blueprint.route('/autocomplete/<kind>')
+def autocomplete(kind):
+    # type-ahead for the show form pickers, served by the name prefix index
+    model = {'venues': Venue, 'artists': Artist}.get(kind)
+    if model is None:
+        abort(404)
+    limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(limit,
+                       current_app.config['AUTOCOMPLETE_MAX_RESULTS']))
+    term = request.args.get('q', '').strip().lower()
+    query = db.session.query(model.id, model.name)
+    if term:
+        prefix = re.sub(r'([\\%_])', r'\\\1', term) + '%'
+        query = query.filter(
+            db.func.lower(model.name).like(prefix, escape='\\'))
+    rows = query.order_by(db.func.lower(model.name), model.id).limit(limit)
+    return jsonify(results=[{"id": row.id, "name": row.name} for row in rows])
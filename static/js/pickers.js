@@ -0,0 +1,26 @@
+// type-ahead pickers: the visible box searches, the hidden field keeps the id
+function bindPicker(input){
+  const options = document.getElementById(input.getAttribute('list'));
+  const target = document.getElementById(input.dataset.target);
+  let timer = null;
+  input.addEventListener('input', function(){
+    const match = options.querySelector('option[value="' + CSS.escape(input.value) + '"]');
+    target.value = match ? match.dataset.id : '';
+    if (match) { return; }
+    clearTimeout(timer);
+    timer = setTimeout(function(){
+      fetch(input.dataset.source + '?q=' + encodeURIComponent(input.value))
+      .then(function(response){ return response.json(); })
+      .then(function(data){
+        options.innerHTML = '';
+        data.results.forEach(function(result){
+          const option = document.createElement('option');
+          option.value = result.name + ' (#' + result.id + ')';
+          option.dataset.id = result.id;
+          options.appendChild(option);
+        });
+      });
+    }, 150);
+  });
+}
+Array.prototype.forEach.call(document.querySelectorAll('.picker'), bindPicker);
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    # the testing profile: an in-memory SQLite database unless
+    # TEST_DATABASE_URL points somewhere else, built fresh for each test
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def entity(app):
+    # builds a venue or artist that passes the forms' required fields
+    def entity(model, name, **fields):
+        fields.setdefault('city', 'San Francisco')
+        fields.setdefault('state', 'CA')
+        fields.setdefault('genres', ['Jazz'])
+        return model(name=name, **fields)
+    return entity
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import pytest
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def catalog(entity):
+    venues = [entity(Venue, 'Hall %d' % n, address='%d Main St' % n)
+              for n in range(3)]
+    artist = entity(Artist, 'Touring Act')
+    db.session.add_all(venues + [artist])
+    db.session.flush()
+    now = datetime.now().replace(microsecond=0)
+    for n, venue in enumerate(venues):
+        start = now + timedelta(days=2 * n - 1)
+        db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=start,
+                            end_time=start + timedelta(hours=2)))
+    db.session.commit()
+    return [venue.id for venue in venues], artist.id
+
+
+def walk(client, url):
+    items, cursor = [], None
+    while True:
+        response = client.get(url + ('&after=' + cursor if cursor else ''))
+        assert response.status_code == 200
+        body = response.get_json()
+        items.extend(body['data'])
+        cursor = body['next']
+        if cursor is None:
+            return items
+
+
+def test_listings_page_by_cursor_with_chosen_fields(client, catalog):
+    venue_ids, _ = catalog
+    venues = walk(client, '/api/v1/venues?limit=2&fields=name,genres')
+    assert venues == [{'name': 'Hall %d' % n, 'genres': ['Jazz']}
+                      for n in range(3)]
+    default = client.get('/api/v1/venues').get_json()['data'][0]
+    assert sorted(default) == ['city', 'id', 'name', 'state',
+                               'upcoming_shows_count']
+
+    shows = walk(client, '/api/v1/shows?limit=1&fields=venue_id,artist_name')
+    assert [show['venue_id'] for show in shows] == venue_ids
+    assert {show['artist_name'] for show in shows} == {'Touring Act'}
+    upcoming = client.get('/api/v1/shows?when=upcoming').get_json()['data']
+    assert [show['venue_id'] for show in upcoming] == venue_ids[1:]
+
+
+def test_detail_splits_shows_and_counts_them(client, catalog):
+    venue_ids, artist_id = catalog
+    data = client.get('/api/v1/artists/%d?fields=name,upcoming_shows,'
+                      'past_shows' % artist_id).get_json()['data']
+    assert data['name'] == 'Touring Act'
+    assert [show['venue_id'] for show in data['upcoming_shows']] == \
+        venue_ids[1:]
+    assert (data['upcoming_shows_count'], data['past_shows_count']) == (2, 1)
+    venue = client.get('/api/v1/venues/%d' % venue_ids[0]).get_json()['data']
+    assert venue['address'] == '0 Main St'
+    assert [show['artist_id'] for show in venue['past_shows']] == [artist_id]
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/venues?fields=name,secret',
+    '/api/v1/venues?after=garbage',
+    '/api/v1/shows?after=garbage',
+])
+def test_bad_requests_get_json_errors(client, catalog, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert response.get_json()['error']['status'] == 400
+
+
+def test_missing_entities_get_json_404(client, catalog):
+    response = client.get('/api/v1/artists/999')
+    assert response.status_code == 404
+    assert response.get_json()['error']['message'] == 'No such artist.'
@@ -0,0 +1,36 @@
+from datetime import datetime
+from areas import AreaIndex
+from models import db, Venue, Artist, Show
+
+
+def test_venue_moved_elsewhere_changes_area(client, entity):
+    # the move happens where this worker's area index never hears of it,
+    # as it would in another process
+    venue = entity(Venue, 'The Wanderer')
+    db.session.add(venue)
+    db.session.commit()
+    assert 'San Francisco' in client.get('/venues').get_data(as_text=True)
+    db.session.query(Venue).filter(Venue.id == venue.id).update(
+        {'city': 'Oakland', 'updated_at': datetime.now()},
+        synchronize_session=False)
+    db.session.commit()
+    page = client.get('/venues').get_data(as_text=True)
+    assert 'Oakland' in page and 'San Francisco' not in page
+
+
+def test_booking_a_show_keeps_the_area_index(client, entity, monkeypatch):
+    venue, artist = entity(Venue, 'The Regular'), entity(Artist, 'Trio')
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    assert client.get('/venues').status_code == 200
+
+    rebuilds = []
+    rebuild = AreaIndex._rebuild
+    monkeypatch.setattr(AreaIndex, '_rebuild', lambda self: (
+        rebuilds.append(1), rebuild(self)))
+    start = datetime(2040, 1, 1, 20)
+    db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                        start_time=start, end_time=start.replace(hour=22)))
+    db.session.commit()
+    assert client.get('/venues').status_code == 200
+    assert rebuilds == []
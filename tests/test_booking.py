@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+from booking import available_slots, book_shows, conflict
+from models import db, Venue, Artist, Show
+
+EVENING = datetime(2040, 6, 1, 20)
+
+
+@pytest.fixture
+def stage(entity):
+    # two venues, two artists and one show: venue 0, artist 0, 20:00-22:00
+    venues = [entity(Venue, 'Hall %d' % n) for n in range(2)]
+    artists = [entity(Artist, 'Act %d' % n) for n in range(2)]
+    db.session.add_all(venues + artists)
+    db.session.flush()
+    show = Show(venue_id=venues[0].id, artist_id=artists[0].id,
+                start_time=EVENING, end_time=EVENING + timedelta(hours=2))
+    db.session.add(show)
+    db.session.commit()
+    return {'venues': [venue.id for venue in venues],
+            'artists': [artist.id for artist in artists], 'show': show.id}
+
+
+def add(venue_id, artist_id, start, minutes=120):
+    db.session.add(Show(venue_id=venue_id, artist_id=artist_id,
+                        start_time=start,
+                        end_time=start + timedelta(minutes=minutes)))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('venue, artist, kind', [
+    (0, 1, 'venue'), (1, 0, 'artist')])
+def test_overlapping_show_is_refused(stage, venue, artist, kind):
+    with pytest.raises(IntegrityError) as error:
+        add(stage['venues'][venue], stage['artists'][artist],
+            EVENING + timedelta(minutes=90))
+    db.session.rollback()
+    assert conflict(error.value) == kind
+
+
+def test_back_to_back_and_elsewhere_are_booked(stage):
+    add(stage['venues'][0], stage['artists'][1], EVENING + timedelta(hours=2))
+    add(stage['venues'][1], stage['artists'][1], EVENING - timedelta(hours=2))
+    assert Show.query.count() == 3
+
+
+def test_moving_a_show_is_checked_and_frees_its_slot(stage):
+    add(stage['venues'][0], stage['artists'][1], EVENING + timedelta(hours=3))
+    later = Show.query.filter(Show.artist_id == stage['artists'][1]).one()
+    later.start_time = EVENING + timedelta(hours=1)
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+    # a show may move within its own time, and its old time is free again
+    show = db.session.query(Show).get(stage['show'])
+    show.start_time = EVENING - timedelta(minutes=30)
+    show.end_time = EVENING + timedelta(minutes=90)
+    db.session.commit()
+    add(stage['venues'][0], stage['artists'][1],
+        EVENING + timedelta(minutes=90), minutes=90)
+    db.session.delete(show)
+    db.session.commit()
+    add(stage['venues'][0], stage['artists'][0], EVENING - timedelta(hours=1),
+        minutes=150)
+
+
+def test_available_slots_skip_booked_time(stage):
+    slots = available_slots(stage['venues'][0], EVENING - timedelta(hours=4),
+                            EVENING + timedelta(hours=5))
+    assert slots == [(EVENING - timedelta(hours=4), EVENING),
+                     (EVENING + timedelta(hours=2),
+                      EVENING + timedelta(hours=5))]
+
+
+def test_batch_reports_each_conflict(stage):
+    row = {'venue_id': stage['venues'][1], 'artist_id': stage['artists'][1],
+           'start_time': '2040-06-02 20:00:00', 'duration': 60}
+    rows = [
+        row,
+        dict(row, venue_id=stage['venues'][0], start_time='2040-06-01 21:00:00'),
+        dict(row, start_time='2040-06-02 20:30:00'),
+    ]
+    result = book_shows(rows, atomic=False)
+    assert result.created == [0]
+    assert set(result.errors) == {1, 2}
+    assert Show.query.count() == 2
+
+
+def test_api_reports_database_errors_as_json(client, stage, monkeypatch):
+    import api
+
+    def fail(rows, atomic=True):
+        raise OperationalError('INSERT INTO show', {}, Exception('gone'))
+
+    monkeypatch.setattr(api, 'book_shows', fail)
+    response = client.post('/api/v1/shows', json={'shows': [{
+        'venue_id': stage['venues'][1], 'artist_id': stage['artists'][1],
+        'start_time': '2040-06-02 20:00:00'}]})
+    assert response.status_code == 500
+    assert response.get_json()['error']['status'] == 500
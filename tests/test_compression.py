@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+from werkzeug.http import parse_accept_header as accept
+from app import create_app
+from assets import build
+from compression import negotiate
+from config import TestingConfig
+
+
+def test_negotiate_prefers_quality_then_order():
+    assert negotiate(accept('gzip, br'), ['br', 'gzip']) == 'br'
+    assert negotiate(accept('br;q=0.5, gzip'), ['br', 'gzip']) == 'gzip'
+    assert negotiate(accept('gzip;q=0'), ['gzip']) is None
+    assert negotiate(accept('identity'), ['br', 'gzip']) is None
+    assert negotiate(accept('*'), ['gzip']) == 'gzip'
+
+
+def test_pages_compressed_when_accepted(client):
+    response = client.get('/venues', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert b'</html>' in gzip.decompress(response.get_data())
+
+    response = client.get('/venues')
+    assert 'Content-Encoding' not in response.headers
+    assert b'</html>' in response.get_data()
+
+
+def test_small_bodies_sent_as_they_are(client):
+    # a JSON error is well under COMPRESS_MIN_SIZE
+    response = client.get('/api/v1/venues/1',
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 404
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.get_data())
+
+
+def test_assets_serve_precompressed_files(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    (static / 'css' / 'main.css').write_text(
+        'body { color: #333; }\n' * 100 +
+        '.logo { background: url("../img/logo.png"); }\n')
+    (static / 'img').mkdir()
+    (static / 'img' / 'logo.png').write_bytes(b'\x89PNG')
+    output = str(tmp_path / 'assets')
+    manifest = build(str(static), output)
+    hashed = manifest['css/main.css']
+    assert os.path.isfile(os.path.join(output, hashed + '.gz'))
+    # images are not text, nothing to precompress
+    assert not os.path.exists(
+        os.path.join(output, manifest['img/logo.png'] + '.gz'))
+    with open(os.path.join(output, hashed)) as f:
+        assert manifest['img/logo.png'].split('/')[-1] in f.read()
+
+    class AssetsConfig(TestingConfig):
+        ASSETS_DIR = output
+
+    app = create_app(AssetsConfig)
+    client = app.test_client()
+    with app.test_request_context():
+        assert app.jinja_env.globals['asset_url']('css/main.css') == \
+            '/assets/' + hashed
+
+    response = client.get('/assets/' + hashed,
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()).startswith(b'body')
+
+    response = client.get('/assets/' + hashed)
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data().startswith(b'body')
+    assert client.get('/assets/manifest.json').status_code == 404
@@ -0,0 +1,15 @@
+from sqlalchemy import inspect
+from config import TestingConfig
+from models import db
+
+
+def test_testing_profile_creates_its_schema(app):
+    assert app.testing
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == \
+        TestingConfig.SQLALCHEMY_DATABASE_URI
+    tables = set(inspect(db.engine).get_table_names())
+    assert {'venue', 'artist', 'show', 'residency',
+            'residency_exception', 'counter_watermark'} <= tables
+    if db.engine.dialect.name == 'sqlite':
+        # the search and double booking fallbacks come with the schema
+        assert {'venue_fts', 'artist_fts', 'show_slot'} <= tables
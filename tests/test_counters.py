@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+import pytest
+from booking import book_shows
+from counters import reconcile, rollover, watermark
+from deletion import delete_entities
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def now(app):
+    now = datetime.now().replace(microsecond=0)
+    watermark(db.session.connection())
+    db.session.commit()
+    return now
+
+
+@pytest.fixture
+def cast(entity):
+    venues = [entity(Venue, 'Hall %d' % n) for n in range(2)]
+    artists = [entity(Artist, 'Act %d' % n) for n in range(2)]
+    db.session.add_all(venues + artists)
+    db.session.commit()
+    return venues, artists
+
+
+def counts(row):
+    db.session.refresh(row)
+    return row.upcoming_shows_count, row.past_shows_count
+
+
+def add(venue, artist, start_time):
+    show = Show(venue_id=venue.id, artist_id=artist.id, start_time=start_time,
+                end_time=start_time + timedelta(hours=1))
+    db.session.add(show)
+    db.session.commit()
+    return show
+
+
+def test_shows_are_counted_as_they_change(now, cast):
+    (hall, other_hall), (act, _) = cast
+    past = add(hall, act, now - timedelta(days=2))
+    upcoming = add(hall, act, now + timedelta(days=2))
+    assert counts(hall) == counts(act) == (1, 1)
+
+    upcoming.venue_id = other_hall.id
+    db.session.commit()
+    assert counts(hall) == (0, 1) and counts(other_hall) == (1, 0)
+
+    past.start_time = now + timedelta(days=5)
+    past.end_time = past.start_time + timedelta(hours=1)
+    db.session.commit()
+    assert counts(hall) == (1, 0) and counts(act) == (2, 0)
+
+    db.session.delete(upcoming)
+    db.session.commit()
+    assert counts(other_hall) == (0, 0) and counts(act) == (1, 0)
+    assert reconcile(db.session.connection()) == []
+
+
+def test_rollover_moves_started_shows_to_past(now, cast):
+    (hall, _), (act, _) = cast
+    add(hall, act, now + timedelta(hours=1))
+    add(hall, act, now + timedelta(days=1))
+    moved = rollover(db.session.connection(), now + timedelta(hours=2))
+    db.session.commit()
+    assert moved == 1
+    assert counts(hall) == counts(act) == (1, 1)
+    assert reconcile(db.session.connection()) == []
+
+
+def test_batches_and_cascaded_deletes_are_counted(now, cast):
+    (hall, other_hall), (act, other_act) = cast
+    start = now + timedelta(days=1)
+    result = book_shows([{
+        'venue_id': venue.id, 'artist_id': artist.id,
+        'start_time': (start + timedelta(days=n)).strftime(
+            '%Y-%m-%d %H:%M:%S'), 'duration': 60}
+        for n, (venue, artist) in enumerate([
+            (hall, act), (hall, other_act), (other_hall, act)])])
+    assert result.created == [0, 1, 2]
+    assert counts(hall) == counts(act) == (2, 0)
+
+    delete_entities(Venue, [hall.id])
+    assert counts(act) == (1, 0) and counts(other_act) == (0, 0)
+    assert reconcile(db.session.connection()) == []
+
+
+def test_reconcile_reports_and_fixes_drift(now, cast):
+    (hall, _), (act, _) = cast
+    add(hall, act, now + timedelta(days=1))
+    db.session.query(Venue).filter(Venue.id == hall.id).update(
+        {'upcoming_shows_count': 7}, synchronize_session=False)
+    db.session.commit()
+    connection = db.session.connection()
+    assert reconcile(connection) == [('venue', hall.id, (7, 0), (1, 0))]
+    reconcile(connection, fix=True)
+    db.session.commit()
+    assert counts(hall) == (1, 0)
+    assert reconcile(db.session.connection()) == []
+
+
+def test_counting_leaves_updated_at_alone(now, cast):
+    (hall, other_hall), (act, _) = cast
+    stamps = [(row, row.updated_at) for row in (hall, act)]
+    show = add(hall, act, now + timedelta(days=1))
+    show.venue_id = other_hall.id
+    db.session.commit()
+    rollover(db.session.connection(), now + timedelta(days=2))
+    delete_entities(Venue, [other_hall.id])
+    for row, updated_at in stamps:
+        db.session.refresh(row)
+        assert row.updated_at == updated_at
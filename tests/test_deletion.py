@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import OperationalError
+import venues
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def booked(entity):
+    hall, act = entity(Venue, 'The Old Hall'), entity(Artist, 'Quartet')
+    db.session.add_all([hall, act])
+    db.session.commit()
+    start_time = datetime.now().replace(microsecond=0) + timedelta(days=7)
+    db.session.add(Show(venue_id=hall.id, artist_id=act.id,
+                        start_time=start_time,
+                        end_time=start_time + timedelta(hours=2)))
+    db.session.commit()
+    return hall.id, act.id
+
+
+def flashes(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.pop('_flashes', [])]
+
+
+def test_delete_venue_cascades_to_shows_and_pages(client, booked):
+    hall_id, act_id = booked
+    # cached with the show on it
+    assert 'The Old Hall' in client.get(
+        '/artists/%d' % act_id).get_data(as_text=True)
+
+    response = client.delete('/venues/%d' % hall_id)
+    assert response.status_code == 302
+    assert flashes(client) == ['Venue The Old Hall was successfully deleted!']
+    assert db.session.query(Venue).get(hall_id) is None
+    assert db.session.query(Show).count() == 0
+    assert db.session.query(Artist).get(act_id).upcoming_shows_count == 0
+    assert 'The Old Hall' not in client.get(
+        '/artists/%d' % act_id).get_data(as_text=True)
+    assert client.delete('/venues/%d' % hall_id).status_code == 404
+
+
+def test_delete_artist(client, booked):
+    _, act_id = booked
+    client.delete('/artists/%d' % act_id)
+    assert flashes(client) == ['Artist Quartet was successfully deleted!']
+    assert db.session.query(Artist).count() == 0
+    assert db.session.query(Show).count() == 0
+
+
+def test_failed_delete_flashes_and_keeps_the_venue(client, booked,
+                                                   monkeypatch):
+    hall_id, _ = booked
+
+    def fail(model, ids):
+        raise OperationalError('DELETE', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(venues, 'delete_entities', fail)
+    assert client.delete('/venues/%d' % hall_id).status_code == 302
+    assert flashes(client) == [
+        'An error occurred. Venue The Old Hall could not be deleted.']
+    assert db.session.query(Venue).get(hall_id) is not None
+
+
+def test_api_batch_delete(client, booked, entity):
+    hall_id, _ = booked
+    db.session.add(entity(Venue, 'The Annex'))
+    db.session.commit()
+    annex_id = db.session.query(Venue.id).filter_by(name='The Annex').scalar()
+
+    # ids that do not exist are skipped
+    response = client.delete('/api/v1/venues',
+                             json={'ids': [annex_id, hall_id, 999]})
+    assert response.status_code == 200
+    assert response.get_json() == {'deleted': sorted([hall_id, annex_id])}
+    assert db.session.query(Venue).count() == 0
+    assert db.session.query(Show).count() == 0
+
+    for body in ({}, {'ids': []}, {'ids': ['1']}, {'ids': [True]},
+                 {'ids': 1}, [1]):
+        response = client.delete('/api/v1/artists', json=body)
+        assert response.status_code == 400
+    client.application.config['API_MAX_BATCH_DELETE'] = 2
+    assert client.delete('/api/v1/artists',
+                         json={'ids': [1, 2, 3]}).status_code == 400
+    assert db.session.query(Artist).count() == 1
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from models import db, Venue, Artist, Show
+
+SHOWS = 25
+
+
+@pytest.fixture
+def catalog(entity):
+    # a venue and an artist with one show, another pair with SHOWS shows,
+    # half of them past and half upcoming
+    single_venue, busy_venue = entity(Venue, 'Single'), entity(Venue, 'Busy')
+    single_artist, busy_artist = entity(Artist, 'Solo'), entity(Artist, 'Band')
+    db.session.add_all([single_venue, busy_venue, single_artist, busy_artist])
+    db.session.flush()
+    start = datetime.now() - timedelta(days=SHOWS // 2)
+    db.session.add(Show(venue_id=single_venue.id, artist_id=single_artist.id,
+                        start_time=start))
+    for n in range(SHOWS):
+        # the busy venue hosts other artists, the busy artist plays other
+        # venues, so every tile joins a different row
+        other_artist, other_venue = entity(Artist, 'Guest %d' % n), \
+            entity(Venue, 'Stop %d' % n)
+        db.session.add_all([other_artist, other_venue])
+        db.session.flush()
+        when = start + timedelta(days=n, hours=1)
+        db.session.add_all([
+            Show(venue_id=busy_venue.id, artist_id=other_artist.id,
+                 start_time=when),
+            Show(venue_id=other_venue.id, artist_id=busy_artist.id,
+                 start_time=when + timedelta(hours=3)),
+        ])
+    db.session.commit()
+    return {'venues': (single_venue.id, busy_venue.id),
+            'artists': (single_artist.id, busy_artist.id)}
+
+
+def statements(app, client, url):
+    executed = []
+
+    def count(*args):
+        executed.append(args[2])
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return executed
+
+
+@pytest.mark.parametrize('kind', ['venues', 'artists'])
+def test_detail_page_queries_do_not_grow_with_shows(app, client, catalog,
+                                                    kind):
+    single, busy = catalog[kind]
+    one_show = statements(app, client, '/{}/{}'.format(kind, single))
+    many_shows = statements(app, client, '/{}/{}'.format(kind, busy))
+    assert len(one_show) == len(many_shows)
+    page = client.get('/{}/{}'.format(kind, busy)).get_data(as_text=True)
+    assert 'Upcoming Shows' in page and 'Past Shows' in page
@@ -0,0 +1,46 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+import pytest
+from models import db, Venue
+
+
+@pytest.fixture
+def venues(entity):
+    # updated_at is naive UTC
+    db.session.add_all([
+        entity(Venue, 'Early', updated_at=datetime(2026, 1, 1, 10)),
+        entity(Venue, 'Late', updated_at=datetime(2026, 1, 1, 12),
+               genres=['Jazz', 'Blues']),
+    ])
+    db.session.commit()
+
+
+def exported(client, query):
+    response = client.get('/export/venues.ndjson' + query)
+    assert response.status_code == 200
+    return [json.loads(line)['name'] for line in
+            response.get_data(as_text=True).splitlines()]
+
+
+def test_export_since_is_utc(client, venues):
+    assert exported(client, '') == ['Early', 'Late']
+    assert exported(client, '?since=2026-01-01T11:00:00') == ['Late']
+    # 12:30 at +02:00 is 10:30 UTC
+    assert exported(client, '?since=2026-01-01T12:30:00%2B02:00') == ['Late']
+    assert exported(client, '?since=2026-01-01T09:30:00-01:00') == ['Late']
+    assert exported(client, '?since=2026-01-01T12:00:00Z') == []
+    assert client.get('/export/venues.ndjson?since=someday').status_code \
+        == 400
+    assert client.get('/export/stages.csv').status_code == 404
+
+
+def test_export_csv_gzipped(client, venues):
+    response = client.get('/export/venues.csv?gzip=1')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    rows = list(csv.DictReader(io.StringIO(
+        gzip.decompress(response.get_data()).decode())))
+    assert [(row['name'], row['genres']) for row in rows] == [
+        ('Early', 'Jazz'), ('Late', 'Jazz;Blues')]
@@ -0,0 +1,30 @@
+from app import create_app
+from config import TestingConfig
+from models import db
+
+
+class QuietConfig(TestingConfig):
+    COMPRESS_MIN_SIZE = 10 ** 9
+    SQL_SERVER_TIMING = False
+
+
+def get(app, url):
+    with app.app_context():
+        db.create_all()
+    return app.test_client().get(url, headers={'Accept-Encoding': 'gzip'})
+
+
+def test_apps_do_not_share_extension_settings():
+    # the extensions are module level instances shared by every app, the
+    # settings of the app built last must not leak into the others
+    quiet = create_app(QuietConfig)
+    default = create_app('testing')
+
+    response = get(quiet, '/venues')
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert 'Server-Timing' not in response.headers
+
+    response = get(default, '/venues')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Server-Timing' in response.headers
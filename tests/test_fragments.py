@@ -0,0 +1,40 @@
+from datetime import datetime
+import pytest
+from jinja2 import TemplateSyntaxError
+from extensions import fragment_cache
+from fragments import fragment_key
+from models import db, Venue
+
+TILE = "{% cache 'tile', id, version %}{{ name }}{% endcache %}"
+
+
+def test_cache_tag_reuses_html_while_version_holds(app):
+    template = app.jinja_env.from_string(TILE)
+    assert template.render(id=1, version=1, name='First') == 'First'
+    assert template.render(id=1, version=1, name='Second') == 'First'
+    # another key renders its own body
+    assert template.render(id=2, version=1, name='Other') == 'Other'
+    assert template.render(id=1, version=2, name='Second') == 'Second'
+
+    fragment_cache.delete(fragment_key('tile', 1))
+    assert template.render(id=1, version=2, name='Third') == 'Third'
+
+
+def test_cache_tag_needs_a_version(app):
+    with pytest.raises(TemplateSyntaxError):
+        app.jinja_env.from_string(
+            "{% cache 'tile' %}{{ name }}{% endcache %}")
+
+
+def test_venue_tile_rerenders_when_updated_at_moves(client, entity):
+    venue = entity(Venue, 'The Old Name')
+    db.session.add(venue)
+    db.session.commit()
+    assert 'The Old Name' in client.get('/venues').get_data(as_text=True)
+    # an edit from another worker, this one's tile is left in place
+    db.session.query(Venue).filter(Venue.id == venue.id).update(
+        {'name': 'Renamed', 'updated_at': datetime.utcnow()},
+        synchronize_session=False)
+    db.session.commit()
+    page = client.get('/venues').get_data(as_text=True)
+    assert 'Renamed' in page and 'The Old Name' not in page
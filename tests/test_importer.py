@@ -0,0 +1,74 @@
+import io
+import json
+from datetime import datetime
+import pytest
+from importer import ImportReport, import_rows, read_rows
+from models import db, Venue, Artist, Show, Residency
+
+
+@pytest.fixture
+def pair(entity):
+    venue, artist = entity(Venue, 'Club'), entity(Artist, 'Band')
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    return venue, artist
+
+
+def show_row(start_time, **fields):
+    row = {'venue_name': 'Club', 'venue_city': 'San Francisco',
+           'venue_state': 'CA', 'artist_name': 'Band',
+           'artist_city': 'San Francisco', 'artist_state': 'CA',
+           'start_time': start_time}
+    row.update(fields)
+    return row
+
+
+def rejects(rows, kind='shows', batch_size=1000):
+    out = io.StringIO()
+    report = import_rows(kind, rows, batch_size=batch_size,
+                         report=ImportReport(out))
+    return report, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_import_rejects_bad_rows_and_loads_the_rest(pair):
+    csv = io.StringIO(
+        'name,city,state,address,phone,genres\n'
+        'Cellar,Oakland,CA,1 Main St,555-555-5555,Jazz;Blues\n'
+        ',Oakland,CA,2 Main St,555-555-5555,Jazz\n'
+        'Loft,Oakland,CA,3 Main St,not a phone,Jazz\n')
+    report, lines = rejects(read_rows(csv, 'csv'), 'venues')
+    assert (report.loaded, report.rejected) == (1, 2)
+    assert [line['line'] for line in lines] == [2, 3]
+    assert Venue.query.filter_by(name='Cellar').one().genres == \
+        ['Jazz', 'Blues']
+
+    report, lines = rejects([
+        show_row('2040-01-01 20:00:00'),
+        show_row('2040-01-01 21:00:00'),
+        show_row('2040-01-02 20:00:00', venue_name='Nowhere'),
+        show_row('someday'),
+    ], batch_size=2)
+    assert (report.loaded, report.rejected) == (1, 3)
+    assert 'show_venue_overlap' in lines[0]['reason']
+    assert lines[1]['reason'].startswith('unknown venue')
+    assert lines[2]['reason'].startswith('start_time')
+
+
+def test_import_rejects_shows_on_a_residency(entity, pair):
+    venue, artist = pair
+    guest = entity(Artist, 'Guest')
+    db.session.add(guest)
+    db.session.flush()
+    db.session.add(Residency(
+        venue_id=venue.id, artist_id=guest.id,
+        start_time=datetime(2040, 1, 6, 20), duration=120,
+        frequency='WEEKLY', interval=1))
+    db.session.commit()
+    report, lines = rejects([
+        show_row('2040-03-02 21:00:00'),
+        show_row('2040-03-03 21:00:00'),
+    ])
+    assert (report.loaded, report.rejected) == (1, 1)
+    assert lines == [{'line': 1, 'reason':
+                      'The venue has a residency at that time.'}]
+    assert Show.query.one().start_time == datetime(2040, 3, 3, 21)
@@ -0,0 +1,31 @@
+from app import create_app
+from config import TestingConfig
+
+
+class TokenConfig(TestingConfig):
+    METRICS_TOKEN = 's3cret'
+
+
+class LockedConfig(TestingConfig):
+    # as in production, with no token set
+    METRICS_REQUIRE_TOKEN = True
+
+
+def test_metrics_are_open_by_default(client):
+    client.get('/')
+    page = client.get('/metrics').get_data(as_text=True)
+    assert 'fyyur_requests_total{endpoint="main.index"' in page
+
+
+def test_metrics_want_the_token():
+    client = create_app(TokenConfig).test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={
+        'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={
+        'Authorization': 'Bearer s3cret'}).status_code == 200
+
+
+def test_metrics_are_not_served_without_a_required_token():
+    client = create_app(LockedConfig).test_client()
+    assert client.get('/metrics').status_code == 404
@@ -0,0 +1,101 @@
+import re
+from datetime import datetime, timedelta, timezone
+import pytest
+from models import db, Venue, Artist, Show, Residency, ResidencyException
+from recurrence import occurrences, residency_clash
+
+# a Tuesday
+FIRST = datetime(2026, 11, 3, 20)
+
+
+@pytest.fixture
+def pair(entity):
+    venue, artist = entity(Venue, 'Club'), entity(Artist, 'Band')
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    return venue.id, artist.id
+
+
+def weekly(venue_id, artist_id, start=FIRST, **fields):
+    fields.setdefault('interval', 1)
+    return Residency(venue_id=venue_id, artist_id=artist_id, start_time=start,
+                     duration=120, frequency='WEEKLY', **fields)
+
+
+def test_occurrences_stop_at_count_until_and_skip_cancelled(pair):
+    every_other = weekly(*pair, interval=2)
+    window = (FIRST + timedelta(days=10), FIRST + timedelta(days=50))
+    assert [start for start, _ in occurrences(every_other, *window)] == [
+        FIRST + timedelta(weeks=weeks) for weeks in (2, 4, 6)]
+
+    three = weekly(*pair, count=3)
+    assert len(list(occurrences(three, FIRST, datetime(2030, 1, 1)))) == 3
+
+    until = weekly(*pair, until=FIRST + timedelta(weeks=3))
+    cancelled = {FIRST + timedelta(weeks=1)}
+    assert list(occurrences(until, FIRST, datetime(2030, 1, 1), cancelled)) \
+        == [(FIRST + timedelta(weeks=weeks),
+             FIRST + timedelta(weeks=weeks, hours=2)) for weeks in (0, 2, 3)]
+
+
+def test_residency_clashes_with_a_show_months_ahead(entity, pair):
+    venue_id, artist_id = pair
+    guest = entity(Artist, 'Guest')
+    db.session.add(guest)
+    db.session.flush()
+    db.session.add(Show(venue_id=venue_id, artist_id=guest.id,
+                        start_time=datetime(2027, 6, 1, 20),
+                        end_time=datetime(2027, 6, 1, 22)))
+    db.session.commit()
+    assert residency_clash(weekly(venue_id, artist_id)) == 'venue'
+    assert residency_clash(weekly(venue_id, artist_id,
+                                  until=datetime(2027, 5, 1))) is None
+
+
+def test_residencies_clash_where_their_cycles_meet(entity, pair):
+    venue_id, artist_id = pair
+    other = entity(Artist, 'Other')
+    db.session.add(other)
+    db.session.flush()
+    # every 13 weeks from a week later: every 4 weeks first meets it 40
+    # weeks in, every 26 weeks never does
+    db.session.add(weekly(venue_id, other.id, FIRST + timedelta(weeks=1),
+                          interval=13))
+    db.session.commit()
+    assert residency_clash(weekly(venue_id, artist_id, interval=4)) == 'venue'
+    assert residency_clash(weekly(venue_id, artist_id, interval=26)) is None
+
+
+def test_unparseable_until_is_a_form_error(client, pair):
+    venue_id, artist_id = pair
+    response = client.post('/residencies/create', data={
+        'venue_id': venue_id, 'artist_id': artist_id,
+        'start_time': '2026-11-03 20:00:00', 'until': 'next spring',
+        'frequency': 'WEEKLY', 'interval': 1})
+    assert response.status_code == 200
+    assert Residency.query.count() == 0
+
+
+def test_cancellation_accepts_times_with_an_offset(client, pair):
+    residency = weekly(*pair)
+    db.session.add(residency)
+    db.session.commit()
+    occurrence = FIRST + timedelta(weeks=2)
+    utc = occurrence.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    url = '/api/v1/residencies/%d/cancellations' % residency.id
+    assert client.post(url, json={'start_time': utc}).status_code == 201
+    assert client.post(url, json={
+        'start_time': occurrence.isoformat()}).status_code == 200
+    assert [row.start_time for row in ResidencyException.query] == \
+        [occurrence]
+    assert client.post(url, json={
+        'start_time': utc.replace('20:', '21:')}).status_code == 400
+
+
+def test_show_listings_accept_times_with_an_offset(client, pair):
+    since = FIRST.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    for url in ('/shows?from=', '/api/v1/shows?from=',
+                '/api/v1/venues/%d/slots?from=' % pair[0]):
+        assert client.get(url + since).status_code == 200, url
+    assert re.search(r'Invalid date', client.get(
+        '/api/v1/shows?from=someday').get_data(as_text=True))
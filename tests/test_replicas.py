@@ -0,0 +1,36 @@
+import pytest
+from app import create_app
+from config import TestingConfig
+from models import db, Artist
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///{}'.format(tmp_path / 'primary.db')
+        SQLALCHEMY_BINDS = {
+            'replica0': 'sqlite:///{}'.format(tmp_path / 'replica.db')}
+        REPLICA_BINDS = ['replica0']
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        replica = db.get_engine(app, bind='replica0')
+        db.create_all()
+        # the models have no bind key, so the replica gets the same schema
+        # by hand, and a row the primary does not have
+        db.metadata.create_all(replica)
+        replica.execute(Artist.__table__.insert().values(
+            name='Only On The Replica', genres=[]))
+    return app
+
+
+def test_reads_on_a_replica_are_instrumented(replica_app):
+    client = replica_app.test_client()
+    response = client.get('/api/v1/artists')
+    assert [artist['name'] for artist in response.get_json()['data']] == [
+        'Only On The Replica']
+    timing = response.headers.get_all('Server-Timing')[0]
+    assert '0 queries' not in timing
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'fyyur_db_queries_total{endpoint="api.artists"}' in metrics
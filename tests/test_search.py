@@ -0,0 +1,52 @@
+import pytest
+from models import db, Venue, Artist
+from search import search
+
+
+@pytest.fixture
+def catalog(entity):
+    db.session.add_all([
+        entity(Venue, 'The Blue Note', city='New York', state='NY'),
+        entity(Venue, 'Oakland Blues Hall', city='Oakland',
+               genres=['Blues']),
+        entity(Venue, 'Rock Cellar', genres=['Rock n Roll']),
+        entity(Artist, 'Blue Trio'),
+    ])
+    db.session.commit()
+
+
+def names(model, term, **kwargs):
+    return [item['name'] for item in search(model, term, **kwargs).items]
+
+
+def test_search_matches_name_city_and_genre_prefixes(catalog):
+    assert sorted(names(Venue, 'blue')) == ['Oakland Blues Hall',
+                                           'The Blue Note']
+    assert names(Venue, 'oak') == ['Oakland Blues Hall']
+    assert names(Venue, 'new york') == ['The Blue Note']
+    assert names(Venue, 'rock') == ['Rock Cellar']
+    assert names(Venue, 'jazz') == ['The Blue Note']
+    assert names(Venue, '"*') == []
+    assert names(Artist, 'blue') == ['Blue Trio']
+
+
+def test_search_pages_and_caps(catalog):
+    first = search(Venue, '', page=1, per_page=2)
+    assert first.total == 3 and first.has_next and not first.has_prev
+    assert [item['name'] for item in search(
+        Venue, '', page=2, per_page=2).items] == ['The Blue Note']
+    capped = search(Venue, 'blue', per_page=1, max_results=1)
+    assert capped.total == 1 and not capped.has_next
+
+
+def test_search_follows_edits(client, catalog):
+    venue = Venue.query.filter_by(name='Rock Cellar').one()
+    venue.name = 'Jazz Cellar'
+    db.session.commit()
+    assert names(Venue, 'rock') == ['Jazz Cellar']
+    assert names(Venue, 'cellar') == ['Jazz Cellar']
+    db.session.delete(venue)
+    db.session.commit()
+    assert names(Venue, 'cellar') == []
+    page = client.post('/venues/search', data={'search_term': 'oak'})
+    assert 'Oakland Blues Hall' in page.get_data(as_text=True)
@@ -0,0 +1,55 @@
+import re
+from datetime import datetime, timedelta
+from html import unescape
+import pytest
+from models import db, Venue, Artist, Show
+
+FIRST = datetime(2040, 1, 1, 20)
+
+
+@pytest.fixture
+def listing(entity):
+    # five shows at their own venues, two of them at the same time so the
+    # id breaks the tie
+    names = []
+    for n, hours in enumerate([0, 24, 24, 48, 72]):
+        venue = entity(Venue, 'Stage %d' % n)
+        artist = entity(Artist, 'Act %d' % n)
+        db.session.add_all([venue, artist])
+        db.session.flush()
+        start = FIRST + timedelta(hours=hours)
+        db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+                            start_time=start,
+                            end_time=start + timedelta(hours=2)))
+        names.append(artist.name)
+    db.session.commit()
+    return names
+
+
+def page(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    more = re.search(r'<li class="next"><a href="([^"]+)"', body)
+    return (re.findall(r'>(Act \d+)</a>', body),
+            unescape(more.group(1)) if more else None)
+
+
+def test_keyset_pages_walk_every_show_once(client, listing):
+    seen, url, pages = [], '/shows?limit=2', 0
+    while url:
+        names, url = page(client, url)
+        seen.extend(names)
+        pages += 1
+    assert seen == listing and pages == 3
+
+
+def test_show_listing_filters_and_revalidates(client, listing):
+    names, more = page(client, '/shows?from=2040-01-02&to=2040-01-03')
+    assert names == ['Act 1', 'Act 2'] and more is None
+    assert client.get('/shows?after=garbage').status_code == 400
+    assert client.get('/shows?from=someday').status_code == 400
+
+    etag = client.get('/shows').headers['ETag']
+    assert client.get('/shows', headers={
+        'If-None-Match': etag}).status_code == 304
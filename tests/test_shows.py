@@ -0,0 +1,37 @@
+import re
+import pytest
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def pair(entity):
+    venue, artist = entity(Venue, 'The Jazz Club'), entity(Artist, 'Jazz Trio')
+    db.session.add_all([venue, artist, entity(Artist, 'Rock Band'),
+                        entity(Artist, '100% Jazz')])
+    db.session.commit()
+    return venue.id, artist.id
+
+
+def test_show_form_posts_with_its_csrf_token(app, client, pair):
+    app.config['WTF_CSRF_ENABLED'] = True
+    page = client.get('/shows/create').get_data(as_text=True)
+    token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"',
+                      page).group(1)
+    venue_id, artist_id = pair
+    response = client.post('/shows/create', data={
+        'csrf_token': token, 'venue_id': venue_id, 'artist_id': artist_id,
+        'start_time': '2040-01-01 20:00:00', 'duration': 90})
+    assert 'Show added' in response.get_data(as_text=True)
+    assert Show.query.count() == 1
+
+
+def test_autocomplete_matches_name_prefixes(client, pair):
+    def names(url):
+        return [row['name'] for row in client.get(url).get_json()['results']]
+
+    assert names('/autocomplete/artists?q=ja') == ['Jazz Trio']
+    assert names('/autocomplete/artists?q=100%25') == ['100% Jazz']
+    assert names('/autocomplete/artists?limit=2') == ['100% Jazz',
+                                                      'Jazz Trio']
+    assert names('/autocomplete/venues?q=THE') == ['The Jazz Club']
+    assert client.get('/autocomplete/shows').status_code == 404
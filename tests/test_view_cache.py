@@ -0,0 +1,19 @@
+from datetime import datetime
+from models import db, Venue, Artist
+
+
+def test_stale_view_cache_entry_is_not_served(client, entity):
+    # the edit happens where this worker's view cache never hears of it,
+    # as it would in another process
+    venue = entity(Venue, 'The Old Name')
+    artist = entity(Artist, 'Quartet')
+    db.session.add_all([venue, artist])
+    db.session.commit()
+    for url, model, row in (('/venues/%d' % venue.id, Venue, venue),
+                            ('/artists/%d' % artist.id, Artist, artist)):
+        assert client.get(url).status_code == 200
+        db.session.query(model).filter(model.id == row.id).update(
+            {'name': 'Renamed', 'updated_at': datetime.now()},
+            synchronize_session=False)
+        db.session.commit()
+        assert 'Renamed' in client.get(url).get_data(as_text=True)
@@ -0,0 +1,244 @@
+import sys
+from datetime import datetime
+from flask import (Blueprint, abort, current_app, flash, redirect,
+                   render_template, request, url_for)
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Venue, Artist, Show
+from forms import VenueForm
+from areas import area_index
+from search import search
+from cache import timeout_until
+from caching import (venue_page_keys, make_etag, not_modified, conditional,
+                     table_version, detail_version)
+from extensions import view_cache, fragment_cache
+from fragments import fragment_key
+from deletion import delete_entities
+from routing import read_only
+from recurrence import by_start_time, residency_shows, window
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+blueprint = Blueprint('venues', __name__)
+
+
+@blueprint.route('/venues')
+def venues():
+    # the page shows venue names by area, so the venue table version is all
+    # it depends on; show bookings leave venue.updated_at alone
+    version = db.session.query(*table_version(Venue)).one()
+    etag, last_modified = make_etag('venues', *version), version[1]
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    # names and the denormalized upcoming show counts, arranged into areas
+    # by the in-process area index, as of the version the ETag is made of
+    counts = {}
+    for venue_id, name, num_upcoming_shows, updated_at in db.session.query(
+            Venue.id, Venue.name, Venue.upcoming_shows_count,
+            Venue.updated_at):
+        counts[venue_id] = {
+            "id": venue_id,
+            "name": name,
+            "num_upcoming_shows": num_upcoming_shows,
+            "updated_at": updated_at,
+        }
+
+    data = []
+    for city, state, venue_ids in area_index.areas(version):
+        area_venues = [counts[venue_id]
+                       for venue_id in venue_ids if venue_id in counts]
+        if area_venues:
+            data.append({
+                "city": city,
+                "state": state,
+                "venues": area_venues
+            })
+    return conditional(render_template('pages/venues.html', areas=data),
+                       etag, last_modified)
+
+
+@blueprint.route('/venues/search', methods=['GET', 'POST'])
+@read_only
+def search_venues():
+    search_term = request.values.get('search_term', '')
+    results = search(Venue, search_term,
+                     page=request.values.get('page', 1, type=int),
+                     per_page=current_app.config['SEARCH_PER_PAGE'],
+                     max_results=current_app.config[
+                         'SEARCH_MAX_RESULTS'])
+    response = {
+        "count": results.total,
+        "data": results.items
+    }
+    return render_template('pages/search_venues.html', results=response,
+                           pagination=results, search_term=search_term)
+
+
+@blueprint.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+    # shows the venue page with the given venue_id
+    etag, last_modified = detail_version(
+        Venue, venue_id, Artist, datetime.now())
+    response = not_modified(etag, last_modified)
+    if response:
+        return response
+
+    # the cached view model carries the version the ETag is made of, so an
+    # entry this worker kept after a write elsewhere is never served
+    entry = view_cache.get('venue:%d' % venue_id)
+    if entry is not None and entry[0] == etag:
+        data = entry[1]
+    else:
+        data = venue_page_data(venue_id, etag)
+    return conditional(render_template('pages/show_venue.html', venue=data),
+                       etag, last_modified)
+
+
+def venue_page_data(venue_id, version):
+    # one round trip: the venue row outer joined to its shows and the
+    # artist columns each tile needs, ordered so the split below is stable
+    rows = db.session.query(
+        Venue, Show.start_time, Artist.id, Artist.name, Artist.image_link
+    ).outerjoin(Show, Show.venue_id == Venue.id).outerjoin(
+        Artist, Artist.id == Show.artist_id
+    ).filter(Venue.id == venue_id).order_by(Show.start_time).all()
+    if not rows:
+        abort(404)
+
+    venue = rows[0][0]
+    now = datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    one_off = ({
+        "artist_id": artist_id,
+        "artist_name": artist_name,
+        "artist_image_link": artist_image_link,
+        "start_time": start_time
+    } for _, start_time, artist_id, artist_name, artist_image_link in rows
+        if start_time is not None)
+    # residencies add their occurrences near now, in start_time order
+    for show in by_start_time(one_off, residency_shows(
+            Venue, venue_id, *window(now))):
+        if show["start_time"] < now:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+
+    data = {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "city": venue.city,
+        "state": venue.state,
+        "address": venue.address,
+        "phone": venue.phone,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+    view_cache.set('venue:%d' % venue_id, (version, data), timeout_until(
+        now, upcoming_shows, current_app.config['VIEW_CACHE_TTL']))
+    return data
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@blueprint.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    form = VenueForm(request.form)
+
+    if form.validate():
+        try:
+            venue = Venue()
+            form.populate_obj(venue)
+            db.session.add(venue)
+            db.session.commit()
+            area_index.invalidate()
+            flash('Venue ' + request.form['name'] +
+                  ' was successfully listed!')
+        except:
+            print(sys.exc_info())
+            db.session.rollback()
+        finally:
+            db.session.close()
+    else:
+        flash(form.errors)
+        flash('An error occurred. Venue ' +
+              request.form['name'] + ' could not be listed.')
+
+    return render_template('pages/home.html')
+
+
+@blueprint.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    venue = Venue.query.get_or_404(venue_id)
+    name = venue.name
+
+    try:
+        delete_entities(Venue, [venue_id])
+        flash('Venue ' + name + ' was successfully deleted!')
+    except SQLAlchemyError:
+        current_app.logger.exception('Venue %d could not be deleted', venue_id)
+        flash('An error occurred. Venue ' + name + ' could not be deleted.')
+        db.session.rollback()
+    finally:
+        db.session.close()
+    return redirect(url_for('main.index'))
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    venue = Venue.query.get(venue_id)
+    form = VenueForm(obj=venue)
+
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@blueprint.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    form = VenueForm(request.form)
+
+    if form.validate():
+        try:
+            venue = Venue.query.get(venue_id)
+            area = (venue.city, venue.state)
+            tile = (venue.name, venue.image_link)
+            form.populate_obj(venue)
+            db.session.add(venue)
+            db.session.commit()
+            if (venue.city, venue.state) != area:
+                area_index.invalidate()
+            view_cache.delete(*venue_page_keys(
+                venue_id, related=(venue.name, venue.image_link) != tile))
+            fragment_cache.delete(fragment_key('venue-tile', venue_id))
+            flash('Venue has been modified')
+        except:
+            print(sys.exc_info())
+            db.session.rollback()
+        finally:
+            db.session.close()
+    else:
+        for field in form.errors:
+            flash(f'{field} : {form.errors[field][0]}')
+        flash('Venue has not been modified.')
+
+    return redirect(url_for('.show_venue', venue_id=venue_id))
@@ -0,0 +1,9 @@
+# WSGI entry point for multi-worker servers, e.g.
+#   FYYUR_ENV=production SECRET_KEY=... gunicorn -c gunicorn.conf.py wsgi:app
+from app import create_app, preload
+
+app = create_app()
+preload()
+
+if __name__ == '__main__':
+    app.run()